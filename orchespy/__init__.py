@@ -1,4 +1,16 @@
 from .decorator import device
-from .transfer import transfer_array, transfer_array_content
+from .executor import ProcessExecutor
+from .selector import auto
+from . import telemetry
+from .io import load_to_device, save_from_device
+from .telemetry import metrics
+from .transfer import (transfer_array, transfer_array_content,
+                       transfer_arrays,
+                       transfer_array_async, transfer_array_content_async,
+                       wait_all)
 
-__all__ = ['device', 'transfer_array', 'transfer_array_content']
+__all__ = ['device', 'auto', 'transfer_array', 'transfer_array_content',
+           'transfer_arrays',
+           'transfer_array_async', 'transfer_array_content_async',
+           'wait_all', 'load_to_device', 'save_from_device',
+           'metrics', 'telemetry', 'ProcessExecutor']
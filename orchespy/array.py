@@ -0,0 +1,185 @@
+import threading
+
+from .devicetype.find_device_class import find_device_class
+from .planner import _plan
+
+
+class OrchesArray:
+    """Handle of an array whose copies on several devices are kept coherent.
+
+    An OrchesArray records which devices hold a valid copy (replica) of
+    the data, in the manner of the MSI protocol: a replica is Modified
+    when it is the only valid copy and has been written, Shared when it
+    is valid, and Invalid when it is absent or stale. A replica is
+    transferred only when the target device does not hold a valid one,
+    from the valid replica that is cheapest to transfer.
+
+    :func:`orchespy.transfer_array` and :func:`orchespy.device` accept
+    an OrchesArray in place of an array and use its replicas.
+
+    Parameters
+    ----------
+    data : array_like
+        N-dimension array on a device or host.
+
+    Notes
+    -----
+    Writing to a replica in place must be reported by :meth:`modify` or
+    :meth:`mark_modified`, or by the `writes` parameter of
+    :func:`orchespy.device`, so that the other replicas are invalidated.
+
+    Examples
+    --------
+    >>> import numpy
+    >>> from orchespy import device
+    >>> from orchespy.array import OrchesArray
+    >>> from orchespy.devicetype import Host, VE
+    >>>
+    >>> @device(VE, coherent=True)
+    ... def add(x, y):
+    ...     return x + y
+    >>>
+    >>> x1 = OrchesArray(numpy.ones(4))
+    >>> y1 = add(x1, x1)          # x1 is transferred to VE once
+    >>> z1 = add(y1, x1)          # y1 and x1 are already on VE
+    >>> y1.devices
+    (VE(0),)
+    >>> numpy.asarray(z1)         # z1 is transferred to the host
+    array([3., 3., 3., 3.])
+    """
+    def __init__(self, data):
+        devtype = find_device_class(data)
+        if devtype is None:
+            raise ValueError('data must be an array on a device or host.')
+        dev = devtype.get_device(data)
+        self._lock = threading.Lock()
+        self._replicas = {dev: data}
+        self._modified = None
+        self.shape = data.shape
+        self.dtype = data.dtype
+        self.nbytes = data.nbytes
+
+    @property
+    def ndim(self):
+        return len(self.shape)
+
+    @property
+    def devices(self):
+        """Devices which hold a valid replica."""
+        with self._lock:
+            return tuple(self._replicas)
+
+    def state(self, target):
+        """Return the MSI state of the replica on a device.
+
+        Returns
+        -------
+        {'M', 'S', 'I'}
+            Modified, Shared or Invalid.
+        """
+        if isinstance(target, type):
+            target = target()
+        with self._lock:
+            if target not in self._replicas:
+                return 'I'
+            return 'M' if self._modified == target else 'S'
+
+    def on(self, target):
+        """Return a valid replica on a device, transferring it if needed.
+
+        Parameters
+        ----------
+        target : devicetype
+            Device where the replica is required.
+
+        Returns
+        -------
+        ndarray:
+            N-dimension array on `target`. It must not be written to
+            unless the write is reported by :meth:`mark_modified`.
+        """
+        from .transfer import transfer_array
+
+        if isinstance(target, type):
+            target = target()
+        with self._lock:
+            replica = self._replicas.get(target)
+            if replica is not None:
+                return replica
+            srcdev = min(self._replicas, key=lambda d: self._cost(d, target))
+            src = self._replicas[srcdev]
+        replica = transfer_array(src, target)
+        with self._lock:
+            # The source may have been written while transferring.
+            if self._replicas.get(srcdev) is src:
+                self._replicas[target] = replica
+                self._modified = None
+        return replica
+
+    def _cost(self, srcdev, target):
+        route = _plan(srcdev, target, self.nbytes, self.dtype)
+        return float('inf') if route is None else route.cost
+
+    def modify(self, target):
+        """Return a replica on a device for writing.
+
+        The other replicas are invalidated, and the returned replica
+        becomes Modified.
+        """
+        replica = self.on(target)
+        self.mark_modified(target)
+        return replica
+
+    def mark_modified(self, target):
+        """Report that the replica on a device has been written.
+
+        The other replicas are invalidated.
+        """
+        if isinstance(target, type):
+            target = target()
+        with self._lock:
+            replica = self._replicas.get(target)
+            if replica is None:
+                raise ValueError('{} does not hold a valid replica.'.format(
+                    target))
+            self._replicas = {target: replica}
+            self._modified = target
+
+    def invalidate(self, target):
+        """Drop the replica on a device unless it is the last one."""
+        if isinstance(target, type):
+            target = target()
+        with self._lock:
+            if target in self._replicas and len(self._replicas) > 1:
+                del self._replicas[target]
+                if self._modified == target:
+                    self._modified = None
+
+    def get(self):
+        """Return a valid replica on the host."""
+        from .devicetype import Host
+        return self.on(Host())
+
+    def __array__(self, dtype=None, copy=None):
+        # Without copy=True, the host replica itself is returned and must
+        # not be written to.
+        from .devicetype import Host
+        if copy is False and self.state(Host()) == 'I':
+            raise ValueError('Unable to avoid a copy to the host.')
+        value = self.get()
+        if dtype is not None and value.dtype != dtype:
+            if copy is False:
+                raise ValueError('Unable to avoid a copy to convert the'
+                                 ' dtype.')
+            return value.astype(dtype)
+        if copy:
+            return value.copy()
+        return value
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __repr__(self):
+        return 'OrchesArray(shape={}, dtype={}, replicas={})'.format(
+            self.shape, self.dtype, dict((d, self.state(d))
+                                         for d in self.devices))
@@ -0,0 +1,208 @@
+"""Transfer-matrix benchmark of OrchesPy.
+
+Run ``python -m orchespy.bench`` to measure :func:`orchespy.transfer_array`
+and :func:`orchespy.transfer_array_content` over every route between the
+available devices, and the dispatch overhead of :func:`orchespy.device`.
+Only the host is required; GPUs and VEs are included when their
+backends are installed. ``--json`` writes the results for regression
+comparison.
+"""
+import argparse
+import itertools
+import json
+import statistics
+import sys
+import time
+
+import numpy
+
+from . import devicetype
+from .decorator import device
+from .pool import get_pool
+from .selector import available_devices
+from .transfer import transfer_array, transfer_array_content
+
+
+_DEFAULT_SIZES = (1 << 10, 1 << 16, 1 << 20, 1 << 24)
+_DEFAULT_DTYPES = ('float64', 'float32', 'int32', 'bool')
+
+
+def _make_source(srcdev, nbytes, dtype, order, layout):
+    dtype = numpy.dtype(dtype)
+    n = max(1, nbytes // dtype.itemsize)
+    rows = max(1, int(n ** 0.5))
+    cols = max(1, n // rows)
+    if layout == 'strided':
+        cols *= 2
+    src = transfer_array(numpy.zeros((rows, cols), dtype=dtype, order=order),
+                         srcdev)
+    if layout == 'strided':
+        src = src[:, ::2]
+    return src
+
+
+def _allocations(devices):
+    total = 0
+    for dev in devices:
+        s = get_pool(dev).stats()
+        total += s['misses'] + s['unpooled']
+    return total
+
+
+def _time(func, repeat):
+    func()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def bench_transfers(devices, sizes=_DEFAULT_SIZES, dtypes=_DEFAULT_DTYPES,
+                    orders=('C', 'F'), layouts=('contiguous', 'strided'),
+                    repeat=5):
+    """Measure transfers over every route between `devices`.
+
+    Returns
+    -------
+    list of dict
+        One record for each operation, route, size, dtype, order and
+        layout, with ``latency`` and ``min_latency`` in seconds,
+        ``bandwidth`` in bytes per second and ``allocations`` per call.
+    """
+    records = []
+    for srcdev, dstdev in itertools.product(devices, repeat=2):
+        for size, dtype, order, layout in itertools.product(
+                sizes, dtypes, orders, layouts):
+            src = _make_source(srcdev, size, dtype, order, layout)
+            dst = transfer_array(numpy.zeros(src.shape, dtype=src.dtype,
+                                             order=order), dstdev)
+            ops = (
+                ('transfer_array', lambda: transfer_array(src, dstdev)),
+                ('transfer_array_content',
+                 lambda: transfer_array_content(dst, src)),
+            )
+            for op, func in ops:
+                try:
+                    before = _allocations(devices)
+                    samples = _time(func, repeat)
+                    allocs = (_allocations(devices) - before) / (repeat + 1)
+                except (ValueError, NotImplementedError) as e:
+                    records.append({
+                        'op': op, 'src': repr(srcdev), 'dst': repr(dstdev),
+                        'nbytes': src.nbytes, 'dtype': str(src.dtype),
+                        'order': order, 'layout': layout,
+                        'error': str(e)})
+                    continue
+                latency = statistics.median(samples)
+                records.append({
+                    'op': op, 'src': repr(srcdev), 'dst': repr(dstdev),
+                    'nbytes': src.nbytes, 'dtype': str(src.dtype),
+                    'order': order, 'layout': layout,
+                    'latency': latency, 'min_latency': min(samples),
+                    'bandwidth': src.nbytes / latency if latency else None,
+                    'allocations': allocs})
+    return records
+
+
+def bench_dispatch(devices, nargs=(0, 1, 4, 16), repeat=1000):
+    """Measure the overhead of calling a function through ``device``.
+
+    Returns
+    -------
+    list of dict
+        One record for each device and number of array arguments, with
+        the ``latency`` of the decorated call and the ``overhead`` over
+        calling the function directly, both in seconds.
+    """
+    def body(*args):
+        return None
+
+    records = []
+    for dev, n in itertools.product(devices, nargs):
+        args = [transfer_array(numpy.zeros(8), dev) for _ in range(n)]
+        decorated = device(dev)(body)
+        direct = statistics.median(_time(lambda: body(*args), repeat))
+        latency = statistics.median(_time(lambda: decorated(*args), repeat))
+        records.append({'op': 'dispatch', 'dst': repr(dev), 'nargs': n,
+                        'latency': latency, 'overhead': latency - direct})
+    return records
+
+
+_KEY_COLUMNS = '{:<24} {:<10} {:<10} {:>10} {:<8} {:<5} {:<10} '
+
+
+def _format_table(records):
+    lines = []
+    header = _KEY_COLUMNS + '{:>11} {:>10} {:>7}'
+    row = _KEY_COLUMNS + '{:>9.1f}us {:>6.2f}GB/s {:>7.2f}'
+    lines.append(header.format('op', 'src', 'dst', 'bytes', 'dtype', 'order',
+                               'layout', 'latency', 'bandwidth', 'allocs'))
+    for r in records:
+        if r['op'] == 'dispatch':
+            continue
+        if 'error' in r:
+            lines.append((_KEY_COLUMNS + '{}').format(
+                r['op'], r['src'], r['dst'], r['nbytes'], r['dtype'],
+                r['order'], r['layout'], r['error']))
+            continue
+        lines.append(row.format(
+            r['op'], r['src'], r['dst'], r['nbytes'], r['dtype'], r['order'],
+            r['layout'], r['latency'] * 1e6, (r['bandwidth'] or 0) / 1e9,
+            r['allocations']))
+    dispatch = [r for r in records if r['op'] == 'dispatch']
+    if dispatch:
+        lines.append('')
+        lines.append('{:<24} {:<10} {:>5} {:>11} {:>11}'.format(
+            'op', 'dst', 'nargs', 'latency', 'overhead'))
+        for r in dispatch:
+            lines.append('{:<24} {:<10} {:>5} {:>9.2f}us {:>9.2f}us'.format(
+                r['op'], r['dst'], r['nargs'], r['latency'] * 1e6,
+                r['overhead'] * 1e6))
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m orchespy.bench',
+        description='Benchmark OrchesPy transfers and dispatch.')
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=list(_DEFAULT_SIZES),
+                        help='array sizes in bytes')
+    parser.add_argument('--dtypes', nargs='+', default=list(_DEFAULT_DTYPES))
+    parser.add_argument('--orders', nargs='+', default=['C', 'F'],
+                        choices=['C', 'F'])
+    parser.add_argument('--layouts', nargs='+',
+                        default=['contiguous', 'strided'],
+                        choices=['contiguous', 'strided'])
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='measurements of each transfer')
+    parser.add_argument('--host-only', action='store_true',
+                        help='benchmark only the Host devicetype')
+    parser.add_argument('--no-dispatch', action='store_true',
+                        help='skip the decorator dispatch benchmark')
+    parser.add_argument('--json', metavar='PATH',
+                        help='write the results as JSON to PATH ("-" for stdout)')
+    args = parser.parse_args(argv)
+
+    devices = [devicetype.Host()] if args.host_only else available_devices()
+    records = bench_transfers(devices, args.sizes, args.dtypes, args.orders,
+                              args.layouts, args.repeat)
+    if not args.no_dispatch:
+        records += bench_dispatch(devices)
+
+    result = {'devices': [repr(d) for d in devices], 'records': records}
+    if args.json == '-':
+        json.dump(result, sys.stdout, indent=1)
+        sys.stdout.write('\n')
+        return 0
+    print(_format_table(records))
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(result, f, indent=1)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,446 @@
+import hashlib
+import inspect
+import threading
+import weakref
+from collections import OrderedDict
+
+import numpy
+
+from .array import OrchesArray
+from .devicetype import Host
+from .devicetype.find_device_class import find_device_class
+from .lazy import LazyArray
+from .transfer import transfer_array, _device_of
+from .tree import flatten
+
+
+# Words of a device array hashed by each kernel of _device_fingerprint.
+_FINGERPRINT_WORDS = 1 << 22
+_GOLDEN = 0x9E3779B97F4A7C15
+
+
+def _is_frozen(obj):
+    # A read-only view of a writeable base can still change underneath us,
+    # so every ndarray along the base chain has to be read-only.
+    while isinstance(obj, numpy.ndarray):
+        if obj.flags.writeable:
+            return False
+        obj = obj.base
+    return True
+
+
+def _content_hash(obj):
+    # Object arrays hold pointers, which say nothing about the content.
+    if not isinstance(obj, numpy.ndarray) or obj.dtype.hasobject:
+        return None
+    data = numpy.ascontiguousarray(obj).reshape(-1).view(numpy.uint8)
+    h = hashlib.blake2b(digest_size=16)
+    h.update(data)
+    return h.digest()
+
+
+def _device_fingerprint(obj, dev):
+    """Fingerprint the content of an array on the device where it lives.
+
+    The data is reduced to two 64-bit sums on the device, so only the
+    sums are transferred to the host.
+    """
+    xp = dev.numpy_class
+    itemsize = obj.dtype.itemsize
+    with dev.activate():
+        data = xp.ascontiguousarray(obj).reshape(-1)
+        if itemsize % 8 == 0:
+            words = data.view(xp.uint64)
+        elif itemsize in (1, 2, 4):
+            words = data.view('u{}'.format(itemsize))
+        else:
+            words = data.view(xp.uint8)
+        golden = xp.uint64(_GOLDEN)
+        h1 = h2 = 0
+        for start in range(0, words.size, _FINGERPRINT_WORDS):
+            w = words[start:start + _FINGERPRINT_WORDS].astype(xp.uint64)
+            weights = xp.arange(start + 1, start + w.size + 1,
+                                dtype=xp.uint64) * golden | xp.uint64(1)
+            h1 += int(xp.sum(w * weights))
+            h2 += int(xp.sum((w ^ (w >> xp.uint64(29))) * golden))
+    return (h1 & 0xFFFFFFFFFFFFFFFF, h2 & 0xFFFFFFFFFFFFFFFF)
+
+
+def _array_key(obj):
+    """Return a key of the content of an array or OrchesArray.
+
+    Returns None if the content cannot be hashed.
+    """
+    if isinstance(obj, OrchesArray):
+        devices = obj.devices
+        dev = next((d for d in devices if isinstance(d, Host)), devices[0])
+        obj = obj.on(dev)
+    else:
+        dev = find_device_class(obj).get_device(obj)
+    if isinstance(obj, numpy.ndarray):
+        digest = _content_hash(obj)
+        if digest is None:
+            return None
+    else:
+        digest = _device_fingerprint(obj, dev)
+    return ('array', obj.shape, obj.dtype.str, digest)
+
+
+class _Entry:
+    __slots__ = ('ref', 'token', 'shape', 'dtype', 'value', 'nbytes')
+
+    def __init__(self, ref, token, src, value):
+        self.ref = ref
+        self.token = token
+        self.shape = src.shape
+        self.dtype = src.dtype
+        self.value = value
+        self.nbytes = value.nbytes
+
+
+class ArgumentCache:
+    """Cache of device copies of arguments of decorated functions.
+
+    An entry is keyed by the identity of the source array and the target
+    device, and is reused while the change signal of the source array
+    stays the same.
+
+    Parameters
+    ----------
+    max_bytes : int, optional
+        Byte budget per target device. The least recently used entries
+        are evicted when the budget is exceeded.
+    validate : {'readonly', 'hash'} or callable, optional
+        How to detect that a source array has changed.
+        ``'readonly'`` caches only arrays whose ``writeable`` flag is off
+        on the whole base chain. ``'hash'`` hashes the content of the array
+        on every call. A callable receives the source array and returns a
+        version token; the entry is reused while the token is unchanged,
+        and ``None`` disables caching for the array.
+
+    Notes
+    -----
+    The cached device copy is passed to the function as is, so a
+    decorated function must not modify its cached arguments in place.
+
+    Examples
+    --------
+    >>> import numpy
+    >>> from orchespy import device
+    >>> from orchespy.cache import ArgumentCache
+    >>> from orchespy.devicetype import VE
+    >>>
+    >>> cache = ArgumentCache(max_bytes=1 << 30)
+    >>> @device(VE, cache=cache)
+    ... def apply(w, x):
+    ...     return w @ x
+    >>>
+    >>> w = numpy.random.rand(1000, 1000)
+    >>> w.flags.writeable = False
+    >>> for _ in range(10):
+    ...     y = apply(w, numpy.random.rand(1000))
+    >>> cache.stats()['hits']
+    9
+    """
+    def __init__(self, max_bytes=1 << 30, validate='readonly'):
+        if validate == 'readonly':
+            self._token = self._readonly_token
+        elif validate == 'hash':
+            self._token = _content_hash
+        elif callable(validate):
+            self._token = validate
+        else:
+            raise ValueError('validate must be "readonly", "hash"'
+                             ' or a callable.')
+        self.max_bytes = max_bytes
+        self._lock = threading.RLock()
+        self._entries = {}
+        self._bytes = {}
+        self._hits = 0
+        self._misses = 0
+        self._bytes_saved = 0
+        self._evictions = 0
+
+    @staticmethod
+    def _readonly_token(obj):
+        return True if _is_frozen(obj) else None
+
+    def transfer_array(self, src, target, copy=True):
+        """Return a copy of `src` on `target`, reusing a cached copy.
+
+        Objects which cannot be cached are transferred with
+        :func:`orchespy.transfer_array`. `copy` is passed to it; with
+        ``None`` or ``False``, an array already on `target` is returned
+        as it is without being cached.
+        """
+        if isinstance(src, LazyArray):
+            src = src._source()
+        if not hasattr(src, 'nbytes') or isinstance(src, OrchesArray):
+            return transfer_array(src, target, copy=copy)
+        if isinstance(target, type):
+            target = target()
+        if copy is not True and _device_of(src) == target:
+            return src
+        token = self._token(src)
+        if token is None:
+            return transfer_array(src, target, copy=copy)
+
+        key = id(src)
+        with self._lock:
+            entries = self._entries.get(target)
+            if entries is not None:
+                entry = entries.get(key)
+                if entry is not None:
+                    if (entry.ref() is src and entry.token == token and
+                            entry.shape == src.shape and
+                            entry.dtype == src.dtype):
+                        entries.move_to_end(key)
+                        self._hits += 1
+                        self._bytes_saved += entry.nbytes
+                        return entry.value
+                    self._remove(target, key)
+            self._misses += 1
+
+        dst = transfer_array(src, target, copy=copy)
+        if dst is src or dst.nbytes > self.max_bytes:
+            return dst
+        try:
+            ref = weakref.ref(src, self._make_callback(target, key))
+        except TypeError:
+            return dst
+        with self._lock:
+            entries = self._entries.setdefault(target, OrderedDict())
+            if key in entries:
+                self._remove(target, key)
+            entry = _Entry(ref, token, src, dst)
+            entries[key] = entry
+            self._bytes[target] = self._bytes.get(target, 0) + entry.nbytes
+            self._evict(target)
+        return dst
+
+    def _make_callback(self, target, key):
+        selfref = weakref.ref(self)
+
+        def _callback(ref):
+            cache = selfref()
+            if cache is None:
+                return
+            with cache._lock:
+                entries = cache._entries.get(target)
+                if entries is not None:
+                    entry = entries.get(key)
+                    if entry is not None and entry.ref is ref:
+                        cache._remove(target, key)
+        return _callback
+
+    def _remove(self, target, key):
+        entry = self._entries[target].pop(key)
+        self._bytes[target] -= entry.nbytes
+
+    def _evict(self, target):
+        entries = self._entries[target]
+        while self._bytes[target] > self.max_bytes and entries:
+            key = next(iter(entries))
+            self._remove(target, key)
+            self._evictions += 1
+
+    def clear(self):
+        """Drop all cached device copies."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes.clear()
+
+    def stats(self):
+        """Return cache statistics.
+
+        Returns
+        -------
+        dict
+            ``hits``, ``misses``, ``bytes_saved``, ``evictions``,
+            ``entries`` and ``bytes``, the last one per target device.
+        """
+        with self._lock:
+            return {
+                'hits': self._hits,
+                'misses': self._misses,
+                'bytes_saved': self._bytes_saved,
+                'evictions': self._evictions,
+                'entries': sum(len(e) for e in self._entries.values()),
+                'bytes': dict(self._bytes),
+            }
+
+    def reset_stats(self):
+        """Reset the counters returned by :meth:`stats`."""
+        with self._lock:
+            self._hits = 0
+            self._misses = 0
+            self._bytes_saved = 0
+            self._evictions = 0
+
+
+default_cache = ArgumentCache()
+
+
+class _Result:
+    __slots__ = ('value', 'nbytes')
+
+    def __init__(self, value, nbytes):
+        self.value = value
+        self.nbytes = nbytes
+
+
+class ResultCache:
+    """Cache of results of decorated functions, keyed on argument content.
+
+    A call is keyed by the function, a fingerprint of the content of each
+    array argument, and the other arguments, which must be hashable.
+    Host arrays are hashed with BLAKE2b on the host, and arrays on a
+    device are reduced to a fingerprint on the device, so that a call
+    whose result is cached transfers no arguments. The results stay on
+    the device where the function ran.
+
+    Parameters
+    ----------
+    max_bytes : int, optional
+        Byte budget of the array results per target device. The least
+        recently used results are evicted when the budget is exceeded.
+
+    Notes
+    -----
+    A cached result is returned to every call with the same arguments,
+    so it must not be modified in place. A function whose result depends
+    on anything other than its arguments must not be memoized, or its
+    results must be dropped with :meth:`invalidate` when that changes.
+
+    Examples
+    --------
+    >>> import numpy
+    >>> from orchespy import device
+    >>> from orchespy.cache import default_result_cache
+    >>> from orchespy.devicetype import VE
+    >>>
+    >>> @device(VE, memoize=True)
+    ... def setup(a):
+    ...     return a @ a.T
+    >>>
+    >>> a = numpy.random.rand(1000, 1000)
+    >>> p1 = setup(a)
+    >>> p2 = setup(a)             # a is hashed, not transferred
+    >>> default_result_cache.stats()['hits']
+    1
+    >>> setup.invalidate()
+    """
+    def __init__(self, max_bytes=1 << 30):
+        self.max_bytes = max_bytes
+        self._lock = threading.RLock()
+        self._entries = {}
+        self._bytes = {}
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def key(self, func, args, kwargs):
+        """Return the key of a call, or None if it cannot be cached."""
+        leaves, treedef = flatten((args, kwargs))
+        parts = [inspect.unwrap(func), treedef]
+        for v in leaves:
+            if (isinstance(v, OrchesArray) or
+                    find_device_class(v) is not None):
+                part = _array_key(v)
+                if part is None:
+                    return None
+                parts.append(part)
+            else:
+                parts.append((type(v), v))
+        key = tuple(parts)
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
+    def get(self, target, key, default=None):
+        """Return the cached result of a call on `target`, or `default`."""
+        with self._lock:
+            entries = self._entries.get(target)
+            entry = None if entries is None else entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return default
+            entries.move_to_end(key)
+            self._hits += 1
+            return entry.value
+
+    def put(self, target, key, result):
+        """Cache the result of a call on `target`."""
+        nbytes = sum(v.nbytes for v in flatten(result)[0]
+                     if find_device_class(v) is not None)
+        if nbytes > self.max_bytes:
+            return
+        with self._lock:
+            entries = self._entries.setdefault(target, OrderedDict())
+            if key in entries:
+                self._remove(target, key)
+            entries[key] = _Result(result, nbytes)
+            self._bytes[target] = self._bytes.get(target, 0) + nbytes
+            while self._bytes[target] > self.max_bytes and entries:
+                self._remove(target, next(iter(entries)))
+                self._evictions += 1
+
+    def _remove(self, target, key):
+        entry = self._entries[target].pop(key)
+        self._bytes[target] -= entry.nbytes
+
+    def invalidate(self, func=None, target=None):
+        """Drop cached results.
+
+        Parameters
+        ----------
+        func : callable, optional
+            Drop only the results of this function, decorated or not.
+        target : devicetype, optional
+            Drop only the results on this device.
+        """
+        if isinstance(target, type):
+            target = target()
+        if func is not None:
+            func = inspect.unwrap(func)
+        with self._lock:
+            for dev, entries in self._entries.items():
+                if target is not None and dev != target:
+                    continue
+                for key in [k for k in entries
+                            if func is None or k[0] is func]:
+                    self._remove(dev, key)
+
+    def clear(self):
+        """Drop all cached results."""
+        self.invalidate()
+
+    def stats(self):
+        """Return cache statistics.
+
+        Returns
+        -------
+        dict
+            ``hits``, ``misses``, ``evictions``, ``entries`` and
+            ``bytes``, the last one per target device.
+        """
+        with self._lock:
+            return {
+                'hits': self._hits,
+                'misses': self._misses,
+                'evictions': self._evictions,
+                'entries': sum(len(e) for e in self._entries.values()),
+                'bytes': dict(self._bytes),
+            }
+
+    def reset_stats(self):
+        """Reset the counters returned by :meth:`stats`."""
+        with self._lock:
+            self._hits = 0
+            self._misses = 0
+            self._evictions = 0
+
+
+default_result_cache = ResultCache()
@@ -1,23 +1,550 @@
+import asyncio
+import builtins
+import dis
 import functools
-from .transfer import transfer_array
+import inspect
+import operator
+import threading
+import time
+import types
+import weakref
+from . import executor as _executor
+from . import numpy as _numpy
+from . import telemetry as _telemetry
+from .array import OrchesArray
+from .cache import default_cache, default_result_cache
+from .devicetype import Host
+from .devicetype.find_device_class import find_device_class
+from .executor import default_executor, default_process_executor
+from .lazy import LazyArray
+from .selector import Selector, auto, default_selector
+from .tree import flatten, unflatten
+from .transfer import (transfer_array, _device_of, _submit_transfer,
+                       _transfer_packed)
 
 
-def device(target, numpy_module_arg=None):
+# Specialized copies of functions, by function and array module.
+_specialized = weakref.WeakKeyDictionary()
+_specialized_lock = threading.Lock()
+
+# Default of ResultCache.get that tells a miss from a cached None.
+_MISS = object()
+
+# Builtins which give access to the globals of the calling function.
+_GLOBALS_BUILTINS = frozenset(('globals', 'exec', 'eval'))
+
+# Upper limit of the transfer plans cached on each decorated function.
+_MAX_PLANS = 64
+
+
+class _Plan:
+    """Transfer plan of one structure of arguments or results.
+
+    ``arrays`` lists the indices of the flattened leaves that are arrays,
+    OrchesArray handles or LazyArray results; the other leaves are passed
+    through without inspection.
+    """
+    __slots__ = ('treedef', 'arrays')
+
+    def __init__(self, treedef, leaves):
+        self.treedef = treedef
+        self.arrays = tuple(
+            i for i, v in enumerate(leaves)
+            if isinstance(v, (OrchesArray, LazyArray)) or
+            find_device_class(v) is not None)
+
+
+def _get_plan(plans, obj):
+    leaves, treedef = flatten(obj)
+    key = (treedef, tuple(map(type, leaves)))
+    plan = plans.get(key)
+    if plan is None:
+        plan = _Plan(treedef, leaves)
+        if len(plans) < _MAX_PLANS:
+            plans[key] = plan
+    return plan, leaves
+
+
+def _apply_plan(plan, obj, leaves, convert):
+    # Containers without converted arrays are passed as they are, so that
+    # the function sees and modifies the caller's objects.
+    if not plan.arrays:
+        return obj
+    converted = convert([leaves[i] for i in plan.arrays])
+    for i, v in zip(plan.arrays, converted):
+        leaves[i] = v
+    return unflatten(plan.treedef, leaves, like=obj)
+
+
+def _transfer_all(values, target, transfer):
+    srcdevs = [_device_of(v) for v in values]
+    # Transfers over one route run one after another on its worker, so
+    # they are made in this thread unless there are several routes.
+    if len(set(srcdevs)) < 2:
+        return [transfer(v, target) for v in values]
+    pending = [_submit_transfer(d, target, transfer, v, target)
+               for d, v in zip(srcdevs, values)]
+    return [f.result() for f in pending]
+
+
+def _shard(name, value, axis, count):
+    # A shard is sliced on a device holding the array, and each device
+    # receives its shard when its call converts the arguments.
+    if isinstance(value, OrchesArray):
+        value = value.on(value.devices[0])
+    elif isinstance(value, LazyArray):
+        value = value._source()
+    elif find_device_class(value) is None:
+        raise ValueError('The argument {} to split must be an N-dimension'
+                         ' array.'.format(name))
+    length = value.shape[axis]
+    size, extra = divmod(length, count)
+    head = (slice(None),) * axis
+    shards = []
+    start = 0
+    for i in range(count):
+        stop = start + size + (1 if i < extra else 0)
+        shards.append(value[head + (slice(start, stop),)])
+        start = stop
+    return shards
+
+
+def _combine(results, combine, axis, gather_to):
+    if callable(combine):
+        return combine(results)
+    per_device = [flatten(r) for r in results]
+    treedef = per_device[0][1]
+    combined = []
+    for values in zip(*(leaves for leaves, _ in per_device)):
+        if find_device_class(values[0]) is None:
+            if combine == 'sum':
+                combined.append(functools.reduce(operator.add, values))
+            else:
+                combined.append(values[0])
+            continue
+        with gather_to as xp:
+            if combine == 'concat':
+                combined.append(xp.concatenate(values, axis=axis))
+            else:
+                combined.append(functools.reduce(xp.add, values))
+    return unflatten(treedef, combined)
+
+
+def _device_parallel(targets, split, combine, return_to, options):
+    if not targets:
+        raise ValueError('Specify at least one device.')
+    if options['lazy']:
+        raise ValueError('lazy cannot be used with multiple devices.')
+    if options.pop('coherent'):
+        raise ValueError('coherent cannot be used with multiple devices.')
+    if combine not in ('concat', 'sum') and not callable(combine):
+        raise ValueError('combine must be "concat", "sum" or a callable.')
+    split = dict(split or {})
+    targets = [t() if isinstance(t, type) else t for t in targets]
+    if len(set(targets)) < len(targets):
+        raise ValueError('Each device can be specified only once.')
+    if return_to is None:
+        return_to = Host()
+    elif isinstance(return_to, type):
+        return_to = return_to()
+    axis = next(iter(split.values()), 0)
+
+    def _device(func):
+        if inspect.iscoroutinefunction(func):
+            raise ValueError('async functions cannot be used with multiple'
+                             ' devices.')
+        signature = inspect.signature(func)
+        for name in split:
+            if name not in signature.parameters:
+                raise ValueError('{} is not an argument of {}.'.format(
+                    name, func.__qualname__))
+        per_device = [device(t, return_to=return_to, **options)(func)
+                      for t in targets]
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind_partial(*args, **kwargs)
+            shards = {name: _shard(name, bound.arguments[name],
+                                   split_axis, len(targets))
+                      for name, split_axis in split.items()
+                      if name in bound.arguments}
+            pending = []
+            for i, (t, run) in enumerate(zip(targets, per_device)):
+                for name in shards:
+                    bound.arguments[name] = shards[name][i]
+                pending.append(default_executor.submit(t, run, *bound.args,
+                                                       **bound.kwargs))
+            results = [f.result() for f in pending]
+            return _combine(results, combine, axis, return_to)
+        # Shards for the first device run inline on its worker.
+        _add_async_methods(wrapper, functools.partial(
+            default_executor.submit, targets[0], wrapper))
+        _add_invalidate(wrapper, options['memoize'], func)
+        return wrapper
+    return _device
+
+
+class _Step:
+    """Awaitable passing one object yielded by a coroutine to the loop."""
+    __slots__ = ('obj',)
+
+    def __init__(self, obj):
+        self.obj = obj
+
+    def __await__(self):
+        return (yield self.obj)
+
+
+async def _run_coroutine(coro, target):
+    """Await `coro` with `target` current only while a step of it runs.
+
+    The device context is left at each suspension of the coroutine, so
+    that other tasks of the event loop run in their own contexts.
+    """
+    value = None
+    error = None
+    while True:
+        with target:
+            try:
+                if error is None:
+                    yielded = coro.send(value)
+                else:
+                    yielded = coro.throw(error)
+            except StopIteration as e:
+                return e.value
+        try:
+            value = await _Step(yielded)
+            error = None
+        except BaseException as e:
+            value = None
+            error = e
+
+
+def _add_async_methods(wrapper, submit):
+    async def aio(*args, **kwargs):
+        return await asyncio.wrap_future(submit(*args, **kwargs))
+    wrapper.submit = submit
+    wrapper.aio = aio
+
+
+class _Globals(dict):
+    """Globals of a specialized function.
+
+    It holds the array module under the names bound to
+    ``orchespy.numpy``, and reads any other name from the module globals
+    of the function as they are at the time of the read.
+    """
+    __slots__ = ('_module', '_builtins')
+
+    def __init__(self, module, bindings):
+        super().__init__(bindings)
+        self._module = module
+        builtins_ = module.get('__builtins__', builtins)
+        self._builtins = getattr(builtins_, '__dict__', builtins_)
+        self['__builtins__'] = builtins_
+
+    def __missing__(self, key):
+        value = self._module.get(key, _MISS)
+        if value is _MISS:
+            value = self._builtins.get(key, _MISS)
+            if value is _MISS:
+                raise KeyError(key)
+        return value
+
+
+def _uses_globals(code):
+    """Return whether `code` writes or exposes its globals."""
+    for ins in dis.get_instructions(code):
+        if ins.opname in ('STORE_GLOBAL', 'DELETE_GLOBAL'):
+            return True
+        if ins.opname == 'LOAD_GLOBAL' and ins.argval in _GLOBALS_BUILTINS:
+            return True
+    return any(_uses_globals(c) for c in code.co_consts
+               if isinstance(c, types.CodeType))
+
+
+def _specialize(func, target):
+    """Return a copy of `func` with ``orchespy.numpy`` bound to `target`.
+
+    The copy reads the global names of `func` which refer to
+    ``orchespy.numpy`` as the array module of `target`, and the other
+    names from the module of `func`, which is left as it is. A function
+    which writes to its globals, or passes them to ``globals``, ``exec``
+    or ``eval``, is returned as it is, as its writes would not reach the
+    module. A copy is made once for each array module.
+    """
+    xp = target.numpy_class
+    with _specialized_lock:
+        clones = _specialized.setdefault(func, {})
+        clone = clones.get(xp)
+        if clone is not None:
+            return clone
+        proxy = type(_numpy)
+        globals_ = func.__globals__
+        names = [k for k, v in globals_.items() if isinstance(v, proxy)]
+        if not names or _uses_globals(func.__code__):
+            clone = func
+        else:
+            clone = types.FunctionType(
+                func.__code__, _Globals(globals_, dict.fromkeys(names, xp)),
+                func.__name__, func.__defaults__, func.__closure__)
+            clone.__kwdefaults__ = func.__kwdefaults__
+            functools.update_wrapper(clone, func, updated=())
+            clone.__dict__.update(func.__dict__)
+            del clone.__wrapped__
+        clones[xp] = clone
+    return clone
+
+
+def _to_host(obj):
+    """Replace OrchesArray and LazyArray leaves in `obj` by host arrays."""
+    leaves, treedef = flatten(obj)
+    if not any(isinstance(v, (OrchesArray, LazyArray)) for v in leaves):
+        return obj
+    return unflatten(treedef, [
+        transfer_array(v, Host(), copy=None)
+        if isinstance(v, (OrchesArray, LazyArray)) else v
+        for v in leaves])
+
+
+def _run_in_process(func, target, local_wrapper):
+    if inspect.iscoroutinefunction(func):
+        raise ValueError('async functions cannot be used with process.')
+
+    # The worker receives process_wrapper by reference and finds it by
+    # importing the module of func, so it must be the decorated name.
+    @functools.wraps(func)
+    def process_wrapper(*args, **kwargs):
+        if _executor._worker_device is not None:
+            return local_wrapper(*args, **kwargs)
+        return submit(*args, **kwargs).result()
+
+    def submit(*args, **kwargs):
+        args, kwargs = _to_host((args, kwargs))
+        return default_process_executor.submit(target, process_wrapper,
+                                               *args, **kwargs)
+    _add_async_methods(process_wrapper, submit)
+    return process_wrapper
+
+
+def _add_invalidate(wrapper, memoize, func):
+    if memoize:
+        wrapper.invalidate = functools.partial(memoize.invalidate, func)
+
+
+def _home_device(args, kwargs):
+    # The device holding all the array arguments, or the host.
+    common = None
+    for v in flatten((args, kwargs))[0]:
+        if isinstance(v, OrchesArray):
+            devices = set(v.devices)
+        elif isinstance(v, LazyArray):
+            devices = {v._target}
+        elif find_device_class(v) is not None:
+            devices = {find_device_class(v).get_device(v)}
+        else:
+            continue
+        common = devices if common is None else common & devices
+    if common is not None and len(common) == 1:
+        return next(iter(common))
+    return Host()
+
+
+def _device_auto(selector, options, specialize):
+    def _device(func):
+        if inspect.iscoroutinefunction(func):
+            raise ValueError('async functions cannot be used with auto.')
+        name = '{}.{}'.format(func.__module__, func.__qualname__)
+        local = threading.local()
+        per_device = {}
+
+        def _get(dev, return_to):
+            run = per_device.get((dev, return_to))
+            if run is None:
+                body = _specialize(func, dev) if specialize else func
+
+                @functools.wraps(func)
+                def timed(*args, **kwargs):
+                    start = time.perf_counter()
+                    result = body(*args, **kwargs)
+                    dev.synchronize()
+                    local.seconds = time.perf_counter() - start
+                    return result
+                run = per_device[(dev, return_to)] = device(
+                    dev, **dict(options, return_to=return_to))(timed)
+            return run
+
+        def _select(args, kwargs):
+            leaves, _ = flatten((args, kwargs))
+            arrays = [v for v in leaves if isinstance(v, OrchesArray) or
+                      find_device_class(v) is not None]
+            return selector.select(name, arrays), sum(v.nbytes
+                                                      for v in arrays)
+
+        def _call(dev, nbytes, args, kwargs):
+            local.seconds = None
+            return_to = options['return_to']
+            if return_to is None:
+                return_to = _home_device(args, kwargs)
+            result = _get(dev, return_to)(*args, **kwargs)
+            # A memoized result was not measured.
+            if local.seconds is not None:
+                selector.record(name, dev, nbytes, local.seconds)
+            return result
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            dev, nbytes = _select(args, kwargs)
+            return _call(dev, nbytes, args, kwargs)
+
+        def submit(*args, **kwargs):
+            dev, nbytes = _select(args, kwargs)
+            return default_executor.submit(dev, _call, dev, nbytes, args,
+                                           kwargs)
+        _add_async_methods(wrapper, submit)
+        _add_invalidate(wrapper, options['memoize'], func)
+        return wrapper
+    return _device
+
+
+def device(target, numpy_module_arg=None, cache=None, return_to=None,
+           lazy=False, async_transfer=False, pack=False, split=None,
+           combine='concat', coherent=False, writes=None, copy=None,
+           process=False, arg_dtypes=None, specialize=False, memoize=False):
     """ Execute a decorated function on a specified device.
 
+    Arrays are looked up in nested tuples, lists, dicts and dataclass
+    instances of the arguments and the return value. How each
+    structure of arguments is transferred is planned on the first call
+    with that structure and reused for later calls.
+
+    The device is made current in the calling thread while the function
+    runs, so decorated functions for different devices can be called
+    from different threads. ``func.submit(*args, **kwargs)`` runs a call
+    on the worker thread of the device in
+    :data:`orchespy.executor.default_executor` and returns a
+    :class:`concurrent.futures.Future`, and ``await func.aio(*args,
+    **kwargs)`` does the same without blocking the event loop.
+
+    An ``async def`` function is decorated into a coroutine function.
+    Its arguments and results are transferred on the worker thread of
+    the device, and the device is current only while the coroutine
+    runs between its suspensions.
+
     Parameters
     ----------
-    target : devicetype
+    target : devicetype, list of devicetype, orchespy.auto or Selector
         A device where the function is executed.
         Specify the devicetype class that corresponds to the device.
         See :class:`orchespy.devicetype` for what you can specify.
+        With a list of devices, the function runs on all of them
+        concurrently; see `split` and `combine`. Each device may appear
+        once in the list.
+        With :data:`orchespy.auto`, the device is chosen for each call by
+        :data:`orchespy.selector.default_selector`; a
+        :class:`orchespy.selector.Selector` can be given instead.
     numpy_module_arg : string, optional
         The argument name to pass the
         namespace of NumPy-compatible package for the target device.
+    cache : bool or ArgumentCache, optional
+        Keep device copies of the array arguments between calls.
+        ``True`` uses :data:`orchespy.cache.default_cache`, which is shared
+        by all decorated functions. See :class:`orchespy.cache.ArgumentCache`
+        for when a cached copy is reused.
+    return_to : devicetype, optional
+        A device where each array in the return value is transferred to.
+        By default, the return value stays on `target`. With
+        :data:`orchespy.auto`, it is by default transferred to the
+        device holding all the array arguments, or to the host if they
+        are on different devices, so that it does not depend on the
+        device chosen for the call.
+    lazy : bool, optional
+        Defer the transfer of each returned array until it is first used.
+        The arrays are returned as :class:`orchespy.lazy.LazyArray`.
+        If `return_to` is not specified, the arrays are transferred to
+        the host.
+    async_transfer : bool, optional
+        Start the transfers of all array arguments at once, and wait for
+        them together before calling the function. Arguments from
+        different devices are transferred concurrently; those from one
+        device are transferred one after another. When all of them come
+        from the same device, this option has no effect.
+    pack : bool or int, optional
+        Pack small contiguous array arguments into one buffer and transfer
+        it with a single copy, as :func:`orchespy.transfer_arrays` does.
+        The arrays in the return value are packed in the same way when
+        `return_to` is specified and `lazy` is not.
+        An integer gives the largest size in bytes of the packed arrays;
+        ``True`` means 64 KiB.
+    split : dict, optional
+        With multiple devices, a mapping from argument names to the axis
+        along which the argument is divided into one shard per device.
+        These arguments must be N-dimension arrays, OrchesArray handles
+        or LazyArray handles.
+        The other arguments are passed to every device as they are.
+    combine : {'concat', 'sum'} or callable, optional
+        With multiple devices, how the results of the devices are
+        combined after they are transferred to `return_to`, which
+        defaults to the host. ``'concat'`` concatenates each array of the
+        results along the axis of the first `split` argument and ``'sum'``
+        adds them up. A callable receives the list of the results.
+    coherent : bool, optional
+        Return each array of the return value as an
+        :class:`orchespy.array.OrchesArray` holding its replica on
+        `target`, so that passing it to another decorated function or
+        :func:`orchespy.transfer_array` transfers it only to devices
+        without a valid replica. With `return_to`, a replica on
+        `return_to` is also made. OrchesArray arguments are accepted
+        whether or not `coherent` is specified.
+    writes : sequence of str, optional
+        Names of the arguments the function writes to in place. The
+        replicas of the OrchesArray handles in these arguments on
+        devices other than `target` are invalidated after the call. It
+        cannot be used with ``copy=True``, as the function would write
+        to copies of the arguments.
+    copy : bool or None, optional
+        How array arguments already on `target` are passed; see
+        :func:`orchespy.transfer_array`. By default, they are passed as
+        they are, so a function which modifies its arguments in place
+        modifies the caller's arrays. ``True`` passes copies of all the
+        array arguments. ``False`` raises ValueError if an argument is
+        not on `target`.
+    arg_dtypes : dict, optional
+        Data types of the array arguments on `target`, by argument
+        name. The arrays in these arguments are converted while they are
+        transferred, as by the `dtype` parameter of
+        :func:`orchespy.transfer_array`, so that a narrower dtype is
+        what crosses the link. They bypass `cache`.
+    specialize : bool, optional
+        Run a copy of the function whose reads of global names bound to
+        ``orchespy.numpy`` use the array module of `target`, such as
+        ``cupy`` or ``nlcpy``, so that ``np.add`` in the function costs
+        the same as with the module itself. The copy is made at the first
+        call and cached for each array module. It reads the other globals
+        from the module of the function, which is not modified; only
+        rebinding those names later is not seen by it. A function which
+        assigns to globals is run as it is. Functions called from the
+        function are not specialized.
+    memoize : bool or ResultCache, optional
+        Reuse the result of an earlier call with the same arguments. The
+        array arguments are compared by a hash of their content computed
+        where they live, so a repeated call transfers and computes
+        nothing, and the results are kept on `target`. ``True`` uses
+        :data:`orchespy.cache.default_result_cache`. The decorated
+        function gets an ``invalidate()`` method which drops its
+        results. See :class:`orchespy.cache.ResultCache`.
+    process : bool, optional
+        Run the function in a long-lived worker process bound to
+        `target`; see :class:`orchespy.executor.ProcessExecutor`. Host
+        arrays are passed to and from the worker through shared memory.
+        The function must be defined at the top level of a module, and
+        the return value is returned to the host. `return_to` must be
+        the host, and `lazy` and `coherent` cannot be used.
 
     See Also
     --------
     orchespy.devicetype: specify to target parameter.
+    orchespy.cache.ArgumentCache: specify to cache parameter.
 
     Examples
     --------
@@ -68,20 +595,254 @@ def device(target, numpy_module_arg=None):
     >>> mul = exec_on_ve(x, y)
     >>> mul.venode.id
     1
+
+    Run a function on two VEs, each of which processes half of ``x``.
+    The results are concatenated on the host.
+
+    >>> @device([VE(0), VE(1)], split={'x': 0}, combine='concat')
+    ... def scale(x, factor):
+    ...     return x * factor
+    ...
+    >>> scale(np.arange(6.0), 2.0)
+    array([ 0.,  2.,  4.,  6.,  8., 10.])
+
+    Chain calls on VE without copying the intermediate result back to the
+    host. ``y`` is transferred to the host once, when it is first needed
+    there.
+
+    >>> from orchespy.array import OrchesArray
+    >>> @device(VE, coherent=True)
+    ... def add(x, y):
+    ...     return x + y
+    ...
+    >>> x = OrchesArray(np.ones(4))
+    >>> y = add(x, x)
+    >>> z = add(y, x)
+    >>> np.asarray(y)
+    array([2., 2., 2., 2.])
     """
+    if process:
+        if target is auto or isinstance(target, (Selector, list, tuple)):
+            raise ValueError('process requires a single target device.')
+        if lazy or coherent:
+            raise ValueError('lazy and coherent cannot be used with'
+                             ' process.')
+        if return_to is None:
+            return_to = Host
+        if not isinstance(return_to, Host) and return_to is not Host:
+            raise ValueError('return_to must be Host with process.')
+        if memoize:
+            raise ValueError('memoize cannot be used with process.')
+    if memoize is True:
+        memoize = default_result_cache
+    if memoize and writes:
+        raise ValueError('memoize cannot be used with writes.')
+    if writes and copy:
+        raise ValueError('writes cannot be used with copy=True.')
+    if target is auto or isinstance(target, Selector):
+        if split is not None:
+            raise ValueError('split cannot be used with auto.')
+        return _device_auto(
+            default_selector if target is auto else target,
+            dict(numpy_module_arg=numpy_module_arg, cache=cache,
+                 return_to=return_to, lazy=lazy,
+                 async_transfer=async_transfer, pack=pack,
+                 coherent=coherent, writes=writes, copy=copy,
+                 arg_dtypes=arg_dtypes, memoize=memoize), specialize)
+    if isinstance(target, (list, tuple)):
+        options = dict(numpy_module_arg=numpy_module_arg, cache=cache,
+                       lazy=lazy, async_transfer=async_transfer, pack=pack,
+                       coherent=coherent, writes=writes, copy=copy,
+                       arg_dtypes=arg_dtypes, specialize=specialize,
+                       memoize=memoize)
+        return _device_parallel(list(target), split, combine, return_to,
+                                options)
     if isinstance(target, type):
         target = target()
+    if lazy and coherent:
+        raise ValueError('lazy cannot be used with coherent.')
+    if lazy and return_to is None:
+        return_to = Host
+    if isinstance(return_to, type):
+        return_to = return_to()
+    if pack is True:
+        pack = 1 << 16
+    if cache is True:
+        cache = default_cache
+    if pack and copy is False:
+        raise ValueError('pack cannot be used with copy=False.')
+    _transfer = functools.partial(
+        cache.transfer_array if cache else transfer_array, copy=copy)
+    _transfer_result = functools.partial(transfer_array, copy=None)
+
+    def _convert_args(values, cast=()):
+        # A LazyArray argument is sent from where its data is now.
+        values = [v._source() if isinstance(v, LazyArray) else v
+                  for v in values]
+        if cast:
+            # Arrays already converted to arg_dtypes are passed as they are.
+            converted = list(values)
+            rest = [i for i, v in enumerate(values) if id(v) not in cast]
+            for i, v in zip(rest, _convert_args([values[i] for i in rest])):
+                converted[i] = v
+            return converted
+        if pack:
+            return _transfer_packed(values, target, _transfer, pack)
+        if async_transfer:
+            return _transfer_all(values, target, _transfer)
+        return [_transfer(v, target) for v in values]
+
+    def _convert_result(values):
+        if lazy:
+            return [LazyArray(v, return_to) for v in values]
+        if pack:
+            return _transfer_packed(values, return_to, _transfer_result,
+                                    pack)
+        return [_transfer_result(v, return_to) for v in values]
+
+    def _wrap_result(values):
+        handles = [v if isinstance(v, OrchesArray) else OrchesArray(v)
+                   for v in values]
+        if return_to is not None:
+            for h in handles:
+                h.on(return_to)
+        return handles
 
     def _device(func):
+        arg_plans = {}
+        result_plans = {}
+        signature = (inspect.signature(func) if writes or arg_dtypes
+                     else None)
+        for arg in list(writes or ()) + list(arg_dtypes or ()):
+            if arg not in signature.parameters:
+                raise ValueError('{} is not an argument of {}.'.format(
+                    arg, func.__qualname__))
+
+        def _cast_args(args, kwargs):
+            bound = signature.bind_partial(*args, **kwargs)
+            cast = set()
+            for arg, dtype in arg_dtypes.items():
+                if arg not in bound.arguments:
+                    continue
+                leaves, treedef = flatten(bound.arguments[arg])
+                for i, v in enumerate(leaves):
+                    if (isinstance(v, (OrchesArray, LazyArray)) or
+                            find_device_class(v) is not None):
+                        leaves[i] = transfer_array(v, target, copy=copy,
+                                                   dtype=dtype)
+                        cast.add(id(leaves[i]))
+                bound.arguments[arg] = unflatten(
+                    treedef, leaves, like=bound.arguments[arg])
+            return bound.args, bound.kwargs, cast
+
+        name = '{}.{}'.format(func.__module__, func.__qualname__)
+        body = func
+        if specialize:
+            # The module globals are complete only after the module is
+            # imported, so the copy is made at the first call.
+            def _first_call(*args, **kwargs):
+                nonlocal body
+                body = _specialize(func, target)
+                return body(*args, **kwargs)
+            body = _first_call
+
+        def _prepare(args, kwargs):
+            convert = _convert_args
+            if arg_dtypes:
+                args, kwargs, cast = _cast_args(args, kwargs)
+                convert = functools.partial(_convert_args, cast=cast)
+            plan, leaves = _get_plan(arg_plans, (args, kwargs))
+            args_converted, kwargs_converted = _apply_plan(
+                plan, (args, kwargs), leaves, convert)
+            if numpy_module_arg is not None:
+                kwargs_converted[numpy_module_arg] = target.numpy_class
+            return args_converted, kwargs_converted
+
+        def _finish(args, kwargs, result):
+            if writes:
+                bound = signature.bind_partial(*args, **kwargs)
+                for arg in writes:
+                    for v in flatten(bound.arguments.get(arg))[0]:
+                        if isinstance(v, OrchesArray):
+                            v.mark_modified(target)
+            if coherent:
+                plan, leaves = _get_plan(result_plans, result)
+                result = _apply_plan(plan, result, leaves, _wrap_result)
+            elif return_to is not None:
+                plan, leaves = _get_plan(result_plans, result)
+                result = _apply_plan(plan, result, leaves,
+                                     _convert_result)
+            return result
+
+        def _lookup(args, kwargs):
+            key = memoize.key(func, args, kwargs)
+            if key is None:
+                return None, _MISS
+            return key, memoize.get(target, key, _MISS)
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if memoize:
+                    key, result = await asyncio.wrap_future(
+                        default_executor.submit(target, _lookup, args,
+                                                kwargs))
+                    if result is not _MISS:
+                        return await asyncio.wrap_future(
+                            default_executor.submit(target, _finish, args,
+                                                    kwargs, result))
+                timed = _telemetry.active
+                if timed:
+                    start = time.perf_counter()
+                args_converted, kwargs_converted = await asyncio.wrap_future(
+                    default_executor.submit(target, _prepare, args, kwargs))
+                if timed:
+                    transferred = time.perf_counter()
+                result = await _run_coroutine(
+                    body(*args_converted, **kwargs_converted), target)
+                if memoize and key is not None:
+                    memoize.put(target, key, result)
+                if timed:
+                    executed = time.perf_counter()
+                result = await asyncio.wrap_future(default_executor.submit(
+                    target, _finish, args, kwargs, result))
+                if timed:
+                    _telemetry._record_call(name, transferred - start,
+                                            executed - transferred,
+                                            time.perf_counter() - executed)
+                return result
+            async_wrapper.aio = async_wrapper
+            _add_invalidate(async_wrapper, memoize, func)
+            return async_wrapper
+
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
-            with target as xp:
-                args_converted = tuple((transfer_array(a, target)
-                                        for a in args))
-                kwargs_converted = dict([(k, transfer_array(kwargs[k], target))
-                                         for k in kwargs])
-                if numpy_module_arg is not None:
-                    kwargs_converted[numpy_module_arg] = xp
-                return func(*args_converted, **kwargs_converted)
+            if memoize:
+                key, result = _lookup(args, kwargs)
+                if result is not _MISS:
+                    return _finish(args, kwargs, result)
+            timed = _telemetry.active
+            if timed:
+                start = time.perf_counter()
+            args_converted, kwargs_converted = _prepare(args, kwargs)
+            if timed:
+                transferred = time.perf_counter()
+            with target:
+                result = body(*args_converted, **kwargs_converted)
+            if memoize and key is not None:
+                memoize.put(target, key, result)
+            if timed:
+                executed = time.perf_counter()
+            result = _finish(args, kwargs, result)
+            if timed:
+                _telemetry._record_call(name, transferred - start,
+                                        executed - transferred,
+                                        time.perf_counter() - executed)
+            return result
+        if process:
+            return _run_in_process(func, target, wrapper)
+        _add_async_methods(wrapper, functools.partial(
+            default_executor.submit, target, wrapper))
+        _add_invalidate(wrapper, memoize, func)
         return wrapper
     return _device
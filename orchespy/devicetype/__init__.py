@@ -8,5 +8,6 @@ try:
     from .ve import VE
 except ImportError:
     VE = None
+from .registry import register_device_class, register_link
 
-__all__ = ['Host', 'CUDAGPU', 'VE']
+__all__ = ['Host', 'CUDAGPU', 'VE', 'register_device_class', 'register_link']
@@ -1,8 +1,138 @@
-from abc import ABC, abstractmethod
+from abc import ABCMeta, abstractmethod
+import contextlib
+import threading
 from .. import numpy as _numpy
+from .. import pool as _pool
 
 
-class Base(ABC):
+_instances = {}
+_device_counts = {}
+_instances_lock = threading.Lock()
+_local = threading.local()
+
+
+def _device_id_of(args, kwargs):
+    if args:
+        return args[0]
+    if len(kwargs) == 1:
+        return next(iter(kwargs.values()))
+    return kwargs.get('device_id', 0)
+
+
+def _in_exclusive_context():
+    """Return whether the calling thread is in an exclusive context.
+
+    The body of a function decorated for a device with an exclusive
+    context holds the device for the process, so work it hands to other
+    threads and waits for is run in the calling thread instead.
+    """
+    return getattr(_local, 'exclusive', 0) > 0
+
+
+class _DeviceTypeMeta(ABCMeta):
+    """Interns the instances of devicetypes by device ID."""
+    def __call__(cls, *args, **kwargs):
+        device_id = _device_id_of(args, kwargs)
+        try:
+            return _instances[(cls, device_id)]
+        except (KeyError, TypeError):
+            pass
+        cls._validate_device_id(device_id)
+        self = cls.__new__(cls)
+        object.__setattr__(self, '_device_id', device_id)
+        self.__init__(*args, **kwargs)
+        object.__setattr__(self, '_frozen', True)
+        with _instances_lock:
+            return _instances.setdefault((cls, device_id), self)
+
+
+class Base(metaclass=_DeviceTypeMeta):
+    """Base class of devicetypes.
+
+    Devicetypes are interned: ``VE(1) is VE(1)``, and an instance is
+    created and validated only once for each device ID. Instances are
+    immutable, hashable and compare equal when they denote the same
+    device, so they can be used as dictionary keys.
+
+    ``with device as xp:`` makes the device current in the calling
+    thread, as :meth:`activate` does, and makes ``orchespy.numpy`` refer
+    to its NumPy-compatible package `xp`.
+
+    A subclass is constructed with the device ID as its first argument,
+    which is stored in ``_device_id`` before ``__init__`` runs. Its
+    ``__init__``, if any, runs once for each device ID and may set
+    attributes; the instance is immutable afterwards. A subclass with
+    more than one device overrides :meth:`_probe_device_count`, and may
+    override :meth:`_validate_device_id` to check the ID.
+    """
+    # Limits of the buffer pool of each device; see orchespy.pool.
+    pool_max_bytes = 0
+    pool_min_bytes = 0
+    # Host staging pool of each device; see orchespy.pool.StagingPool.
+    # Staging through a device with pinned staging buffers is preferred.
+    staging_max_bytes = 1 << 28
+    staging_prefault = False
+    staging_pinned = False
+    # Whether the context of a device excludes the other threads; see
+    # _in_exclusive_context.
+    exclusive_context = False
+
+    def __init__(self, device_id=0):
+        pass
+
+    @classmethod
+    def _validate_device_id(cls, device_id):
+        """Raise an error if `device_id` is not a device of this class."""
+        if not isinstance(device_id, int):
+            raise TypeError('an integer is required')
+        if device_id >= cls.device_count():
+            raise ValueError(
+                'This ID exceeds the number of devices: {} has {}. Override'
+                ' {}._probe_device_count() to report more devices.'.format(
+                    cls.__name__, cls.device_count(), cls.__name__))
+
+    @classmethod
+    def _probe_device_count(cls):
+        """Return the number of devices; one unless overridden."""
+        return 1
+
+    @classmethod
+    def device_count(cls):
+        """Return the number of devices of this devicetype.
+
+        The count is probed on the first call and cached; see
+        :meth:`refresh_devices`.
+        """
+        try:
+            return _device_counts[cls]
+        except KeyError:
+            count = cls._probe_device_count()
+            _device_counts[cls] = count
+            return count
+
+    @classmethod
+    def refresh_devices(cls):
+        """Probe the number of devices again on the next validation."""
+        _device_counts.pop(cls, None)
+
+    def __setattr__(self, name, value):
+        if getattr(self, '_frozen', False):
+            raise AttributeError('devicetype instances are immutable')
+        object.__setattr__(self, name, value)
+
+    def __eq__(self, other):
+        return (type(self) is type(other) and
+                self._device_id == other._device_id)
+
+    def __hash__(self):
+        return hash((type(self), self._device_id))
+
+    def __reduce__(self):
+        return (type(self), (self._device_id,))
+
+    def __repr__(self):
+        return '{}({})'.format(type(self).__name__, self._device_id)
+
     @abstractmethod
     def can_transfer(self, obj):
         pass
@@ -15,6 +145,25 @@ class Base(ABC):
     def create_ndarray_on_device(self, ary):
         pass
 
+    def _empty(self, shape, dtype, order):
+        return _pool.get_pool(self).empty(shape, dtype, order)
+
+    def activate(self):
+        """Return a context manager that makes this device current.
+
+        The context is safe to use from several threads. Devices whose
+        current device is process-wide serialize their contexts.
+        """
+        return contextlib.nullcontext()
+
+    def alloc_staging(self, nbytes):
+        """Allocate a host buffer to stage transfers to this device."""
+        return _pool.aligned_empty(nbytes)
+
+    def synchronize(self):
+        """Wait for the operations queued on this device to complete."""
+        return None
+
     @property
     @abstractmethod
     def numpy_class(self):
@@ -26,11 +175,22 @@ class Base(ABC):
         pass
 
     def __enter__(self):
+        context = self.activate()
+        context.__enter__()
+        try:
+            _local.contexts.append(context)
+        except AttributeError:
+            _local.contexts = [context]
+        if self.exclusive_context:
+            _local.exclusive = getattr(_local, 'exclusive', 0) + 1
         _numpy.push_current_numpy(self.numpy_class)
         return self.numpy_class
 
     def __exit__(self, exc_type, exc_value, traceback):
         _numpy.pop_current_numpy()
+        if self.exclusive_context:
+            _local.exclusive -= 1
+        _local.contexts.pop().__exit__(exc_type, exc_value, traceback)
 
     @abstractmethod
     def transfer_array_content(self, dst, src):
@@ -1,4 +1,5 @@
 from .base import Base
+from .registry import register_device_class, register_link
 from .host import Host
 import numpy
 import cupy
@@ -52,55 +53,61 @@ class CUDAGPU(Base):
     array([[6., 6.],
            [6., 6.]])
     """
-    def __init__(self, device_id=0):
+    pool_max_bytes = 1 << 30
+    staging_pinned = True
+
+    @classmethod
+    def _validate_device_id(cls, device_id):
         if not isinstance(device_id, int):
             raise TypeError('an integer is required')
-        if device_id >= cupy.cuda.runtime.getDeviceCount():
+        if device_id >= cls.device_count():
             raise ValueError('This ID exceeds the number of'
                              ' cupy.cuda.runtime.getDeviceCount')
-        self._device_id = device_id
+
+    @classmethod
+    def _probe_device_count(cls):
+        return cupy.cuda.runtime.getDeviceCount()
 
     def can_transfer(self, obj):
         return isinstance(obj, (cupy.ndarray, numpy.ndarray))
 
     def can_transfer_to(self, obj, target):
         return (isinstance(obj, cupy.ndarray) and
-                type(target) in (CUDAGPU, Host))
+                isinstance(target, (CUDAGPU, Host)))
 
     def create_ndarray_on_device(self, obj):
-        prev_cuda = cupy.cuda.runtime.getDevice()
-        try:
-            cupy.cuda.runtime.setDevice(self._device_id)
+        with self.activate():
             if isinstance(obj, numpy.ndarray):
                 _order = "F" if not obj.flags.c_contiguous and\
                     obj.flags.f_contiguous else "C"
             else:
                 _order = "F" if not obj._c_contiguous and obj._f_contiguous else "C"
-            return cupy.empty(obj.shape, dtype=obj.dtype, order=_order)
-        finally:
-            cupy.cuda.runtime.setDevice(prev_cuda)
+            return self._empty(obj.shape, obj.dtype, _order)
 
     def transfer_array_content(self, dst, src):
-        prev_cuda = cupy.cuda.runtime.getDevice()
-        try:
-            cupy.cuda.runtime.setDevice(self._device_id)
+        with self.activate():
             if isinstance(src, cupy.ndarray):
                 cupy.copyto(dst, src)
             else:
                 dst.set(src)
-        finally:
-            cupy.cuda.runtime.setDevice(prev_cuda)
 
     def transfer_array_content_to(self, dst, src):
-        prev_cuda = cupy.cuda.runtime.getDevice()
-        try:
-            cupy.cuda.runtime.setDevice(self._device_id)
+        with self.activate():
             if isinstance(dst, cupy.ndarray):
                 cupy.copyto(dst, src)
             else:
                 cupy.asnumpy(src, out=dst)
-        finally:
-            cupy.cuda.runtime.setDevice(prev_cuda)
+
+    def activate(self):
+        # The current device of CuPy is thread-local.
+        return cupy.cuda.Device(self._device_id)
+
+    def alloc_staging(self, nbytes):
+        mem = cupy.cuda.alloc_pinned_memory(nbytes)
+        return numpy.frombuffer(mem, dtype=numpy.uint8, count=nbytes)
+
+    def synchronize(self):
+        cupy.cuda.Device(self._device_id).synchronize()
 
     @classmethod
     def get_device(self, ndarray):
@@ -110,3 +117,9 @@ class CUDAGPU(Base):
     @property
     def numpy_class(self):
         return cupy
+
+
+register_device_class(cupy.ndarray, CUDAGPU)
+register_link(Host, CUDAGPU, bandwidth=12e9, latency=10e-6)
+register_link(CUDAGPU, Host, bandwidth=12e9, latency=10e-6)
+register_link(CUDAGPU, CUDAGPU, bandwidth=20e9, latency=10e-6)
@@ -1,23 +1,13 @@
 # device types definitions
-from .host import Host
-import numpy
+from . import host  # noqa: F401
 try:
-    from .cuda import CUDAGPU
+    from . import cuda  # noqa: F401
 except ImportError:
-    CUDAGPU = None
+    pass
 try:
-    from .ve import VE
+    from . import ve  # noqa: F401
 except ImportError:
-    VE = None
+    pass
+from .registry import find_device_class
 
-
-def find_device_class(a):
-    if isinstance(a, numpy.ndarray):
-        return Host
-    if VE is not None:
-        if isinstance(a, VE().numpy_class.ndarray):
-            return VE
-    if CUDAGPU is not None:
-        if isinstance(a, CUDAGPU().numpy_class.ndarray):
-            return CUDAGPU
-    return None
+__all__ = ['find_device_class']
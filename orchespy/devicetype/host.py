@@ -1,4 +1,5 @@
 from .base import Base
+from .registry import register_device_class, register_link
 import numpy
 
 
@@ -30,11 +31,11 @@ class Host(Base):
         return isinstance(obj, numpy.ndarray)
 
     def can_transfer_to(self, obj, target):
-        return isinstance(obj, numpy.ndarray) and type(target) == Host
+        return isinstance(obj, numpy.ndarray) and isinstance(target, Host)
 
     def create_ndarray_on_device(self, obj):
         _order = "F" if not obj.flags.c_contiguous and obj.flags.f_contiguous else "C"
-        return numpy.empty(obj.shape, dtype=obj.dtype, order=_order)
+        return self._empty(obj.shape, obj.dtype, _order)
 
     def transfer_array_content(self, dst, src):
         numpy.copyto(dst, src)
@@ -50,3 +51,7 @@ class Host(Base):
     @property
     def numpy_class(self):
         return numpy
+
+
+register_device_class(numpy.ndarray, Host)
+register_link(Host, Host, bandwidth=10e9, latency=1e-6)
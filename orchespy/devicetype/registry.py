@@ -0,0 +1,107 @@
+_device_classes = {}
+_lookup_cache = {}
+
+
+def register_device_class(array_type, device_class):
+    """Register the devicetype class of an array type.
+
+    Arrays of `array_type` and its subclasses are recognized as arrays
+    on devices of `device_class` by the transfer functions and the
+    decorator. The built-in devicetypes register themselves when their
+    backend is imported.
+
+    Parameters
+    ----------
+    array_type : type
+        Array class, such as ``numpy.ndarray``.
+    device_class : type
+        Devicetype class derived from :class:`orchespy.devicetype.base.Base`.
+
+    Examples
+    --------
+    >>> import numpy
+    >>> from orchespy.devicetype import Host, register_device_class
+    >>> from orchespy.devicetype.find_device_class import find_device_class
+    >>>
+    >>> class TaggedArray(numpy.ndarray):
+    ...     pass
+    >>> class TaggedHost(Host):
+    ...     pass
+    >>> register_device_class(TaggedArray, TaggedHost)
+    >>> find_device_class(numpy.zeros(3).view(TaggedArray)).__name__
+    'TaggedHost'
+    """
+    _device_classes[array_type] = device_class
+    _lookup_cache.clear()
+
+
+def find_device_class(a):
+    cls = type(a)
+    try:
+        return _lookup_cache[cls]
+    except KeyError:
+        pass
+    device_class = None
+    for t in cls.__mro__:
+        device_class = _device_classes.get(t)
+        if device_class is not None:
+            break
+    _lookup_cache[cls] = device_class
+    return device_class
+
+
+class Link:
+    """Cost model of direct transfers between two devicetypes.
+
+    Parameters
+    ----------
+    bandwidth : float
+        Bytes per second.
+    latency : float
+        Seconds per transfer.
+    available : bool, optional
+        Whether the direct transfer is supported.
+    dtype_factor : dict, optional
+        Multiplier of the transferred bytes for some dtypes, for routes
+        that send a wider type on the wire.
+    """
+    __slots__ = ('bandwidth', 'latency', 'available', 'dtype_factor')
+
+    def __init__(self, bandwidth, latency, available=True, dtype_factor=None):
+        self.bandwidth = bandwidth
+        self.latency = latency
+        self.available = available
+        self.dtype_factor = dict(dtype_factor or {})
+
+    def cost(self, nbytes, dtype):
+        """Return the estimated seconds to transfer `nbytes` of `dtype`."""
+        factor = self.dtype_factor.get(str(dtype), 1.0)
+        return self.latency + nbytes * factor / self.bandwidth
+
+    def __repr__(self):
+        return 'Link(bandwidth={:.3g}, latency={:.3g}, available={})'.format(
+            self.bandwidth, self.latency, self.available)
+
+
+_links = {}
+
+
+def register_link(src_class, dst_class, bandwidth, latency, available=True,
+                  dtype_factor=None):
+    """Register the cost model of direct transfers between devicetypes.
+
+    Parameters
+    ----------
+    src_class, dst_class : type
+        Devicetype classes. A link from a class to itself describes
+        transfers between two different devices of the class.
+    bandwidth, latency, available, dtype_factor
+        See :class:`Link`.
+    """
+    _links[(src_class, dst_class)] = Link(bandwidth, latency, available,
+                                          dtype_factor)
+
+
+def get_link(src_class, dst_class):
+    """Return the :class:`Link` between devicetypes, or None."""
+    return _links.get((src_class, dst_class))
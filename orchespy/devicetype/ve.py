@@ -1,16 +1,29 @@
 from .base import Base
+from .registry import register_device_class, register_link
 from .host import Host
+from ..pool import get_staging_pool
+import contextlib
+import threading
 import numpy
 import nlcpy
 try:
     from .cuda import CUDAGPU
+    import cupy
 except ImportError:
     CUDAGPU = None
+    cupy = None
 try:
     from ._transfer import cunlc
 except ImportError:
     cunlc = None
 
+if CUDAGPU is None:
+    _transferable_types = (nlcpy.ndarray, numpy.ndarray)
+else:
+    _transferable_types = (nlcpy.ndarray, cupy.ndarray, numpy.ndarray)
+
+_context_lock = threading.RLock()
+
 
 class VE(Base):
     """Device type class for VE
@@ -60,14 +73,30 @@ class VE(Base):
     >>> z
     array([[6., 6.],
            [6., 6.]])
+
+    Notes
+    -----
+    The current VE node of NLCPy is shared by all threads, so the bodies
+    of decorated functions for VEs run one at a time in a process, even
+    for different VEs. Transfers and calls that such a body starts and
+    waits for run in its own thread. Use ``process=True`` of
+    :func:`orchespy.device` to run functions for several VEs in
+    parallel.
     """
-    def __init__(self, device_id=0):
+    pool_max_bytes = 1 << 30
+    exclusive_context = True
+
+    @classmethod
+    def _validate_device_id(cls, device_id):
         if not isinstance(device_id, int):
             raise TypeError('an integer is required')
-        if device_id >= nlcpy.venode.get_num_available_venodes():
+        if device_id >= cls.device_count():
             raise ValueError('This ID exceeds the number of'
                              ' nlcpy.venode.get_num_available_venodes')
-        self._device_id = device_id
+
+    @classmethod
+    def _probe_device_count(cls):
+        return nlcpy.venode.get_num_available_venodes()
 
     def _get_order(self, obj):
         if isinstance(obj, numpy.ndarray):
@@ -77,33 +106,25 @@ class VE(Base):
             return "F" if not obj._c_contiguous and obj._f_contiguous else "C"
 
     def can_transfer(self, obj):
-        if CUDAGPU is None:
-            return isinstance(obj, (nlcpy.ndarray, numpy.ndarray))
-        return isinstance(obj, (nlcpy.ndarray,
-                                CUDAGPU().numpy_class.ndarray,
-                                numpy.ndarray))
+        return isinstance(obj, _transferable_types)
+
+    def _copy_through_host(self, dst, src, gpu):
+        with get_staging_pool(gpu).borrow(src.shape, src.dtype,
+                                          self._get_order(src)) as buf:
+            src.get(out=buf)
+            dst.set(buf)
 
     def can_transfer_to(self, obj, target):
-        if CUDAGPU is None:
-            return isinstance(obj, nlcpy.ndarray) and\
-                type(target) in (VE, Host)
         return isinstance(obj, nlcpy.ndarray) and\
-            type(target) in (VE, CUDAGPU, Host)
+            isinstance(target, _target_types)
 
     def create_ndarray_on_device(self, obj):
-        prev_ve = nlcpy.venode.VE()
-        try:
-            nlcpy.venode.VE(self._device_id).use()
+        with self.activate():
             _order = self._get_order(obj)
-            return nlcpy.empty(obj.shape, dtype=obj.dtype, order=_order)
-        finally:
-            prev_ve.use()
+            return self._empty(obj.shape, obj.dtype, _order)
 
     def transfer_array_content(self, dst, src):
-        prev_ve = nlcpy.venode.VE()
-        try:
-            nlcpy.venode.VE(self._device_id).use()
-
+        with self.activate():
             if isinstance(src, nlcpy.ndarray):
                 try:
                     nlcpy.copyto(dst, src)
@@ -114,31 +135,26 @@ class VE(Base):
             elif cunlc is not None:
                 if CUDAGPU is None:
                     raise NotImplementedError('This communication is not supported.')
-                if isinstance(src, CUDAGPU().numpy_class.ndarray):
+                if isinstance(src, cupy.ndarray):
+                    gpu = CUDAGPU(src.device.id)
                     if src.nbytes != dst.nbytes:
                         if src.dtype == 'bool':
                             _order = self._get_order(src)
-                            tmp_buf = CUDAGPU().numpy_class.empty(src.shape,
-                                                                  dtype='i4',
-                                                                  order=_order)
-                            CUDAGPU().numpy_class.copyto(tmp_buf, src.astype('i4'))
+                            with gpu.activate():
+                                tmp_buf = gpu._empty(src.shape, 'i4', _order)
+                                cupy.copyto(tmp_buf, src)
                             cunlc.convert_from_cupy_to_nlcpy(dst, tmp_buf)
                         else:
-                            dst.set(src.get())
+                            self._copy_through_host(dst, src, gpu)
                     else:
                         cunlc.convert_from_cupy_to_nlcpy(dst, src)
                 else:
                     raise ValueError('src is an unsupported device')
             else:
                 raise ValueError('src is an unsupported device')
-        finally:
-            prev_ve.use()
 
     def transfer_array_content_to(self, dst, src):
-        prev_ve = nlcpy.venode.VE()
-        try:
-            nlcpy.venode.VE(self._device_id).use()
-
+        with self.activate():
             if isinstance(dst, nlcpy.ndarray):
                 try:
                     nlcpy.copyto(dst, src)
@@ -149,25 +165,39 @@ class VE(Base):
             elif cunlc is not None:
                 if CUDAGPU is None:
                     raise NotImplementedError('This communication is not supported.')
-                if isinstance(dst, CUDAGPU().numpy_class.ndarray):
+                if isinstance(dst, cupy.ndarray):
+                    gpu = CUDAGPU(dst.device.id)
                     if dst.nbytes != src.nbytes:
                         if dst.dtype == 'bool':
                             _order = self._get_order(src)
-                            tmp_buf = CUDAGPU().numpy_class.empty(src.shape,
-                                                                  dtype='i4',
-                                                                  order=_order)
+                            with gpu.activate():
+                                tmp_buf = gpu._empty(src.shape, 'i4', _order)
                             cunlc.convert_from_nlcpy_to_cupy(tmp_buf, src)
-                            CUDAGPU().numpy_class.copyto(dst, tmp_buf.astype('?'))
+                            with gpu.activate():
+                                cupy.copyto(dst, tmp_buf, casting='unsafe')
                         else:
-                            dst.set(src.get())
+                            self._copy_through_host(dst, src, gpu)
                     else:
                         cunlc.convert_from_nlcpy_to_cupy(dst, src)
                 else:
                     raise ValueError('dst is an unsupported device')
             else:
                 raise ValueError('dst is an unsupported device')
-        finally:
-            prev_ve.use()
+
+    @contextlib.contextmanager
+    def activate(self):
+        # The current VE of NLCPy is process-wide, so the operations of
+        # OrchesPy on a VE are run by one thread at a time.
+        with _context_lock:
+            prev_ve = nlcpy.venode.VE()
+            try:
+                nlcpy.venode.VE(self._device_id).use()
+                yield
+            finally:
+                prev_ve.use()
+
+    def synchronize(self):
+        nlcpy.venode.VE(self._device_id).synchronize()
 
     @classmethod
     def get_device(self, ndarray):
@@ -177,3 +207,20 @@ class VE(Base):
     @property
     def numpy_class(self):
         return nlcpy
+
+
+if CUDAGPU is None:
+    _target_types = (VE, Host)
+else:
+    _target_types = (VE, CUDAGPU, Host)
+register_device_class(nlcpy.ndarray, VE)
+register_link(Host, VE, bandwidth=10e9, latency=50e-6)
+register_link(VE, Host, bandwidth=10e9, latency=50e-6)
+# nlcpy.copyto does not copy between VE nodes.
+register_link(VE, VE, bandwidth=10e9, latency=50e-6, available=False)
+if CUDAGPU is not None:
+    # Bool arrays are sent as i4 by the cunlc routes.
+    register_link(CUDAGPU, VE, bandwidth=10e9, latency=50e-6,
+                  available=cunlc is not None, dtype_factor={'bool': 4.0})
+    register_link(VE, CUDAGPU, bandwidth=10e9, latency=50e-6,
+                  available=cunlc is not None, dtype_factor={'bool': 4.0})
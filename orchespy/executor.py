@@ -0,0 +1,409 @@
+import multiprocessing
+import pickle
+import threading
+import traceback
+from concurrent.futures import Future, ThreadPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy
+
+from .devicetype.base import _in_exclusive_context
+from .tree import flatten, unflatten
+
+
+_local = threading.local()
+
+# Device of this process when it is a worker of a ProcessExecutor.
+_worker_device = None
+
+
+def _call_now(fn, *args, **kwargs):
+    """Call `fn` in this thread and return a future of its result."""
+    future = Future()
+    try:
+        future.set_result(fn(*args, **kwargs))
+    except BaseException as e:
+        future.set_exception(e)
+    return future
+
+
+class DeviceExecutor:
+    """Thread pool with worker threads for each device.
+
+    Calls submitted for a device run on the workers of the device, at
+    most `max_workers` at a time and in the order they were submitted,
+    so that calls for different devices run concurrently and the calls
+    for one device are limited. Functions decorated with
+    :func:`orchespy.device` make their device current while they run,
+    which is safe under threads. Functions for VEs run one at a time,
+    as NLCPy has one current VE for the whole process.
+
+    A call submitted from the worker of the same device, or from a
+    function running on a VE, runs at once in the calling thread, so
+    that nested calls do not deadlock.
+
+    Parameters
+    ----------
+    max_workers : int, optional
+        Worker threads of each device. See :meth:`set_max_workers`.
+
+    Examples
+    --------
+    >>> import numpy
+    >>> from orchespy import device
+    >>> from orchespy.devicetype import CUDAGPU, VE
+    >>> from orchespy.executor import default_executor
+    >>>
+    >>> @device(VE)
+    ... def on_ve(x):
+    ...     return x * 2
+    >>>
+    >>> @device(CUDAGPU)
+    ... def on_gpu(x):
+    ...     return x * 3
+    >>>
+    >>> x = numpy.ones(1000)
+    >>> f1 = default_executor.submit(VE(), on_ve, x)
+    >>> f2 = default_executor.submit(CUDAGPU(), on_gpu, x)
+    >>> y1, y2 = f1.result(), f2.result()
+    """
+    def __init__(self, max_workers=1, thread_name_prefix='orchespy-device'):
+        self.max_workers = max_workers
+        self._thread_name_prefix = thread_name_prefix
+        self._lock = threading.Lock()
+        self._workers = {}
+        self._limits = {}
+
+    def _get_worker(self, target):
+        worker = self._workers.get(target)
+        if worker is None:
+            with self._lock:
+                worker = self._workers.get(target)
+                if worker is None:
+                    worker = ThreadPoolExecutor(
+                        max_workers=self._limits.get(target,
+                                                     self.max_workers),
+                        thread_name_prefix='{}-{}'.format(
+                            self._thread_name_prefix, target))
+                    self._workers[target] = worker
+        return worker
+
+    def set_max_workers(self, target, max_workers):
+        """Limit the calls for a device that run at the same time.
+
+        Calls already submitted run on the previous workers.
+
+        Parameters
+        ----------
+        target : devicetype
+            Device to limit.
+        max_workers : int
+            Worker threads of `target`.
+        """
+        if isinstance(target, type):
+            target = target()
+        if max_workers < 1:
+            raise ValueError('max_workers must be at least 1.')
+        with self._lock:
+            self._limits[target] = max_workers
+            worker = self._workers.pop(target, None)
+        if worker is not None:
+            worker.shutdown(wait=False)
+
+    @staticmethod
+    def _run(target, fn, args, kwargs):
+        _local.device = target
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _local.device = None
+
+    def submit(self, target, fn, *args, **kwargs):
+        """Run ``fn(*args, **kwargs)`` on the worker of a device.
+
+        Parameters
+        ----------
+        target : devicetype
+            Device whose worker runs the call.
+        fn : callable
+            Function to call, typically decorated with
+            :func:`orchespy.device` for `target`.
+
+        Returns
+        -------
+        concurrent.futures.Future
+            Future of the return value of `fn`.
+        """
+        if isinstance(target, type):
+            target = target()
+        if (getattr(_local, 'device', None) == target
+                or _in_exclusive_context()):
+            return _call_now(fn, *args, **kwargs)
+        return self._get_worker(target).submit(self._run, target, fn, args,
+                                               kwargs)
+
+    def shutdown(self, wait=True):
+        """Stop the workers after the submitted calls finish.
+
+        Workers are created again by later calls of :meth:`submit`.
+        """
+        with self._lock:
+            workers = list(self._workers.values())
+            self._workers.clear()
+        for worker in workers:
+            worker.shutdown(wait=wait)
+
+
+default_executor = DeviceExecutor()
+
+
+class _SharedArray:
+    """Descriptor of a host array passed through shared memory."""
+    __slots__ = ('name', 'shape', 'dtype')
+
+    def __init__(self, name, shape, dtype):
+        self.name = name
+        self.shape = shape
+        self.dtype = dtype
+
+    def __getstate__(self):
+        return (self.name, self.shape, self.dtype)
+
+    def __setstate__(self, state):
+        self.name, self.shape, self.dtype = state
+
+
+def _share(obj, blocks):
+    """Replace the host arrays in `obj` by shared memory descriptors."""
+    leaves, treedef = flatten(obj)
+    for i, v in enumerate(leaves):
+        if type(v) is numpy.ndarray and v.nbytes > 0 and not v.dtype.hasobject:
+            shm = shared_memory.SharedMemory(create=True, size=v.nbytes)
+            blocks.append(shm)
+            numpy.copyto(numpy.ndarray(v.shape, v.dtype, buffer=shm.buf), v)
+            leaves[i] = _SharedArray(shm.name, v.shape, v.dtype.str)
+    return unflatten(treedef, leaves)
+
+
+def _attach(obj, blocks, copy):
+    """Replace shared memory descriptors in `obj` by host arrays."""
+    leaves, treedef = flatten(obj)
+    for i, v in enumerate(leaves):
+        if isinstance(v, _SharedArray):
+            shm = shared_memory.SharedMemory(name=v.name)
+            blocks.append(shm)
+            ary = numpy.ndarray(v.shape, v.dtype, buffer=shm.buf)
+            leaves[i] = ary.copy() if copy else ary
+    return unflatten(treedef, leaves)
+
+
+def _release(blocks, unlink):
+    for shm in blocks:
+        try:
+            shm.close()
+        except BufferError:
+            # The worker function kept a view of the block; the mapping
+            # is released when the view is garbage-collected.
+            pass
+        if unlink:
+            shm.unlink()
+
+
+def _worker_main(conn, target):
+    global _worker_device
+    _worker_device = target
+    while True:
+        try:
+            request = conn.recv()
+        except EOFError:
+            break
+        if request is None:
+            break
+        fn, args, kwargs = request
+        attached = []
+        shared = []
+        try:
+            args, kwargs = _attach((args, kwargs), attached, copy=False)
+            result = _share(fn(*args, **kwargs), shared)
+            reply = (True, result)
+        except BaseException as e:
+            _release(shared, unlink=True)
+            shared = []
+            try:
+                pickle.dumps(e)
+                reply = (False, e)
+            except Exception:
+                reply = (False, RuntimeError(traceback.format_exc()))
+        _release(attached, unlink=False)
+        try:
+            conn.send(reply)
+        except Exception:
+            # The reply cannot be pickled; nothing has been written yet.
+            _release(shared, unlink=True)
+            shared = []
+            conn.send((False, RuntimeError(
+                'The result of {} cannot be sent from the worker:\n{}'
+                .format(getattr(fn, '__qualname__', fn),
+                        traceback.format_exc()))))
+        # The parent unlinks the blocks of the result.
+        _release(shared, unlink=False)
+    conn.close()
+
+
+class _NotDelivered(Exception):
+    """The worker exited before it received a call."""
+
+
+class _Worker:
+    def __init__(self, context, target):
+        self.target = target
+        self.broken = False
+        self.conn, child = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main, args=(child, target), daemon=True,
+            name='orchespy-worker-{}'.format(target))
+        self.process.start()
+        child.close()
+        self.thread = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix='orchespy-process')
+
+    def call(self, fn, args, kwargs):
+        blocks = []
+        try:
+            request = (fn, _share(args, blocks), _share(kwargs, blocks))
+            try:
+                self.conn.send(request)
+            except (BrokenPipeError, ConnectionResetError) as e:
+                self.broken = True
+                raise _NotDelivered() from e
+            try:
+                ok, reply = self.conn.recv()
+            except (EOFError, OSError) as e:
+                # The worker is replaced for the next call.
+                self.broken = True
+                raise RuntimeError('The worker process of {} exited.'.format(
+                    self.target)) from e
+        finally:
+            _release(blocks, unlink=True)
+        if not ok:
+            raise reply
+        blocks = []
+        try:
+            return _attach(reply, blocks, copy=True)
+        finally:
+            _release(blocks, unlink=True)
+
+    def stop(self, wait):
+        self.thread.shutdown(wait=wait)
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        if wait or self.broken:
+            self.process.join(None if wait else 5)
+        self.conn.close()
+
+
+class ProcessExecutor:
+    """Long-lived worker processes, one for each device.
+
+    Each worker process is bound to one device and runs the calls
+    submitted for it one at a time, so Python code of calls for
+    different devices runs in parallel without sharing the GIL. The
+    device context, buffer pools and caches of a worker are kept between
+    calls.
+
+    Host arrays in the arguments and return values are copied into
+    :mod:`multiprocessing.shared_memory` blocks and passed by name
+    instead of being pickled. Other objects are pickled, and the
+    function is pickled by reference, so it must be defined at the top
+    level of a module that the worker can import.
+
+    Inside a worker, functions decorated with ``process=True`` run in the
+    worker itself.
+
+    Parameters
+    ----------
+    mp_context : str, optional
+        Start method of the worker processes. ``'spawn'`` does not
+        inherit the device state of the parent process.
+
+    Examples
+    --------
+    >>> # mymodule.py
+    >>> from orchespy import device
+    >>> from orchespy.devicetype import Host
+    >>>
+    >>> @device(Host, process=True)
+    ... def scale(x, factor):
+    ...     return x * factor
+    >>>
+    >>> # main script
+    >>> import numpy
+    >>> import mymodule
+    >>> if __name__ == '__main__':
+    ...     y = mymodule.scale(numpy.ones(1000), 2.0)
+    """
+    def __init__(self, mp_context='spawn'):
+        self._context = multiprocessing.get_context(mp_context)
+        self._lock = threading.Lock()
+        self._workers = {}
+
+    def _get_worker(self, target):
+        with self._lock:
+            worker = self._workers.get(target)
+            if (worker is None or worker.broken or
+                    not worker.process.is_alive()):
+                if worker is not None:
+                    worker.stop(wait=False)
+                worker = _Worker(self._context, target)
+                self._workers[target] = worker
+        return worker
+
+    def submit(self, target, fn, *args, **kwargs):
+        """Run ``fn(*args, **kwargs)`` in the worker process of a device.
+
+        Parameters
+        ----------
+        target : devicetype
+            Device whose worker runs the call.
+        fn : callable
+            Function to call. It is pickled by reference.
+
+        Returns
+        -------
+        concurrent.futures.Future
+            Future of the return value of `fn`.
+        """
+        if isinstance(target, type):
+            target = target()
+        worker = self._get_worker(target)
+        return worker.thread.submit(self._call, target, worker, fn, args,
+                                    kwargs)
+
+    def _call(self, target, worker, fn, args, kwargs):
+        try:
+            return worker.call(fn, args, kwargs)
+        except _NotDelivered:
+            # The worker had exited; the call is run by a new worker.
+            worker = self._get_worker(target)
+            try:
+                return worker.thread.submit(worker.call, fn, args,
+                                            kwargs).result()
+            except _NotDelivered:
+                raise RuntimeError('The worker process of {} exited.'.format(
+                    target)) from None
+
+    def shutdown(self, wait=True):
+        """Stop the worker processes after the submitted calls finish.
+
+        Workers are started again by later calls of :meth:`submit`.
+        """
+        with self._lock:
+            workers = list(self._workers.values())
+            self._workers.clear()
+        for worker in workers:
+            worker.stop(wait)
+
+
+default_process_executor = ProcessExecutor()
@@ -0,0 +1,255 @@
+import contextlib
+import os
+from concurrent import futures
+
+import numpy
+from numpy.lib import format as _format
+
+from .devicetype import Host
+from .devicetype.find_device_class import find_device_class
+from .pool import get_staging_pool
+from .transfer import (transfer_array_content, _chunk_slices,
+                       _get_contiguous, _get_staging_executor,
+                       _stream_to_device)
+
+
+_DEFAULT_CHUNK_BYTES = 1 << 24
+
+
+@contextlib.contextmanager
+def _open(file, mode):
+    if hasattr(file, 'read') or hasattr(file, 'write'):
+        yield file
+    else:
+        with open(os.fspath(file), mode) as f:
+            yield f
+
+
+def _bytes_of(ary):
+    return ary.ravel(order='K').view(numpy.uint8)
+
+
+def _readinto(f, buf):
+    view = _bytes_of(buf)
+    filled = 0
+    while filled < view.nbytes:
+        n = f.readinto(view[filled:])
+        if not n:
+            raise ValueError('The file is shorter than the array.')
+        filled += n
+
+
+def _read_npy_header(f):
+    version = _format.read_magic(f)
+    if version == (1, 0):
+        shape, fortran_order, dtype = _format.read_array_header_1_0(f)
+    elif version == (2, 0):
+        shape, fortran_order, dtype = _format.read_array_header_2_0(f)
+    else:
+        raise ValueError('Unsupported .npy format version {}.{}.'.format(
+            *version))
+    if dtype.hasobject:
+        raise ValueError('Object arrays cannot be loaded to a device.')
+    return shape, dtype, 'F' if fortran_order else 'C'
+
+
+def _read_cast(f, buf, dtype):
+    # Read a chunk stored as `dtype` and convert it into `buf`.
+    tmp = numpy.empty_like(buf, dtype=dtype)
+    _readinto(f, tmp)
+    numpy.copyto(buf, tmp, casting='unsafe')
+
+
+def _slices(ary, chunk_bytes):
+    return _chunk_slices(ary, ary, chunk_bytes) or [(Ellipsis,)]
+
+
+def _load(target, shape, dtype, order, fill, chunk_bytes):
+    with target.activate():
+        dst = target._empty(shape, dtype, order)
+    if dst.size == 0:
+        return dst
+    slices = _slices(dst, chunk_bytes)
+    if isinstance(target, Host):
+        for sl in slices:
+            fill(sl, dst[sl])
+    else:
+        _stream_to_device(transfer_array_content, target, dst, slices,
+                          lambda i, buf: fill(slices[i], buf))
+    return dst
+
+
+def load_to_device(source, target, dtype=None, shape=None, offset=0,
+                   chunk_bytes=_DEFAULT_CHUNK_BYTES):
+    """Load an array from a file or a memory map to a device.
+
+    The data is read in chunks of about `chunk_bytes` through two pooled
+    host staging buffers, so that the host holds only two chunks at a
+    time, and reading the next chunk overlaps the copy of the previous
+    one to the device.
+
+    Parameters
+    ----------
+    source : str, path-like, file object or numpy.ndarray
+        A ``.npy`` file, a raw binary file, or a host array such as a
+        ``numpy.memmap``. A file is read as ``.npy`` if it starts with
+        the ``.npy`` magic string.
+    target : devicetype
+        Device where the array is created.
+    dtype : data-type, optional
+        Data type of a raw binary file. Required for raw files. For a
+        ``.npy`` file or a host array, the data type of the array on the
+        device, which the data is converted to chunk by chunk.
+    shape : int or tuple of ints, optional
+        Shape of a raw binary file in C order. By default, a 1-D array
+        of the rest of the file after `offset`.
+    offset : int, optional
+        Bytes to skip at the beginning of a raw binary file.
+    chunk_bytes : int, optional
+        Size of the chunks.
+
+    Returns
+    -------
+    ndarray:
+        N-dimension array on the `target` device.
+
+    Examples
+    --------
+    >>> import numpy
+    >>> import orchespy
+    >>> from orchespy.devicetype import VE
+    >>> numpy.save('x.npy', numpy.arange(10.0))
+    >>> x = orchespy.load_to_device('x.npy', VE())
+    >>> x
+    array([0., 1., 2., 3., 4., 5., 6., 7., 8., 9.])
+    """
+    if isinstance(target, type):
+        target = target()
+    if isinstance(source, numpy.ndarray):
+        return _load(target, source.shape,
+                     source.dtype if dtype is None else numpy.dtype(dtype),
+                     _get_contiguous(source) or 'C',
+                     lambda sl, buf: numpy.copyto(buf, source[sl],
+                                                  casting='unsafe'),
+                     chunk_bytes)
+
+    with _open(source, 'rb') as f:
+        start = f.tell()
+        if f.read(len(_format.MAGIC_PREFIX)) == _format.MAGIC_PREFIX:
+            f.seek(start)
+            shape, file_dtype, order = _read_npy_header(f)
+            if dtype is not None and numpy.dtype(dtype) != file_dtype:
+                dtype = numpy.dtype(dtype)
+                return _load(target, tuple(shape), dtype, order,
+                             lambda sl, buf: _read_cast(f, buf, file_dtype),
+                             chunk_bytes)
+            dtype = file_dtype
+        else:
+            if dtype is None:
+                raise ValueError('dtype is required to load a raw binary'
+                                 ' file.')
+            dtype = numpy.dtype(dtype)
+            order = 'C'
+            if shape is None:
+                size = f.seek(0, os.SEEK_END) - start - offset
+                shape = (size // dtype.itemsize,)
+            elif isinstance(shape, int):
+                shape = (shape,)
+            f.seek(start + offset)
+        return _load(target, tuple(shape), dtype, order,
+                     lambda sl, buf: _readinto(f, buf), chunk_bytes)
+
+
+def _write_npy_header(f, ary, order):
+    header = {
+        'descr': _format.dtype_to_descr(ary.dtype),
+        'fortran_order': order == 'F' and ary.ndim > 1,
+        'shape': ary.shape,
+    }
+    try:
+        _format.write_array_header_1_0(f, header)
+    except ValueError:
+        _format.write_array_header_2_0(f, header)
+
+
+def _write_chunks(f, src, srcdev, slices):
+    if isinstance(srcdev, Host):
+        for sl in slices:
+            f.write(_bytes_of(src[sl]))
+        return
+
+    # Device to file: the previous chunk is written from one staging
+    # buffer while the next chunk is copied into the other one.
+    order = _get_contiguous(src)
+    chunks = [src[sl] for sl in slices]
+    nbytes = max(c.nbytes for c in chunks)
+    pool = get_staging_pool(srcdev)
+    executor = _get_staging_executor()
+    pending = []
+    with pool.borrow((nbytes,)) as buf0, pool.borrow((nbytes,)) as buf1:
+        buffers = [buf0, buf1]
+        try:
+            for i, chunk in enumerate(chunks):
+                if i >= 2:
+                    pending[i - 2].result()
+                buf = buffers[i % 2][:chunk.nbytes].view(chunk.dtype)
+                buf = buf.reshape(chunk.shape, order=order)
+                transfer_array_content(buf, chunk)
+                pending.append(executor.submit(f.write, _bytes_of(buf)))
+            for p in pending[-2:]:
+                p.result()
+        finally:
+            # The buffers return to the pool only after writing stops.
+            futures.wait(pending)
+
+
+def save_from_device(file, src, raw=False, chunk_bytes=_DEFAULT_CHUNK_BYTES):
+    """Save an array on a device to a file or a memory map.
+
+    The array is copied to the host in chunks of about `chunk_bytes`
+    through two pooled host staging buffers, so that the host holds only
+    two chunks at a time.
+
+    Parameters
+    ----------
+    file : str, path-like, file object or numpy.ndarray
+        Destination. A host array such as a ``numpy.memmap`` of the same
+        shape and dtype receives the data in place.
+    src : array_like
+        N-dimension array on a device or host.
+    raw : bool, optional
+        Write only the data, in the memory order of `src`, without the
+        ``.npy`` header.
+    chunk_bytes : int, optional
+        Size of the chunks.
+
+    Examples
+    --------
+    >>> import numpy
+    >>> import orchespy
+    >>> import nlcpy
+    >>> x = nlcpy.arange(10.0)
+    >>> orchespy.save_from_device('x.npy', x)
+    >>> numpy.load('x.npy')
+    array([0., 1., 2., 3., 4., 5., 6., 7., 8., 9.])
+    """
+    srctype = find_device_class(src)
+    if srctype is None:
+        raise ValueError('The device could not be found from src.')
+    srcdev = srctype.get_device(src)
+    if isinstance(file, numpy.ndarray):
+        transfer_array_content(file, src, chunk_bytes=chunk_bytes)
+        if hasattr(file, 'flush'):
+            file.flush()
+        return
+
+    order = _get_contiguous(src)
+    if order is None:
+        with srcdev.activate():
+            src = srcdev.numpy_class.ascontiguousarray(src)
+        order = 'C'
+    with _open(file, 'wb') as f:
+        if not raw:
+            _write_npy_header(f, src, order)
+        if src.size:
+            _write_chunks(f, src, srcdev, _slices(src, chunk_bytes))
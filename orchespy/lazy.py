@@ -0,0 +1,103 @@
+import threading
+
+
+class LazyArray:
+    """Result of a decorated function whose transfer is deferred.
+
+    The array is transferred to the target device when it is first used
+    through ``__array__``, indexing or :meth:`get`. Attributes that do
+    not depend on the content, such as ``shape`` and ``dtype``, are read
+    from the source array without transferring it.
+
+    Parameters
+    ----------
+    src : array_like
+        N-dimension array on a device or host to be transferred.
+    target : devicetype
+        Device where the array is transferred on first use.
+
+    Examples
+    --------
+    >>> from orchespy import device
+    >>> from orchespy.devicetype import Host, VE
+    >>>
+    >>> @device(VE, numpy_module_arg='xp', return_to=Host, lazy=True)
+    ... def create(xp):
+    ...     return xp.arange(6).reshape(2, 3)
+    >>>
+    >>> x = create()
+    >>> x.shape
+    (2, 3)
+    >>> x[1]
+    array([3, 4, 5])
+    """
+    _metadata = ('shape', 'dtype', 'ndim', 'size', 'nbytes', 'itemsize')
+
+    def __init__(self, src, target):
+        self._src = src
+        self._target = target
+        self._value = None
+        self._lock = threading.Lock()
+
+    @property
+    def materialized(self):
+        """Whether the array has been transferred."""
+        return self._value is not None
+
+    def _source(self):
+        # The transferred array, or the source if it is not transferred.
+        with self._lock:
+            return self._src if self._value is None else self._value
+
+    def get(self):
+        """Transfer the array if needed and return it.
+
+        Returns
+        -------
+        ndarray:
+            N-dimension array on the target device.
+        """
+        from .transfer import transfer_array
+
+        value = self._value
+        if value is None:
+            with self._lock:
+                if self._value is None:
+                    self._value = transfer_array(self._src, self._target)
+                    self._src = None
+                value = self._value
+        return value
+
+    def __array__(self, dtype=None, copy=None):
+        # Without copy=True, the transferred array itself is returned and
+        # must not be written to.
+        value = self.get().__array__()
+        if dtype is not None and value.dtype != dtype:
+            if copy is False:
+                raise ValueError('Unable to avoid a copy to convert the'
+                                 ' dtype.')
+            return value.astype(dtype)
+        if copy:
+            return value.copy()
+        return value
+
+    def __getitem__(self, key):
+        return self.get()[key]
+
+    def __len__(self):
+        return len(self._src if self._value is None else self._value)
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        if name in LazyArray._metadata and self._value is None:
+            src = self._src
+            if src is not None:
+                return getattr(src, name)
+        return getattr(self.get(), name)
+
+    def __repr__(self):
+        if self._value is None:
+            return '<LazyArray shape={} dtype={} not transferred>'.format(
+                self._src.shape, self._src.dtype)
+        return repr(self._value)
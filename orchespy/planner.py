@@ -0,0 +1,160 @@
+import heapq
+import time
+
+from .devicetype import Host
+from .devicetype.find_device_class import find_device_class
+from .devicetype.registry import get_link, register_link
+
+
+class Route:
+    """Route of a transfer chosen by :func:`plan_route`.
+
+    Attributes
+    ----------
+    hops : tuple of devicetype
+        Devices the data passes through, from the source device to the
+        target device.
+    cost : float
+        Estimated seconds of the transfer.
+    """
+    __slots__ = ('hops', 'cost')
+
+    def __init__(self, hops, cost):
+        self.hops = tuple(hops)
+        self.cost = cost
+
+    @property
+    def staged(self):
+        """Whether the route passes through an intermediate device."""
+        return len(self.hops) > 2
+
+    def __repr__(self):
+        return 'Route({}, cost={:.3g}s)'.format(
+            ' -> '.join(repr(d) for d in self.hops), self.cost)
+
+
+def _edge_cost(src, dst, nbytes, dtype):
+    if src == dst:
+        return 0.0
+    link = get_link(type(src), type(dst))
+    if link is None or not link.available:
+        return None
+    return link.cost(nbytes, dtype)
+
+
+def _plan(srcdev, target, nbytes, dtype):
+    nodes = [srcdev, target]
+    host = Host()
+    if host not in nodes:
+        nodes.append(host)
+
+    best = {srcdev: 0.0}
+    prev = {}
+    heap = [(0.0, 0, srcdev)]
+    count = 1
+    while heap:
+        cost, _, node = heapq.heappop(heap)
+        if node == target:
+            break
+        if cost > best[node]:
+            continue
+        for nxt in nodes:
+            if nxt == node:
+                continue
+            edge = _edge_cost(node, nxt, nbytes, dtype)
+            if edge is None:
+                continue
+            if cost + edge < best.get(nxt, float('inf')):
+                best[nxt] = cost + edge
+                prev[nxt] = node
+                heapq.heappush(heap, (cost + edge, count, nxt))
+                count += 1
+    if target not in best:
+        return None
+    hops = [target]
+    while hops[-1] != srcdev:
+        hops.append(prev[hops[-1]])
+    return Route(reversed(hops), best[target])
+
+
+def plan_route(src, target):
+    """Return the cheapest route to transfer an array to a target device.
+
+    Devicetypes form a graph whose edges are the direct transfers
+    registered with :func:`orchespy.devicetype.registry.register_link`.
+    The cost of an edge is its latency plus the bytes of `src` divided by
+    its bandwidth, and the route may pass through the host.
+
+    Parameters
+    ----------
+    src : array_like
+        N-dimension array on a device or host to be transferred.
+    target : devicetype
+        Target device.
+
+    Returns
+    -------
+    Route or None
+        The cheapest route, or None if `src` is not an array or cannot
+        reach `target`.
+
+    Examples
+    --------
+    >>> import cupy
+    >>> from orchespy.devicetype import VE
+    >>> from orchespy.planner import plan_route
+    >>> plan_route(cupy.ones(1 << 20, dtype=bool), VE())
+    Route(CUDAGPU(0) -> Host(0) -> VE(0), cost=0.000252s)
+    """
+    if isinstance(target, type):
+        target = target()
+    srctype = find_device_class(src)
+    if srctype is None:
+        return None
+    return _plan(srctype.get_device(src), target, src.nbytes, src.dtype)
+
+
+def calibrate(srcdev, target, nbytes=1 << 24, repeat=3):
+    """Measure a direct link and update its cost model.
+
+    Transfers of ``nbytes`` and of one byte are timed, and the bandwidth
+    and latency of the link from the devicetype of `srcdev` to the
+    devicetype of `target` are replaced by the measured values.
+
+    Parameters
+    ----------
+    srcdev, target : devicetype
+        Devices at both ends of the link.
+    nbytes : int, optional
+        Size of the array used to measure the bandwidth.
+    repeat : int, optional
+        Number of measurements; the fastest one is used.
+
+    Returns
+    -------
+    Link
+        The updated link.
+    """
+    from .transfer import _transfer_direct
+
+    if isinstance(srcdev, type):
+        srcdev = srcdev()
+    if isinstance(target, type):
+        target = target()
+
+    def measure(n):
+        with srcdev.activate():
+            src = srcdev.numpy_class.zeros(n, dtype='u1')
+        elapsed = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            _transfer_direct(src, srcdev, target, None)
+            elapsed.append(time.perf_counter() - start)
+        return min(elapsed)
+
+    latency = measure(1)
+    seconds = max(measure(nbytes) - latency, 1e-9)
+    old = get_link(type(srcdev), type(target))
+    register_link(type(srcdev), type(target), nbytes / seconds, latency,
+                  dtype_factor=None if old is None else old.dtype_factor)
+    return get_link(type(srcdev), type(target))
@@ -0,0 +1,405 @@
+import contextlib
+import mmap
+import sys
+import threading
+import weakref
+
+import numpy
+
+
+class BufferPool:
+    """Pool of device buffers reused by ``create_ndarray_on_device``.
+
+    Buffers are keyed by ``(nbytes, dtype, order)``. An array taken from
+    the pool is a view of a pooled buffer, and the buffer returns to the
+    pool through a weakref finalizer when the array is garbage-collected.
+    A buffer that is still referenced by other views at that time is not
+    reused.
+
+    Parameters
+    ----------
+    xp : module
+        NumPy-compatible package used to allocate buffers.
+    max_bytes : int, optional
+        Upper limit of the bytes of idle buffers kept in the pool.
+        0 disables pooling.
+    min_bytes : int, optional
+        Arrays smaller than this size are allocated without the pool.
+
+    Examples
+    --------
+    >>> import numpy
+    >>> import orchespy
+    >>> from orchespy.devicetype import Host
+    >>> from orchespy.pool import get_pool
+    >>>
+    >>> pool = get_pool(Host())
+    >>> pool.max_bytes = 1 << 20
+    >>> for _ in range(3):
+    ...     y = orchespy.transfer_array(numpy.ones(1000), Host())
+    ...     del y
+    >>> pool.stats()['hits']
+    2
+    """
+    def __init__(self, xp, max_bytes=0, min_bytes=0):
+        self._xp = xp
+        self.max_bytes = max_bytes
+        self.min_bytes = min_bytes
+        self._lock = threading.Lock()
+        self._free = {}
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._discarded = 0
+        self._unpooled = 0
+
+    def empty(self, shape, dtype, order='C'):
+        """Return a new array, reusing a pooled buffer if possible.
+
+        Parameters
+        ----------
+        shape : tuple of ints
+            Shape of the array.
+        dtype : data-type
+            Data type of the array.
+        order : {'C', 'F'}, optional
+            Memory layout of the array.
+
+        Returns
+        -------
+        ndarray:
+            Uninitialized array on the device of the pool.
+        """
+        dtype = numpy.dtype(dtype)
+        size = 1
+        for n in shape:
+            size *= n
+        nbytes = size * dtype.itemsize
+        if nbytes == 0 or nbytes < self.min_bytes or self.max_bytes <= 0:
+            with self._lock:
+                self._unpooled += 1
+            return self._xp.empty(shape, dtype=dtype, order=order)
+
+        key = (nbytes, dtype, order)
+        buf = None
+        with self._lock:
+            bucket = self._free.get(key)
+            while bucket:
+                buf, baseline = bucket.pop()
+                self._bytes -= nbytes
+                if sys.getrefcount(buf) == baseline:
+                    break
+                # Still referenced by a view created from the array.
+                self._discarded += 1
+                buf = None
+            if buf is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+        if buf is None:
+            buf = self._xp.empty(size, dtype=dtype)
+            baseline = sys.getrefcount(buf)
+        ary = buf.reshape(shape, order=order)
+        weakref.finalize(ary, self._release, key, buf, baseline)
+        return ary
+
+    def _release(self, key, buf, baseline):
+        with self._lock:
+            if self._bytes + key[0] > self.max_bytes:
+                self._discarded += 1
+                return
+            self._free.setdefault(key, []).append((buf, baseline))
+            self._bytes += key[0]
+
+    def trim(self, max_bytes=0):
+        """Free idle buffers until the pool holds at most `max_bytes`.
+
+        Parameters
+        ----------
+        max_bytes : int, optional
+            Bytes of idle buffers to keep.
+
+        Returns
+        -------
+        int
+            Bytes freed.
+        """
+        freed = 0
+        with self._lock:
+            for key in list(self._free):
+                bucket = self._free[key]
+                while bucket and self._bytes > max_bytes:
+                    bucket.pop()
+                    self._bytes -= key[0]
+                    freed += key[0]
+                if not bucket:
+                    del self._free[key]
+        return freed
+
+    def stats(self):
+        """Return pool statistics.
+
+        Returns
+        -------
+        dict
+            ``hits``, ``misses``, ``discarded``, the number of
+            ``unpooled`` allocations bypassing the pool, the number of
+            idle ``buffers`` and their ``bytes``.
+        """
+        with self._lock:
+            return {
+                'hits': self._hits,
+                'misses': self._misses,
+                'discarded': self._discarded,
+                'unpooled': self._unpooled,
+                'buffers': sum(len(b) for b in self._free.values()),
+                'bytes': self._bytes,
+            }
+
+    def reset_stats(self):
+        """Reset the counters returned by :meth:`stats`."""
+        with self._lock:
+            self._hits = 0
+            self._misses = 0
+            self._discarded = 0
+            self._unpooled = 0
+
+
+_PAGE_SIZE = mmap.PAGESIZE
+
+
+def aligned_empty(nbytes):
+    """Allocate a page-aligned host buffer.
+
+    Returns
+    -------
+    numpy.ndarray
+        1-D uint8 array of `nbytes` starting at a page boundary.
+    """
+    raw = numpy.empty(nbytes + _PAGE_SIZE, dtype=numpy.uint8)
+    offset = -raw.ctypes.data % _PAGE_SIZE
+    return raw[offset:offset + nbytes]
+
+
+class StagingPool:
+    """Pool of host buffers that stage transfers through the host.
+
+    Buffers are bucketed by size class, the power of two not smaller
+    than the requested size and the page size, so that a buffer serves
+    requests of similar sizes. A buffer is borrowed for the duration of
+    a ``with`` block and returned to the pool at its end.
+
+    Parameters
+    ----------
+    alloc : callable
+        Called as ``alloc(nbytes)`` to allocate a page-aligned 1-D uint8
+        host array, such as ``alloc_staging`` of a devicetype.
+    max_bytes : int, optional
+        Upper limit of the bytes of idle buffers kept in the pool.
+        Larger buffers are freed when they are returned.
+    prefault : bool, optional
+        Touch every page of a new buffer when it is allocated.
+
+    Examples
+    --------
+    >>> import nlcpy
+    >>> import orchespy
+    >>> from orchespy.devicetype import VE
+    >>> from orchespy.pool import get_staging_pool
+    >>>
+    >>> src = nlcpy.arange(1000.0)
+    >>> dst = nlcpy.empty(1000)
+    >>> pool = get_staging_pool(VE())
+    >>> with pool.borrow((1000,), 'f8') as buf:
+    ...     orchespy.transfer_array_content(buf, src)
+    ...     orchespy.transfer_array_content(dst, buf)
+    """
+    def __init__(self, alloc, max_bytes=1 << 28, prefault=False):
+        self._alloc = alloc
+        self.max_bytes = max_bytes
+        self.prefault = prefault
+        self._lock = threading.Lock()
+        self._free = {}
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._discarded = 0
+
+    def _acquire(self, nbytes):
+        size = max(_PAGE_SIZE, 1 << max(nbytes - 1, 0).bit_length())
+        with self._lock:
+            bucket = self._free.get(size)
+            if bucket:
+                self._bytes -= size
+                self._hits += 1
+                return bucket.pop()
+            self._misses += 1
+        buf = self._alloc(size)
+        if self.prefault:
+            buf[::_PAGE_SIZE] = 0
+        return buf
+
+    def _release(self, buf):
+        size = buf.nbytes
+        with self._lock:
+            if self._bytes + size > self.max_bytes:
+                self._discarded += 1
+                return
+            self._free.setdefault(size, []).append(buf)
+            self._bytes += size
+
+    @contextlib.contextmanager
+    def borrow(self, shape, dtype=numpy.uint8, order='C'):
+        """Borrow a staging buffer inside a ``with`` block.
+
+        Parameters
+        ----------
+        shape : tuple of ints
+            Shape of the array.
+        dtype : data-type, optional
+            Data type of the array.
+        order : {'C', 'F'}, optional
+            Memory layout of the array.
+
+        Yields
+        ------
+        numpy.ndarray
+            Uninitialized host array viewing a pooled buffer. It must
+            not be used after the block.
+        """
+        dtype = numpy.dtype(dtype)
+        size = 1
+        for n in shape:
+            size *= n
+        nbytes = size * dtype.itemsize
+        buf = self._acquire(nbytes)
+        try:
+            yield buf[:nbytes].view(dtype).reshape(shape, order=order)
+        finally:
+            self._release(buf)
+
+    def trim(self, max_bytes=0):
+        """Free idle buffers until the pool holds at most `max_bytes`.
+
+        Returns
+        -------
+        int
+            Bytes freed.
+        """
+        freed = 0
+        with self._lock:
+            for size in sorted(self._free, reverse=True):
+                bucket = self._free[size]
+                while bucket and self._bytes > max_bytes:
+                    bucket.pop()
+                    self._bytes -= size
+                    freed += size
+                if not bucket:
+                    del self._free[size]
+        return freed
+
+    def stats(self):
+        """Return pool statistics.
+
+        Returns
+        -------
+        dict
+            ``hits``, ``misses``, ``discarded``, the number of idle
+            ``buffers`` and their ``bytes``.
+        """
+        with self._lock:
+            return {
+                'hits': self._hits,
+                'misses': self._misses,
+                'discarded': self._discarded,
+                'buffers': sum(len(b) for b in self._free.values()),
+                'bytes': self._bytes,
+            }
+
+    def reset_stats(self):
+        """Reset the counters returned by :meth:`stats`."""
+        with self._lock:
+            self._hits = 0
+            self._misses = 0
+            self._discarded = 0
+
+
+_pools = {}
+_staging_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(target):
+    """Return the buffer pool of a device.
+
+    Parameters
+    ----------
+    target : devicetype
+        Device of the pool.
+
+    Returns
+    -------
+    BufferPool
+        The pool shared by all instances of `target`'s device.
+    """
+    if isinstance(target, type):
+        target = target()
+    pool = _pools.get(target)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(target)
+            if pool is None:
+                pool = BufferPool(target.numpy_class,
+                                  max_bytes=target.pool_max_bytes,
+                                  min_bytes=target.pool_min_bytes)
+                _pools[target] = pool
+    return pool
+
+
+def get_staging_pool(target):
+    """Return the host staging pool of a device.
+
+    Buffers come from ``target.alloc_staging``, so that they are pinned
+    for a CUDA GPU, and the limits from the ``staging_max_bytes`` and
+    ``staging_prefault`` attributes of the devicetype.
+
+    Parameters
+    ----------
+    target : devicetype
+        Device whose transfers are staged.
+
+    Returns
+    -------
+    StagingPool
+        The pool shared by all instances of `target`'s device.
+    """
+    if isinstance(target, type):
+        target = target()
+    pool = _staging_pools.get(target)
+    if pool is None:
+        with _pools_lock:
+            pool = _staging_pools.get(target)
+            if pool is None:
+                pool = StagingPool(target.alloc_staging,
+                                   max_bytes=target.staging_max_bytes,
+                                   prefault=target.staging_prefault)
+                _staging_pools[target] = pool
+    return pool
+
+
+def trim(max_bytes=0):
+    """Free idle buffers of all devices.
+
+    Parameters
+    ----------
+    max_bytes : int, optional
+        Bytes of idle buffers to keep in each pool.
+
+    Returns
+    -------
+    int
+        Bytes freed, including idle host staging buffers.
+    """
+    with _pools_lock:
+        pools = list(_pools.values()) + list(_staging_pools.values())
+    return sum(pool.trim(max_bytes) for pool in pools)
@@ -0,0 +1,332 @@
+import atexit
+import json
+import logging
+import os
+import threading
+
+from . import devicetype
+from .array import OrchesArray
+from .devicetype.find_device_class import find_device_class
+from .devicetype.registry import get_link, register_link
+from .planner import _plan, calibrate
+
+
+logger = logging.getLogger('orchespy')
+
+
+class _Auto:
+    """Target of :func:`orchespy.device` that selects a device per call."""
+    def __repr__(self):
+        return 'orchespy.auto'
+
+    def __reduce__(self):
+        return 'auto'
+
+
+auto = _Auto()
+
+
+def available_devices():
+    """Return the devicetype instances available in this process."""
+    devices = [devicetype.Host()]
+    for cls in (devicetype.CUDAGPU, devicetype.VE):
+        if cls is None:
+            continue
+        try:
+            count = cls.device_count()
+        except Exception:
+            continue
+        devices.extend(cls(i) for i in range(count))
+    return devices
+
+
+def _default_path():
+    path = os.environ.get('ORCHESPY_CALIBRATION')
+    if path is None:
+        path = os.path.join(os.path.expanduser('~'), '.cache', 'orchespy',
+                            'calibration.json')
+    return path
+
+
+class _Model:
+    """Least-squares fit of ``seconds = a + b * nbytes``."""
+    __slots__ = ('n', 'sx', 'sy', 'sxx', 'sxy')
+
+    def __init__(self, n=0, sx=0.0, sy=0.0, sxx=0.0, sxy=0.0):
+        self.n = n
+        self.sx = sx
+        self.sy = sy
+        self.sxx = sxx
+        self.sxy = sxy
+
+    def add(self, x, y):
+        self.n += 1
+        self.sx += x
+        self.sy += y
+        self.sxx += x * x
+        self.sxy += x * y
+
+    def predict(self, x):
+        mean_x = self.sx / self.n
+        mean_y = self.sy / self.n
+        var = self.sxx / self.n - mean_x * mean_x
+        if var > 1e-12 * mean_x * mean_x:
+            b = max((self.sxy / self.n - mean_x * mean_y) / var, 0.0)
+        else:
+            b = 0.0
+        return max(mean_y + b * (x - mean_x), 0.0)
+
+    def to_list(self):
+        return [self.n, self.sx, self.sy, self.sxx, self.sxy]
+
+
+class Selector:
+    """Chooses the device of each call of functions decorated with `auto`.
+
+    For each call, the selector estimates the time on every device as
+    the time to transfer the array arguments from the devices where they
+    live, using the link models of :mod:`orchespy.planner`, plus the
+    execution time of the function. The execution time is predicted
+    from the total bytes of the array arguments by a linear model fitted
+    to earlier calls of the function on the same devicetype. A
+    devicetype whose model has fewer than `min_samples` calls is tried
+    before the estimates are compared.
+
+    Each link used by an estimate is measured with
+    :func:`orchespy.planner.calibrate` once; a link whose measurement
+    fails keeps its registered model and is not saved. The links and the
+    models are loaded from `path` on first use and saved there at exit.
+    Decisions are logged to the ``'orchespy'`` logger at INFO level.
+
+    Parameters
+    ----------
+    devices : list of devicetype, optional
+        Candidate devices. By default, all devices available in this
+        process.
+    path : str, optional
+        JSON file of the calibration. By default, the file named by the
+        ``ORCHESPY_CALIBRATION`` environment variable, or
+        ``~/.cache/orchespy/calibration.json``. An empty string disables
+        loading and saving.
+    min_samples : int, optional
+        Calls measured on each devicetype before its model is used.
+    calibration_bytes : int, optional
+        Size of the transfers used to measure a link.
+
+    Examples
+    --------
+    >>> import logging
+    >>> import numpy
+    >>> import orchespy
+    >>> logging.basicConfig(level=logging.INFO)
+    >>>
+    >>> @orchespy.device(orchespy.auto)
+    ... def matmul(a, b):
+    ...     return a @ b
+    >>>
+    >>> c = matmul(numpy.ones((4, 4)), numpy.ones((4, 4)))  # doctest: +SKIP
+    INFO:orchespy:__main__.matmul: Host(0) selected for 256 bytes (...)
+    """
+    def __init__(self, devices=None, path=None, min_samples=2,
+                 calibration_bytes=1 << 22):
+        if devices is not None:
+            devices = [d() if isinstance(d, type) else d for d in devices]
+        self._devices = devices
+        self.path = _default_path() if path is None else path
+        self.min_samples = min_samples
+        self.calibration_bytes = calibration_bytes
+        self._lock = threading.Lock()
+        self._models = {}
+        self._links = {}
+        self._loaded = False
+        self._atexit = False
+
+    @property
+    def devices(self):
+        """Candidate devices."""
+        if self._devices is None:
+            self._devices = available_devices()
+        return self._devices
+
+    def _load_once(self):
+        if not self._loaded:
+            self._loaded = True
+            self.load()
+
+    def _classes(self):
+        classes = [devicetype.Host] + [type(d) for d in self.devices]
+        return {cls.__name__: cls for cls in classes}
+
+    def load(self):
+        """Load the calibration from `path`, if the file exists."""
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning('Cannot read calibration %s: %s', self.path, e)
+            return
+        classes = self._classes()
+        for key, (bandwidth, latency) in data.get('links', {}).items():
+            src, dst = key.split('->')
+            if src in classes and dst in classes:
+                self._set_link(classes[src], classes[dst], bandwidth, latency)
+        with self._lock:
+            for name, models in data.get('functions', {}).items():
+                for dev, sums in models.items():
+                    self._models[(name, dev)] = _Model(*sums)
+        logger.debug('Loaded calibration %s', self.path)
+
+    def save(self):
+        """Save the calibration to `path`."""
+        if not self.path:
+            return
+        with self._lock:
+            functions = {}
+            for (name, dev), model in self._models.items():
+                functions.setdefault(name, {})[dev] = model.to_list()
+            data = {
+                'links': {'{}->{}'.format(*k): list(v)
+                          for k, v in self._links.items() if v is not None},
+                'functions': functions,
+            }
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)),
+                        exist_ok=True)
+            tmp = self.path + '.tmp'
+            with open(tmp, 'w') as f:
+                json.dump(data, f, indent=1)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            logger.warning('Cannot write calibration %s: %s', self.path, e)
+
+    def reset(self):
+        """Forget the learned models and link measurements.
+
+        The file at `path` is left as it is until the next save.
+        """
+        with self._lock:
+            self._models.clear()
+            self._links.clear()
+
+    def _changed(self):
+        if self.path and not self._atexit:
+            self._atexit = True
+            atexit.register(self.save)
+
+    def _set_link(self, src_class, dst_class, bandwidth, latency):
+        old = get_link(src_class, dst_class)
+        register_link(src_class, dst_class, bandwidth, latency,
+                      available=True if old is None else old.available,
+                      dtype_factor=None if old is None else old.dtype_factor)
+        with self._lock:
+            self._links[(src_class.__name__, dst_class.__name__)] = (
+                bandwidth, latency)
+
+    def _measure_link(self, srcdev, dstdev):
+        key = (type(srcdev).__name__, type(dstdev).__name__)
+        if key in self._links:
+            return False
+        link = get_link(type(srcdev), type(dstdev))
+        if link is None or not link.available:
+            return False
+        try:
+            link = calibrate(srcdev, dstdev, nbytes=self.calibration_bytes)
+        except Exception as e:
+            logger.warning('Cannot calibrate %s -> %s: %s', srcdev, dstdev, e)
+            # The link is unknown; it is not measured again nor saved.
+            with self._lock:
+                self._links[key] = None
+            return False
+        logger.info('Calibrated %s -> %s: %.3g GB/s, %.3g us', srcdev,
+                    dstdev, link.bandwidth / 1e9, link.latency * 1e6)
+        with self._lock:
+            self._links[key] = (link.bandwidth, link.latency)
+        self._changed()
+        return True
+
+    def _route_cost(self, srcdev, target, nbytes, dtype):
+        route = _plan(srcdev, target, nbytes, dtype)
+        if route is None:
+            return float('inf')
+        measured = False
+        for a, b in zip(route.hops, route.hops[1:]):
+            measured |= self._measure_link(a, b)
+        if measured:
+            route = _plan(srcdev, target, nbytes, dtype)
+        return route.cost
+
+    def _transfer_cost(self, arrays, target):
+        cost = 0.0
+        for v in arrays:
+            if isinstance(v, OrchesArray):
+                srcdevs = v.devices
+            else:
+                srcdevs = (find_device_class(v).get_device(v),)
+            if target in srcdevs:
+                continue
+            cost += min(self._route_cost(d, target, v.nbytes, v.dtype)
+                        for d in srcdevs)
+        return cost
+
+    def select(self, name, arrays):
+        """Return the device to execute a call on.
+
+        Parameters
+        ----------
+        name : str
+            Qualified name of the function.
+        arrays : list of array_like or OrchesArray
+            Array arguments of the call.
+
+        Returns
+        -------
+        devicetype
+            The selected device.
+        """
+        self._load_once()
+        nbytes = sum(v.nbytes for v in arrays)
+        estimates = {}
+        for dev in self.devices:
+            transfer = self._transfer_cost(arrays, dev)
+            if transfer == float('inf'):
+                continue
+            with self._lock:
+                model = self._models.get((name, type(dev).__name__))
+                if model is not None and model.n >= self.min_samples:
+                    estimates[dev] = transfer + model.predict(nbytes)
+                    continue
+            logger.info('%s: %s selected to measure it', name, dev)
+            return dev
+        if not estimates:
+            raise ValueError('No device can receive the arguments of {}.'
+                             .format(name))
+        dev = min(estimates, key=estimates.get)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info('%s: %s selected for %d bytes (%s)', name, dev,
+                        nbytes, ', '.join('{}: {:.3g}s'.format(d, t)
+                                          for d, t in estimates.items()))
+        return dev
+
+    def record(self, name, target, nbytes, seconds):
+        """Add a measured execution time to the model of a function."""
+        key = (name, type(target).__name__)
+        with self._lock:
+            model = self._models.get(key)
+            if model is None:
+                model = self._models[key] = _Model()
+            model.add(nbytes, seconds)
+        self._changed()
+
+    def estimate(self, name, target, nbytes):
+        """Return the predicted execution seconds, or None if unknown."""
+        self._load_once()
+        with self._lock:
+            model = self._models.get((name, type(target).__name__))
+            if model is None or model.n == 0:
+                return None
+            return model.predict(nbytes)
+
+
+default_selector = Selector()
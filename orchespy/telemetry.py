@@ -0,0 +1,180 @@
+import contextlib
+import threading
+import time
+
+from .devicetype.find_device_class import find_device_class
+
+
+# True while metrics are enabled or hooks are registered; the transfer
+# functions check only this flag when telemetry is off.
+active = False
+
+_enabled = False
+_lock = threading.Lock()
+_local = threading.local()
+_routes = {}
+_functions = {}
+_pre_hooks = []
+_post_hooks = []
+
+
+def _update_active():
+    global active
+    active = _enabled or bool(_pre_hooks) or bool(_post_hooks)
+
+
+def enable():
+    """Start collecting transfer and dispatch metrics."""
+    global _enabled
+    _enabled = True
+    _update_active()
+
+
+def disable():
+    """Stop collecting metrics. Registered hooks are still called."""
+    global _enabled
+    _enabled = False
+    _update_active()
+
+
+def reset():
+    """Clear the collected metrics."""
+    with _lock:
+        _routes.clear()
+        _functions.clear()
+
+
+def metrics():
+    """Return a snapshot of the collected metrics.
+
+    Returns
+    -------
+    dict
+        ``'transfers'`` maps each ``(source device, target device)``
+        pair to its ``bytes``, ``count`` and ``seconds``.
+        ``'functions'`` maps the qualified name of each decorated
+        function to its ``calls`` and the ``transfer``, ``body`` and
+        ``result`` seconds spent in argument transfer, execution of the
+        function and handling of the return value.
+
+    Examples
+    --------
+    >>> import numpy
+    >>> import orchespy
+    >>> from orchespy.devicetype import Host, VE
+    >>> with orchespy.telemetry.collect():
+    ...     x = orchespy.transfer_array(numpy.ones(1000), VE())
+    ...     m = orchespy.metrics()
+    >>> m['transfers'][(Host(), VE())]['bytes']
+    8000
+    """
+    with _lock:
+        return {
+            'transfers': {k: dict(v) for k, v in _routes.items()},
+            'functions': {k: dict(v) for k, v in _functions.items()},
+        }
+
+
+@contextlib.contextmanager
+def collect(reset_metrics=True):
+    """Collect metrics inside a ``with`` block.
+
+    Parameters
+    ----------
+    reset_metrics : bool, optional
+        Clear the metrics collected before entering the block.
+    """
+    global _enabled
+    prev = _enabled
+    if reset_metrics:
+        reset()
+    enable()
+    try:
+        yield
+    finally:
+        _enabled = prev
+        _update_active()
+
+
+def add_transfer_hook(pre=None, post=None):
+    """Register functions called around each transfer.
+
+    Parameters
+    ----------
+    pre : callable, optional
+        Called as ``pre(src, target)`` before a transfer.
+    post : callable, optional
+        Called as ``post(src, target, seconds)`` after a transfer.
+
+    Returns
+    -------
+    tuple
+        Handle to pass to :func:`remove_transfer_hook`.
+    """
+    with _lock:
+        if pre is not None:
+            _pre_hooks.append(pre)
+        if post is not None:
+            _post_hooks.append(post)
+        _update_active()
+    return (pre, post)
+
+
+def remove_transfer_hook(handle):
+    """Unregister functions registered by :func:`add_transfer_hook`."""
+    pre, post = handle
+    with _lock:
+        if pre is not None:
+            _pre_hooks.remove(pre)
+        if post is not None:
+            _post_hooks.remove(post)
+        _update_active()
+
+
+def _record_transfer(transfer, src, target, *args, nbytes=None):
+    # Only the outermost transfer of a thread is recorded; the hops and
+    # chunks it is split into are part of it. `nbytes` is the size moved
+    # over the link when it differs from that of `src`.
+    if getattr(_local, 'busy', False):
+        return transfer(src, target, *args)
+    srctype = find_device_class(src)
+    if srctype is None:
+        return transfer(src, target, *args)
+    if isinstance(target, type):
+        target = target()
+    _local.busy = True
+    try:
+        for hook in tuple(_pre_hooks):
+            hook(src, target)
+        start = time.perf_counter()
+        result = transfer(src, target, *args)
+        seconds = time.perf_counter() - start
+        for hook in tuple(_post_hooks):
+            hook(src, target, seconds)
+    finally:
+        _local.busy = False
+    if _enabled:
+        key = (srctype.get_device(src), target)
+        with _lock:
+            route = _routes.get(key)
+            if route is None:
+                route = _routes[key] = {'bytes': 0, 'count': 0,
+                                        'seconds': 0.0}
+            route['bytes'] += src.nbytes if nbytes is None else nbytes
+            route['count'] += 1
+            route['seconds'] += seconds
+    return result
+
+
+def _record_call(name, transfer, body, result):
+    if not _enabled:
+        return
+    with _lock:
+        entry = _functions.get(name)
+        if entry is None:
+            entry = _functions[name] = {'calls': 0, 'transfer': 0.0,
+                                        'body': 0.0, 'result': 0.0}
+        entry['calls'] += 1
+        entry['transfer'] += transfer
+        entry['body'] += body
+        entry['result'] += result
@@ -1,4 +1,27 @@
+import contextlib
+import threading
+from concurrent import futures
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy
+
+from .array import OrchesArray
+from .devicetype import Host
+from .devicetype.base import _in_exclusive_context
 from .devicetype.find_device_class import find_device_class
+from .executor import _call_now
+from .lazy import LazyArray
+from .planner import _plan
+from .pool import get_staging_pool
+from . import telemetry as _telemetry
+
+
+# Chunk size of transfers with a dtype conversion.
+_CAST_CHUNK_BYTES = 1 << 24
+
+_staging_executor = None
+_staging_lock = threading.Lock()
+_route_workers = {}
 
 
 def _get_contiguous(obj):
@@ -31,23 +54,286 @@ def _check_contiguous(dst, src):
     return
 
 
-def transfer_array(src, target):
+def _get_staging_executor():
+    global _staging_executor
+    if _staging_executor is None:
+        with _staging_lock:
+            if _staging_executor is None:
+                _staging_executor = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix='orchespy-staging')
+    return _staging_executor
+
+
+def _get_route_worker(srcdev, dstdev):
+    """Return the worker thread of transfers from `srcdev` to `dstdev`.
+
+    Transfers over different routes run concurrently, and transfers over
+    one route run one after another, in the order they were started.
+    """
+    key = (srcdev, dstdev)
+    worker = _route_workers.get(key)
+    if worker is None:
+        with _staging_lock:
+            worker = _route_workers.get(key)
+            if worker is None:
+                worker = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix='orchespy-transfer')
+                _route_workers[key] = worker
+    return worker
+
+
+def _submit_transfer(srcdev, dstdev, fn, *args):
+    """Run a transfer on the worker of its route.
+
+    In an exclusive device context, the transfer runs in the calling
+    thread instead, as the worker could not enter the device until the
+    caller leaves it.
+    """
+    if _in_exclusive_context():
+        return _call_now(fn, *args)
+    return _get_route_worker(srcdev, dstdev).submit(fn, *args)
+
+
+def _chunk_slices(dst, src, chunk_bytes):
+    """Split dst and src along the slowest axis into chunks.
+
+    Returns None when the arrays cannot be split into contiguous chunks.
+    """
+    if src.ndim == 0 or src.size == 0:
+        return None
+    order = _get_contiguous(src)
+    if order is None or order != _get_contiguous(dst):
+        return None
+    axis = src.ndim - 1 if order == "F" and src.ndim > 1 else 0
+    length = src.shape[axis]
+    row_bytes = src.nbytes // length
+    rows = max(1, chunk_bytes // row_bytes) if row_bytes else length
+    if rows >= length:
+        return None
+    head = (slice(None),) * axis
+    return [head + (slice(start, min(start + rows, length)),)
+            for start in range(0, length, rows)]
+
+
+def _transfer_chunked(copy, dstdev, dst, src, chunk_bytes):
+    slices = _chunk_slices(dst, src, chunk_bytes)
+    if slices is None:
+        copy(dst, src)
+        return
+    if not isinstance(src, numpy.ndarray) or isinstance(dst, numpy.ndarray):
+        for sl in slices:
+            copy(dst[sl], src[sl])
+        return
+
+    # Host to device: stage chunks through rotating host buffers.
+    _stream_to_device(copy, dstdev, dst, slices,
+                      lambda i, buf: numpy.copyto(buf, src[slices[i]]))
+
+
+def _stream_to_device(copy, dstdev, dst, slices, fill):
+    """Copy chunks from the host into `dst` through staging buffers.
+
+    ``fill(i, buf)`` writes the i-th chunk into the staging array `buf`.
+    The next chunk is staged into one of two rotating buffers while the
+    previous chunk is copied from the other one.
+    """
+    order = _get_contiguous(dst)
+    chunks = [dst[sl] for sl in slices]
+    nbytes = max(c.nbytes for c in chunks)
+    pool = get_staging_pool(dstdev)
+    with pool.borrow((nbytes,)) as buf0, pool.borrow((nbytes,)) as buf1:
+        buffers = [buf0, buf1]
+
+        def stage(i):
+            chunk = chunks[i]
+            buf = buffers[i % 2][:chunk.nbytes].view(chunk.dtype)
+            buf = buf.reshape(chunk.shape, order=order)
+            fill(i, buf)
+            return buf
+
+        executor = _get_staging_executor()
+        future = executor.submit(stage, 0)
+        try:
+            for i, chunk in enumerate(chunks):
+                staged = future.result()
+                if i + 1 < len(chunks):
+                    future = executor.submit(stage, i + 1)
+                copy(chunk, staged)
+        finally:
+            # The buffers return to the pool only after staging stops.
+            if not future.cancel():
+                futures.wait([future])
+
+
+def _device_of(obj):
+    devtype = find_device_class(obj)
+    return None if devtype is None else devtype.get_device(obj)
+
+
+def _is_broadcast(obj):
+    return any(st == 0 and n > 1 for n, st in zip(obj.shape, obj.strides))
+
+
+@contextlib.contextmanager
+def _gather(src, order, stagedev):
+    """Copy a strided host array into a compact staging buffer."""
+    with get_staging_pool(stagedev).borrow(src.shape, src.dtype,
+                                           order) as buf:
+        numpy.copyto(buf, src)
+        yield buf
+
+
+def _staging_device(*devices):
+    for dev in devices:
+        if dev.staging_pinned:
+            return dev
+    return devices[-1]
+
+
+def _transfer_staged(src, hops, chunk_bytes):
+    """Transfer along a route, staging in pooled buffers on the host."""
+    pool = get_staging_pool(_staging_device(hops[0], hops[-1]))
+    with contextlib.ExitStack() as stack:
+        for hop in hops[1:-1]:
+            if isinstance(hop, Host):
+                staged = stack.enter_context(pool.borrow(
+                    src.shape, src.dtype, _get_contiguous(src) or "C"))
+                _transfer_array_content(staged, src, chunk_bytes)
+                src = staged
+            else:
+                src = _transfer_direct(src, _device_of(src), hop,
+                                       chunk_bytes)
+        return _transfer_direct(src, _device_of(src), hops[-1], chunk_bytes)
+
+
+def _transfer_strided(src, srcdev, target, chunk_bytes):
+    if _is_broadcast(src):
+        # Send one copy along the broadcast axes, expand on the device.
+        compact = src[tuple(slice(0, 1) if st == 0 else slice(None)
+                            for st in src.strides)]
+        sent = transfer_array(compact, target, chunk_bytes)
+        dst = target.create_ndarray_on_device(src)
+        with target.activate():
+            xp = target.numpy_class
+            xp.copyto(dst, xp.broadcast_to(sent, src.shape))
+        return dst
+
+    perm = sorted(range(src.ndim), key=lambda i: -src.strides[i])
+    permuted = src.transpose(perm)
+    if _get_contiguous(permuted) == "C":
+        # A transposed view of a dense array: send the memory as it is
+        # and transpose back on the device.
+        sent = transfer_array(permuted, target, chunk_bytes)
+        inverse = sorted(range(src.ndim), key=lambda i: perm[i])
+        return sent.transpose(inverse)
+
+    if isinstance(src, numpy.ndarray):
+        with _gather(src, "C", target) as compact:
+            return transfer_array(compact, target, chunk_bytes)
+    else:
+        with srcdev.activate():
+            compact = srcdev.numpy_class.ascontiguousarray(src)
+    return transfer_array(compact, target, chunk_bytes)
+
+
+def _scatter(dstdev, dst, src, chunk_bytes):
+    if _device_of(src) != dstdev:
+        src = transfer_array(src, dstdev, chunk_bytes)
+    with dstdev.activate():
+        dstdev.numpy_class.copyto(dst, src)
+
+
+def _transfer_cast(src, srcdev, target, dtype, chunk_bytes):
+    """Transfer `src` to `target` converting it to `dtype` chunk by chunk.
+
+    A narrowing conversion is done before the chunks are sent and a
+    widening one after they arrive, so that the narrower dtype crosses
+    the link. Only chunks are held in the other dtype.
+    """
+    order = _get_contiguous(src) or "C"
+    with target.activate():
+        dst = target._empty(src.shape, dtype, order)
+    if dst.size == 0:
+        return dst
+    if srcdev == target:
+        with target.activate():
+            target.numpy_class.copyto(dst, src, casting='unsafe')
+        return dst
+
+    slices = (_chunk_slices(dst, dst, chunk_bytes or _CAST_CHUNK_BYTES) or
+              [(Ellipsis,)])
+    if dtype.itemsize <= src.dtype.itemsize:
+        if isinstance(srcdev, Host):
+            _stream_to_device(
+                lambda d, s: _transfer_array_content(d, s, None), target,
+                dst, slices, lambda i, buf: numpy.copyto(
+                    buf, src[slices[i]], casting='unsafe'))
+            return dst
+        for sl in slices:
+            with srcdev.activate():
+                part = src[sl].astype(dtype, order=order)
+            _transfer_array_content(dst[sl], part, None)
+        return dst
+
+    for sl in slices:
+        part = transfer_array(src[sl], target)
+        with target.activate():
+            target.numpy_class.copyto(dst[sl], part, casting='unsafe')
+    return dst
+
+
+def transfer_array(src, target, chunk_bytes=None, copy=True, dtype=None):
     """Transfer N-dimension array to a specified target device.
 
     Parameters
     ----------
-    src : array_like
+    src : array_like, OrchesArray or LazyArray
         N-dimension array on a device or host to be transferred.
+        For an :class:`orchespy.array.OrchesArray`, its valid replica on
+        `target` is used, and is transferred only if there is none.
+        A :class:`orchespy.lazy.LazyArray` which has not been transferred
+        yet is transferred from its source.
     target : devicetype
         Target device; device to be transferred x to.
         Specify the devicetype class that corresponds to the device.
         See :class:`orchespy.devicetype` for what you can specify.
+    chunk_bytes : int, optional
+        Transfer a contiguous array in chunks of about this size along
+        the slowest axis. Chunks from the host are staged through two
+        rotating host buffers, so that staging of a chunk overlaps the
+        copy of the previous chunk. By default, the array is transferred
+        at once.
+    copy : bool or None, optional
+        As for :func:`numpy.asarray`: ``True`` always returns a new
+        array, ``None`` returns `src` itself if it is already on
+        `target`, and ``False`` also returns `src` itself but raises
+        ValueError if `src` is not on `target`.
+    dtype : data-type, optional
+        Data type of the result. `src` is converted in chunks of about
+        `chunk_bytes` while it is transferred: before it is sent if
+        `dtype` is not wider than the dtype of `src`, and after it
+        arrives otherwise, so that fewer bytes cross the link and no
+        full size temporary is created. The conversion is as
+        ``astype(dtype, casting='unsafe')``.
 
     Returns
     -------
     ndarray:
         N-dimension array of `src` on the `target` device.
 
+    Notes
+    -----
+    A source which is neither C nor F contiguous is sent without a full
+    size temporary where possible. A transposed view of a dense array is
+    sent as it is and the result has the same memory layout as `src`.
+    A broadcast array is sent once along the broadcast axes and expanded
+    on the device. Other strided host arrays are gathered into a
+    compact staging buffer in one pass.
+
+    A transfer between two devices follows the cheapest route chosen by
+    :func:`orchespy.planner.plan_route`, which may stage the data on the
+    host.
+
     See Also
     --------
     orchespy.devicetype: Supported device types.
@@ -89,38 +375,119 @@ def transfer_array(src, target):
       1
       >>> type(mul)
       <class 'nlcpy.core.core.ndarray'>
+
+      Send float64 data to VE as float32.
+
+      >>> x = orchespy.transfer_array(np.ones(4), VE(), dtype='f4')
+      >>> x.dtype
+      dtype('float32')
     """
+    if isinstance(src, LazyArray):
+        src = src._source()
+    if dtype is not None:
+        dtype = numpy.dtype(dtype)
+        if dtype == getattr(src, 'dtype', dtype):
+            dtype = None
+        elif copy is False:
+            raise ValueError('Unable to avoid a copy to {}.'.format(target))
+        else:
+            return _transfer_array_as(src, target, chunk_bytes, dtype)
+    if copy is not True:
+        if isinstance(target, type):
+            target = target()
+        if isinstance(src, OrchesArray):
+            if copy is False and src.state(target) == 'I':
+                raise ValueError('Unable to avoid a copy to {}.'.format(
+                    target))
+            return src.on(target)
+        srcdev = _device_of(src)
+        if srcdev == target:
+            return src
+        if copy is False and srcdev is not None:
+            raise ValueError('Unable to avoid a copy to {}.'.format(target))
+    elif isinstance(src, OrchesArray):
+        src = src.on(target)
+    if _telemetry.active:
+        return _telemetry._record_transfer(_transfer_array, src, target,
+                                           chunk_bytes)
+    return _transfer_array(src, target, chunk_bytes)
+
+
+def _transfer_array_as(src, target, chunk_bytes, dtype):
+    if isinstance(target, type):
+        target = target()
+    if not hasattr(target, 'numpy_class'):
+        raise ValueError('Assign a device class to target.')
+    if isinstance(src, OrchesArray):
+        srcdev = min(src.devices, key=lambda d: src._cost(d, target))
+        src = src.on(srcdev)
+    srcdev = _device_of(src)
+    if srcdev is None:
+        return src
+    if _telemetry.active:
+        # The narrower dtype is what crosses the link.
+        itemsize = min(src.dtype.itemsize, numpy.dtype(dtype).itemsize)
+        return _telemetry._record_transfer(
+            lambda s, t: _transfer_cast(s, srcdev, t, dtype, chunk_bytes),
+            src, target, nbytes=src.size * itemsize)
+    return _transfer_cast(src, srcdev, target, dtype, chunk_bytes)
+
+
+def _transfer_array(src, target, chunk_bytes):
     if isinstance(target, type):
         target = target()
     if not hasattr(target, 'numpy_class'):
         raise ValueError('Assign a device class to target.')
 
+    srcdev = _device_of(src)
+    if srcdev is not None and srcdev != target:
+        if src.size > 1 and _get_contiguous(src) is None:
+            return _transfer_strided(src, srcdev, target, chunk_bytes)
+        if not isinstance(srcdev, Host) and not isinstance(target, Host):
+            route = _plan(srcdev, target, src.nbytes, src.dtype)
+            if route is not None and route.staged:
+                return _transfer_staged(src, route.hops, chunk_bytes)
+    return _transfer_direct(src, srcdev, target, chunk_bytes)
+
+
+def _transfer_direct(src, srcdev, target, chunk_bytes):
     if target.can_transfer(src):
         dst = target.create_ndarray_on_device(src)
-        target.transfer_array_content(dst, src)
+        if chunk_bytes:
+            _transfer_chunked(target.transfer_array_content, target,
+                              dst, src, chunk_bytes)
+        else:
+            target.transfer_array_content(dst, src)
         return dst
     else:
-        srctype = find_device_class(src)
-        if srctype is not None:
-            srcdev = srctype.get_device(src)
+        if srcdev is not None:
             if srcdev.can_transfer_to(src, target):
                 dst = target.create_ndarray_on_device(src)
-                srcdev.transfer_array_content_to(dst, src)
+                if chunk_bytes:
+                    _transfer_chunked(srcdev.transfer_array_content_to,
+                                      target, dst, src, chunk_bytes)
+                else:
+                    srcdev.transfer_array_content_to(dst, src)
                 return dst
             else:
                 raise ValueError('This src or target cannot be transferred.')
     return src
 
 
-def transfer_array_content(dst, src):
+def transfer_array_content(dst, src, chunk_bytes=None):
     """Transfer N-dimension array to a specified N-dimension array.
 
     Parameters
     ----------
     dst : array_like
         N-dimension array on a device or host that receives the src value.
-    src : array_like
+    src : array_like or OrchesArray
         N-dimension array on a device or host to be transferred.
+        If `dst` is neither C nor F contiguous, `src` is transferred to
+        a compact array on the device of `dst` and scattered into `dst`.
+    chunk_bytes : int, optional
+        Transfer in chunks of about this size along the slowest axis.
+        See :func:`transfer_array`.
 
     Returns
     -------
@@ -160,6 +527,22 @@ def transfer_array_content(dst, src):
       array([[3, 3],
              [3, 3]])
     """
+    if isinstance(src, LazyArray):
+        src = src._source()
+    if isinstance(src, OrchesArray):
+        dstdev = _device_of(dst)
+        src = src.get() if dstdev is None else src.on(dstdev)
+    if _telemetry.active:
+        dstdev = _device_of(dst)
+        if dstdev is not None:
+            _telemetry._record_transfer(
+                lambda s, t: _transfer_array_content(dst, s, chunk_bytes),
+                src, dstdev)
+            return
+    _transfer_array_content(dst, src, chunk_bytes)
+
+
+def _transfer_array_content(dst, src, chunk_bytes):
     dsttype = find_device_class(dst)
     if dsttype is None:
         raise ValueError('The device could not be found'
@@ -167,13 +550,30 @@ def transfer_array_content(dst, src):
 
     dstdev = dsttype.get_device(dst)
     if dstdev is not None:
+        if _get_contiguous(dst) is None:
+            if dst.shape != src.shape:
+                raise ValueError('Shape mismatch.')
+            if dst.dtype != src.dtype:
+                raise ValueError('dtype mismatch.')
+            _scatter(dstdev, dst, src, chunk_bytes)
+            return
         if dstdev.can_transfer(src):
             if dst.shape != src.shape:
                 raise ValueError('Shape mismatch.')
             if dst.dtype != src.dtype:
                 raise ValueError('dtype mismatch.')
             _check_contiguous(dst, src)
-            dstdev.transfer_array_content(dst, src)
+            if (isinstance(src, numpy.ndarray) and
+                    not isinstance(dst, numpy.ndarray) and
+                    _get_contiguous(src) is None):
+                with _gather(src, _get_contiguous(dst), dstdev) as staged:
+                    _transfer_array_content(dst, staged, chunk_bytes)
+                return
+            if chunk_bytes:
+                _transfer_chunked(dstdev.transfer_array_content, dstdev,
+                                  dst, src, chunk_bytes)
+            else:
+                dstdev.transfer_array_content(dst, src)
             return
         else:
             srctype = find_device_class(src)
@@ -188,7 +588,220 @@ def transfer_array_content(dst, src):
                 if dst.dtype != src.dtype:
                     raise ValueError('dtype mismatch.')
                 _check_contiguous(dst, src)
-                srcdev.transfer_array_content_to(dst, src)
+                if chunk_bytes:
+                    _transfer_chunked(srcdev.transfer_array_content_to,
+                                      dstdev, dst, src, chunk_bytes)
+                else:
+                    srcdev.transfer_array_content_to(dst, src)
                 return
             else:
                 raise ValueError('Objects that cannot be transferred.')
+
+
+_PACK_ALIGNMENT = 64
+
+
+def _packable(obj, max_bytes):
+    return (hasattr(obj, 'nbytes') and 0 < obj.nbytes <= max_bytes and
+            _get_contiguous(obj) is not None)
+
+
+def _packed_view(buf, offset, like):
+    order = _get_contiguous(like)
+    view = buf[offset:offset + like.nbytes].view(like.dtype)
+    return view.reshape(like.shape, order=order)
+
+
+def _transfer_packed(values, target, transfer, max_bytes):
+    results = list(values)
+    groups = {}
+    for i, v in enumerate(values):
+        srctype = find_device_class(v)
+        if srctype is None:
+            if isinstance(v, OrchesArray):
+                results[i] = transfer(v, target)
+            continue
+        srcdev = srctype.get_device(v)
+        if not _packable(v, max_bytes) or srcdev == target:
+            results[i] = transfer(v, target)
+            continue
+        groups.setdefault(srcdev, []).append(i)
+
+    for srcdev, indices in groups.items():
+        if len(indices) == 1:
+            i = indices[0]
+            results[i] = transfer(values[i], target)
+            continue
+        offsets = []
+        nbytes = 0
+        for i in indices:
+            offsets.append(nbytes)
+            nbytes += -(-values[i].nbytes // _PACK_ALIGNMENT) * _PACK_ALIGNMENT
+        with contextlib.ExitStack() as stack:
+            with srcdev.activate():
+                if isinstance(values[indices[0]], numpy.ndarray):
+                    buf = stack.enter_context(
+                        get_staging_pool(target).borrow((nbytes,)))
+                else:
+                    buf = srcdev.numpy_class.empty(nbytes, dtype=numpy.uint8)
+                for i, offset in zip(indices, offsets):
+                    srcdev.numpy_class.copyto(
+                        _packed_view(buf, offset, values[i]), values[i])
+            dst = transfer_array(buf, target)
+        with target.activate():
+            for i, offset in zip(indices, offsets):
+                results[i] = _packed_view(dst, offset, values[i])
+    return results
+
+
+def transfer_arrays(arrays, target, max_bytes=1 << 16):
+    """Transfer N-dimension arrays to a specified target device at once.
+
+    Small contiguous arrays from the same device are packed into one
+    buffer, which is transferred with a single copy. The returned arrays
+    of the packed ones are views into the transferred buffer.
+
+    Parameters
+    ----------
+    arrays : sequence of array_like
+        N-dimension arrays on devices or host to be transferred.
+        Objects which are not arrays are returned as they are.
+    target : devicetype
+        Target device; device to be transferred arrays to.
+    max_bytes : int, optional
+        Arrays up to this size are packed. Larger arrays are transferred
+        by :func:`transfer_array` one by one.
+
+    Returns
+    -------
+    list
+        N-dimension arrays of `arrays` on the `target` device.
+
+    Examples
+    --------
+      >>> import numpy
+      >>> import orchespy
+      >>> from orchespy.devicetype import VE
+      >>> coef = numpy.arange(4.0)
+      >>> index = numpy.arange(10)
+      >>> mask = numpy.ones(10, dtype=bool)
+      >>> c, i, m = orchespy.transfer_arrays([coef, index, mask], VE())
+      >>> c
+      array([0., 1., 2., 3.])
+    """
+    if isinstance(target, type):
+        target = target()
+    if not hasattr(target, 'numpy_class'):
+        raise ValueError('Assign a device class to target.')
+    return _transfer_packed(list(arrays), target, transfer_array, max_bytes)
+
+
+class TransferFuture:
+    """Handle of a transfer started by an asynchronous transfer function.
+
+    The transfer runs on the worker thread of its route, the pair of
+    source and target devices; transfers over the same route are
+    executed in the order they were started. Inside the context of a
+    device that excludes other threads, such as VE, the transfer runs in
+    the calling thread and the returned handle has already finished.
+    """
+    def __init__(self, future):
+        self._future = future
+
+    def done(self):
+        """Return True if the transfer has finished."""
+        return self._future.done()
+
+    def wait(self, timeout=None):
+        """Wait until the transfer finishes.
+
+        Parameters
+        ----------
+        timeout : float, optional
+            Seconds to wait. By default, wait without a time limit.
+
+        Returns
+        -------
+        bool
+            True if the transfer has finished.
+        """
+        done, _ = futures.wait((self._future,), timeout)
+        return bool(done)
+
+    def result(self, timeout=None):
+        """Wait for the transfer and return its result.
+
+        The exception raised by the transfer is raised again here.
+
+        Parameters
+        ----------
+        timeout : float, optional
+            Seconds to wait. By default, wait without a time limit.
+        """
+        return self._future.result(timeout)
+
+
+def wait_all(handles):
+    """Wait for transfers and return their results in order.
+
+    Parameters
+    ----------
+    handles : iterable of TransferFuture
+        Handles returned by the asynchronous transfer functions.
+
+    Returns
+    -------
+    list
+        The results of `handles`.
+    """
+    return [h.result() for h in handles]
+
+
+def transfer_array_async(src, target, chunk_bytes=None, copy=True,
+                         dtype=None):
+    """Start transferring N-dimension array to a specified target device.
+
+    Parameters are the same as :func:`transfer_array`.
+
+    Returns
+    -------
+    TransferFuture
+        Handle whose :meth:`~TransferFuture.result` is the N-dimension
+        array of `src` on the `target` device.
+
+    Examples
+    --------
+      >>> import numpy
+      >>> import orchespy
+      >>> from orchespy.devicetype import VE
+      >>> x = numpy.ones((1000, 1000))
+      >>> f = orchespy.transfer_array_async(x, VE())
+      >>> # compute something else on the host
+      >>> y = f.result()
+    """
+    if isinstance(target, type):
+        target = target()
+    if not hasattr(target, 'numpy_class'):
+        raise ValueError('Assign a device class to target.')
+    future = _submit_transfer(_device_of(src), target, transfer_array, src,
+                              target, chunk_bytes, copy, dtype)
+    return TransferFuture(future)
+
+
+def transfer_array_content_async(dst, src, chunk_bytes=None):
+    """Start transferring N-dimension array to a specified N-dimension array.
+
+    Parameters are the same as :func:`transfer_array_content`.
+
+    Returns
+    -------
+    TransferFuture
+        Handle whose :meth:`~TransferFuture.result` is None.
+    """
+    dsttype = find_device_class(dst)
+    if dsttype is None:
+        raise ValueError('The device could not be found'
+                         ' from the first argument.')
+    future = _submit_transfer(_device_of(src), dsttype.get_device(dst),
+                              transfer_array_content, dst, src, chunk_bytes)
+    return TransferFuture(future)
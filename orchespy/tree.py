@@ -0,0 +1,131 @@
+import collections
+import copy
+import dataclasses
+
+
+def _is_namedtuple(obj):
+    return isinstance(obj, tuple) and hasattr(type(obj), '_fields')
+
+
+def flatten(obj):
+    """Flatten nested containers into a list of leaves.
+
+    Tuples (including named tuples), lists, dicts and dataclass
+    instances are traversed; every other object is a leaf.
+
+    Parameters
+    ----------
+    obj : object
+        Object to flatten.
+
+    Returns
+    -------
+    leaves : list
+        Leaves of `obj` in traversal order.
+    treedef : tuple
+        Hashable description of the structure of `obj`,
+        used by :func:`unflatten`.
+
+    Examples
+    --------
+    >>> import numpy
+    >>> from orchespy.tree import flatten, unflatten
+    >>> leaves, treedef = flatten({'w': numpy.ones(2), 'b': [1, 2.0]})
+    >>> len(leaves)
+    3
+    >>> unflatten(treedef, leaves)
+    {'w': array([1., 1.]), 'b': [1, 2.0]}
+    """
+    leaves = []
+    treedef = _flatten(obj, leaves)
+    return leaves, treedef
+
+
+def _flatten(obj, leaves):
+    cls = type(obj)
+    if cls is tuple or cls is list or _is_namedtuple(obj):
+        return (cls, None, tuple(_flatten(v, leaves) for v in obj))
+    if cls is dict or cls is collections.OrderedDict:
+        keys = tuple(obj)
+        return (cls, keys, tuple(_flatten(obj[k], leaves) for k in keys))
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        names = tuple(f.name for f in dataclasses.fields(obj))
+        return (cls, names,
+                tuple(_flatten(getattr(obj, n), leaves) for n in names))
+    leaves.append(obj)
+    return None
+
+
+def unflatten(treedef, leaves, like=None):
+    """Rebuild nested containers from leaves.
+
+    Parameters
+    ----------
+    treedef : tuple
+        Structure returned by :func:`flatten`.
+    leaves : iterable
+        Leaves in the order returned by :func:`flatten`.
+    like : object, optional
+        The flattened object. Its containers none of whose leaves were
+        replaced are returned as they are, and only the containers on
+        the path to a replaced leaf are copied. A dataclass instance is
+        copied with :func:`copy.copy`, keeping its other attributes.
+
+    Returns
+    -------
+    object
+        Containers of the same structure as the flattened object
+        holding `leaves`.
+    """
+    if like is not None:
+        return _replace(treedef, like, iter(leaves))[0]
+    return _unflatten(treedef, iter(leaves))
+
+
+def _unflatten(treedef, leaves):
+    if treedef is None:
+        return next(leaves)
+    cls, aux, children = treedef
+    values = [_unflatten(c, leaves) for c in children]
+    if cls is tuple or cls is list:
+        return cls(values)
+    if aux is None:
+        return cls(*values)
+    if cls is dict or cls is collections.OrderedDict:
+        return cls(zip(aux, values))
+    obj = cls.__new__(cls)
+    for name, value in zip(aux, values):
+        object.__setattr__(obj, name, value)
+    return obj
+
+
+def _replace(treedef, obj, leaves):
+    if treedef is None:
+        value = next(leaves)
+        return value, value is not obj
+    cls, aux, children = treedef
+    if cls is tuple or cls is list or aux is None:
+        old = list(obj)
+    elif cls is dict or cls is collections.OrderedDict:
+        old = [obj[k] for k in aux]
+    else:
+        old = [getattr(obj, n) for n in aux]
+    values = []
+    changed = False
+    for c, v in zip(children, old):
+        value, replaced = _replace(c, v, leaves)
+        values.append(value)
+        changed |= replaced
+    if not changed:
+        return obj, False
+    if cls is tuple or cls is list:
+        return cls(values), True
+    if aux is None:
+        return cls(*values), True
+    if cls is dict or cls is collections.OrderedDict:
+        return cls(zip(aux, values)), True
+    new = copy.copy(obj)
+    for name, value, v in zip(aux, values, old):
+        if value is not v:
+            object.__setattr__(new, name, value)
+    return new, True
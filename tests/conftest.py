@@ -0,0 +1,17 @@
+import pytest
+
+from orchespy import telemetry
+
+from helpers import Remote
+
+
+@pytest.fixture
+def remote():
+    return Remote()
+
+
+@pytest.fixture
+def metrics():
+    with telemetry.collect():
+        yield telemetry
+    telemetry.reset()
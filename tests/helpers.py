@@ -0,0 +1,93 @@
+"""Devicetypes and functions shared by the tests.
+
+The functions run with ``process=True`` are defined here, at the top
+level of a module that the worker processes can import.
+"""
+import contextlib
+import os
+import threading
+
+import numpy
+
+from orchespy import device
+from orchespy.devicetype import Host, register_device_class, register_link
+
+
+class RemoteArray(numpy.ndarray):
+    """Array on a :class:`Remote` device."""
+
+
+class Remote(Host):
+    """Second device backed by host memory.
+
+    Its arrays are :class:`RemoteArray` views of host memory, so that
+    the tests can tell where an array lives.
+    """
+    def can_transfer_to(self, obj, target):
+        return isinstance(obj, numpy.ndarray) and isinstance(target, Host)
+
+    def _empty(self, shape, dtype, order):
+        return super()._empty(shape, dtype, order).view(RemoteArray)
+
+    @classmethod
+    def get_device(cls, ndarray):
+        return Remote()
+
+
+register_device_class(RemoteArray, Remote)
+register_link(Host, Remote, bandwidth=10e9, latency=1e-6)
+register_link(Remote, Host, bandwidth=10e9, latency=1e-6)
+
+
+_exclusive_lock = threading.RLock()
+
+
+class Exclusive(Host):
+    """Device whose context excludes the other threads, as VE does."""
+    exclusive_context = True
+
+    @contextlib.contextmanager
+    def activate(self):
+        with _exclusive_lock:
+            yield
+
+
+@device(Host, process=True)
+def scale(x, factor):
+    return x * factor
+
+
+@device(Host, process=True)
+def split_halves(x):
+    half = len(x) // 2
+    return {'head': x[:half], 'tail': x[half:], 'pid': os.getpid()}
+
+
+@device(Host, process=True)
+def fail(message):
+    raise KeyError(message)
+
+
+@device(Host, process=True)
+def unpicklable():
+    return threading.Lock()
+
+
+@device(Host, process=True)
+def exit_worker():
+    os._exit(1)
+
+
+@device(Host, process=True)
+def nested(x):
+    # Runs in the worker itself.
+    return scale(x, 2.0) + 1.0
+
+
+@device(Host, process=True)
+def pid():
+    return os.getpid()
+
+
+def add_ones(x):
+    return x + numpy.ones_like(x)
@@ -0,0 +1,93 @@
+import numpy
+import pytest
+
+from orchespy.array import OrchesArray
+from orchespy.devicetype import Host
+
+from helpers import Remote, RemoteArray
+
+
+def test_metadata():
+    x = OrchesArray(numpy.zeros((3, 4), dtype='f4'))
+    assert x.shape == (3, 4)
+    assert x.dtype == numpy.float32
+    assert x.ndim == 2
+    assert x.nbytes == 48
+    assert len(x) == 3
+
+
+def test_requires_array():
+    with pytest.raises(ValueError):
+        OrchesArray([1, 2, 3])
+
+
+def test_states(remote):
+    x = OrchesArray(numpy.ones(3))
+    assert x.devices == (Host(),)
+    assert x.state(Host) == 'S'
+    assert x.state(remote) == 'I'
+
+    replica = x.on(remote)
+    assert isinstance(replica, RemoteArray)
+    assert x.state(remote) == 'S'
+    assert x.on(Remote) is replica
+
+    x.modify(remote)[:] = 2
+    assert x.state(remote) == 'M'
+    assert x.state(Host()) == 'I'
+    assert x.devices == (remote,)
+    assert numpy.array_equal(x.get(), numpy.full(3, 2.0))
+    assert x.state(remote) == 'S'
+    assert x.state(Host()) == 'S'
+
+
+def test_on_transfers_once(remote, metrics):
+    x = OrchesArray(numpy.ones(3))
+    x.on(remote)
+    x.on(remote)
+    assert metrics.metrics()['transfers'][(Host(), remote)]['count'] == 1
+
+
+def test_mark_modified(remote):
+    x = OrchesArray(numpy.ones(3))
+    host = x.on(Host())
+    x.on(remote)
+    host[0] = 5
+    x.mark_modified(Host)
+    assert x.state(remote) == 'I'
+    assert x.on(remote)[0] == 5
+    with pytest.raises(ValueError):
+        OrchesArray(numpy.ones(3)).mark_modified(remote)
+
+
+def test_invalidate(remote):
+    x = OrchesArray(numpy.ones(3))
+    x.on(remote)
+    x.invalidate(Host)
+    assert x.devices == (remote,)
+    # The last replica is kept.
+    x.invalidate(remote)
+    assert x.devices == (remote,)
+
+
+def test_array_protocol(remote):
+    data = numpy.arange(3.0)
+    x = OrchesArray(data)
+    assert numpy.asarray(x) is data
+    assert numpy.array(x, copy=True) is not data
+    assert numpy.asarray(x, dtype='i4').dtype == numpy.int32
+
+    y = OrchesArray(data.view(RemoteArray))
+    with pytest.raises(ValueError):
+        y.__array__(copy=False)
+    assert type(numpy.asarray(y)) is numpy.ndarray
+    assert y.state(Host()) == 'S'
+    assert y.__array__(copy=False) is y.get()
+    with pytest.raises(ValueError):
+        x.__array__(dtype='f4', copy=False)
+
+
+def test_repr(remote):
+    x = OrchesArray(numpy.ones(2))
+    assert repr(x) == ("OrchesArray(shape=(2,), dtype=float64,"
+                       " replicas={Host(0): 'S'})")
@@ -0,0 +1,40 @@
+import json
+
+from orchespy import bench
+from orchespy.devicetype import Host
+
+
+def test_transfers():
+    records = bench.bench_transfers([Host()], sizes=[1024],
+                                    dtypes=['float32'], repeat=1)
+    assert len(records) == 2 * 2 * 2
+    for r in records:
+        assert r['nbytes'] == 1024
+        assert r['latency'] >= 0
+        assert r['allocations'] >= 0
+
+
+def test_dispatch():
+    records = bench.bench_dispatch([Host()], nargs=(0, 2), repeat=3)
+    assert [r['nargs'] for r in records] == [0, 2]
+
+
+def test_main(tmp_path, capsys):
+    path = str(tmp_path / 'bench.json')
+    assert bench.main(['--host-only', '--sizes', '1024', '--dtypes',
+                       'float64', '--repeat', '1', '--no-dispatch',
+                       '--json', path]) == 0
+    assert 'transfer_array_content' in capsys.readouterr().out
+    with open(path) as f:
+        result = json.load(f)
+    assert result['devices'] == ['Host(0)']
+    assert {r['op'] for r in result['records']} == {
+        'transfer_array', 'transfer_array_content'}
+
+
+def test_main_json_to_stdout(capsys):
+    bench.main(['--host-only', '--sizes', '64', '--dtypes', 'int8',
+                '--orders', 'C', '--layouts', 'contiguous', '--repeat', '1',
+                '--json', '-'])
+    result = json.loads(capsys.readouterr().out)
+    assert result['records'][-1]['op'] == 'dispatch'
@@ -0,0 +1,198 @@
+import gc
+
+import numpy
+import pytest
+
+from orchespy.array import OrchesArray
+from orchespy.cache import ArgumentCache, ResultCache
+from orchespy.cache import _array_key, _content_hash, _device_fingerprint
+from orchespy.devicetype import Host
+
+from helpers import Remote, RemoteArray
+
+
+def _frozen(a):
+    a.flags.writeable = False
+    return a
+
+
+class TestArgumentCache:
+    def test_readonly_array_is_reused(self, remote):
+        cache = ArgumentCache()
+        w = _frozen(numpy.arange(10.0))
+        first = cache.transfer_array(w, remote)
+        second = cache.transfer_array(w, remote)
+        assert isinstance(first, RemoteArray)
+        assert second is first
+        stats = cache.stats()
+        assert stats['hits'] == 1
+        assert stats['misses'] == 1
+        assert stats['bytes_saved'] == w.nbytes
+        assert stats['bytes'] == {remote: w.nbytes}
+
+    def test_writeable_array_is_not_cached(self, remote):
+        cache = ArgumentCache()
+        x = numpy.arange(10.0)
+        assert cache.transfer_array(x, remote) is not cache.transfer_array(
+            x, remote)
+        assert cache.stats()['entries'] == 0
+
+    def test_readonly_view_of_writeable_base_is_not_cached(self, remote):
+        cache = ArgumentCache()
+        base = numpy.arange(10.0)
+        view = _frozen(base[:5])
+        cache.transfer_array(view, remote)
+        assert cache.stats()['entries'] == 0
+
+    def test_hash_detects_changes(self, remote):
+        cache = ArgumentCache(validate='hash')
+        x = numpy.arange(4.0)
+        first = cache.transfer_array(x, remote)
+        assert cache.transfer_array(x, remote) is first
+        x[0] = 10.0
+        second = cache.transfer_array(x, remote)
+        assert second is not first
+        assert second[0] == 10.0
+
+    def test_callable_validate(self, remote):
+        versions = {}
+        cache = ArgumentCache(validate=lambda a: versions.get(id(a)))
+        x = numpy.arange(4.0)
+        cache.transfer_array(x, remote)
+        assert cache.stats()['entries'] == 0
+        versions[id(x)] = 1
+        first = cache.transfer_array(x, remote)
+        assert cache.transfer_array(x, remote) is first
+        versions[id(x)] = 2
+        assert cache.transfer_array(x, remote) is not first
+
+    def test_invalid_validate(self):
+        with pytest.raises(ValueError):
+            ArgumentCache(validate='never')
+
+    def test_eviction(self, remote):
+        cache = ArgumentCache(max_bytes=200)
+        arrays = [_frozen(numpy.full(10, i, dtype='f8')) for i in range(3)]
+        for a in arrays:
+            cache.transfer_array(a, remote)
+        stats = cache.stats()
+        assert stats['evictions'] == 1
+        assert stats['entries'] == 2
+        assert stats['bytes'] == {remote: 160}
+
+    def test_entry_is_dropped_with_source(self, remote):
+        cache = ArgumentCache()
+        w = _frozen(numpy.arange(10.0))
+        cache.transfer_array(w, remote)
+        del w
+        gc.collect()
+        assert cache.stats()['entries'] == 0
+
+    def test_array_on_target_is_returned(self):
+        cache = ArgumentCache()
+        w = _frozen(numpy.arange(3.0))
+        assert cache.transfer_array(w, Host(), copy=None) is w
+        assert cache.stats()['entries'] == 0
+
+    def test_clear_and_reset_stats(self, remote):
+        cache = ArgumentCache()
+        w = _frozen(numpy.arange(3.0))
+        cache.transfer_array(w, remote)
+        cache.clear()
+        cache.reset_stats()
+        assert cache.stats() == {'hits': 0, 'misses': 0, 'bytes_saved': 0,
+                                 'evictions': 0, 'entries': 0, 'bytes': {}}
+
+
+def _func(x):
+    return x
+
+
+class TestResultCache:
+    def test_key_depends_on_content(self):
+        cache = ResultCache()
+        x = numpy.arange(4.0)
+        key = cache.key(_func, (x,), {})
+        assert cache.key(_func, (x.copy(),), {}) == key
+        assert cache.key(_func, (x + 1,), {}) != key
+        assert cache.key(_func, (x.astype('f4'),), {}) != key
+        assert cache.key(_func, (x.reshape(2, 2),), {}) != key
+        assert cache.key(_func, (), {'x': x}) != key
+        assert cache.key(len, (x,), {}) != key
+
+    def test_key_of_scalars(self):
+        cache = ResultCache()
+        assert cache.key(_func, (1,), {}) != cache.key(_func, (1.0,), {})
+        assert cache.key(_func, ([1],), {}) == cache.key(_func, ([1],), {})
+        assert cache.key(_func, ({1},), {}) is None
+
+    def test_key_of_object_array(self):
+        cache = ResultCache()
+        assert cache.key(_func, (numpy.array([1, 'a'], dtype=object),),
+                         {}) is None
+
+    def test_key_of_orches_array(self, remote):
+        cache = ResultCache()
+        x = numpy.arange(4.0)
+        handle = OrchesArray(x)
+        assert cache.key(_func, (handle,), {}) == cache.key(_func, (x,), {})
+
+    def test_get_put(self, remote):
+        cache = ResultCache()
+        key = cache.key(_func, (numpy.ones(2),), {})
+        result = numpy.zeros(2)
+        assert cache.get(remote, key) is None
+        cache.put(remote, key, result)
+        assert cache.get(remote, key) is result
+        assert cache.get(Host(), key) is None
+        stats = cache.stats()
+        assert stats['hits'] == 1
+        assert stats['misses'] == 2
+        assert stats['bytes'] == {remote: 16}
+
+    def test_eviction(self, remote):
+        cache = ResultCache(max_bytes=100)
+        for i in range(3):
+            cache.put(remote, ('k', i), numpy.zeros(5))
+        assert cache.stats()['evictions'] == 1
+        assert cache.get(remote, ('k', 0)) is None
+        cache.put(remote, ('big',), numpy.zeros(100))
+        assert cache.get(remote, ('big',)) is None
+
+    def test_invalidate(self, remote):
+        cache = ResultCache()
+        x = numpy.ones(2)
+        key1 = cache.key(_func, (x,), {})
+        key2 = cache.key(len, (x,), {})
+        cache.put(remote, key1, 1)
+        cache.put(Host(), key1, 1)
+        cache.put(remote, key2, 2)
+        cache.invalidate(_func, Remote)
+        assert cache.get(remote, key1) is None
+        assert cache.get(Host(), key1) == 1
+        assert cache.get(remote, key2) == 2
+        cache.clear()
+        assert cache.stats()['entries'] == 0
+
+
+@pytest.mark.parametrize('a', [
+    numpy.arange(10).astype('datetime64[s]'),
+    numpy.zeros(3, dtype='V3'),
+    numpy.arange(12.0).reshape(3, 4).T,
+    numpy.zeros(0),
+    numpy.arange(5, dtype='c16'),
+])
+def test_content_hash_of_odd_arrays(a):
+    digest = _content_hash(a)
+    assert digest == _content_hash(a.copy())
+    assert _array_key(a) is not None
+
+
+@pytest.mark.parametrize('dtype', ['f8', 'f4', 'i2', 'u1', 'c16', 'V3'])
+def test_device_fingerprint(dtype):
+    a = numpy.zeros(100, dtype=dtype)
+    b = a.copy()
+    b.view('u1')[7] = 1
+    assert _device_fingerprint(a, Host()) == _device_fingerprint(a.copy(),
+                                                                 Host())
+    assert _device_fingerprint(a, Host()) != _device_fingerprint(b, Host())
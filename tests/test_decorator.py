@@ -0,0 +1,424 @@
+import asyncio
+import dataclasses
+import threading
+
+import numpy
+import pytest
+
+import orchespy
+from orchespy import device
+from orchespy import numpy as onp
+from orchespy.array import OrchesArray
+from orchespy.cache import ArgumentCache, ResultCache
+from orchespy.devicetype import Host
+from orchespy.executor import default_executor
+from orchespy.lazy import LazyArray
+
+from helpers import Exclusive, Remote, RemoteArray
+
+
+@dataclasses.dataclass
+class Params:
+    weight: object
+    name: str
+
+
+def test_runs_on_target():
+    @device(Host)
+    def mul(x, y):
+        return x * y
+
+    assert numpy.array_equal(mul(numpy.ones(3), numpy.full(3, 2.0)),
+                             numpy.full(3, 2.0))
+
+
+def test_numpy_module_arg():
+    @device(Remote, numpy_module_arg='xp')
+    def create(n, xp):
+        return xp.arange(n)
+
+    assert numpy.array_equal(create(3), numpy.arange(3))
+
+
+def test_orchespy_numpy_refers_to_target_module():
+    @device(Remote)
+    def module():
+        return onp.get_current_numpy()
+
+    assert module() is numpy
+
+
+def test_nested_arguments_are_transferred(metrics):
+    @device(Remote)
+    def total(params, extra):
+        return params['w'] + params['b'][0] + extra.weight
+
+    params = {'w': numpy.ones(3), 'b': [numpy.full(3, 2.0)]}
+    y = total(params, Params(numpy.full(3, 3.0), 'p'))
+    assert numpy.array_equal(y, numpy.full(3, 6.0))
+    route = metrics.metrics()['transfers'][(Host(), Remote())]
+    assert route['count'] == 3
+
+
+def test_containers_without_arrays_are_passed_through(remote):
+    @device(remote)
+    def identity(*args):
+        return args
+
+    options = {'mode': [1, 2]}
+    params = Params('weight', 'p')
+    x = numpy.ones(2)
+    got = identity(options, params, [x])
+    assert got[0] is options
+    assert got[1] is params
+    assert isinstance(got[2][0], RemoteArray)
+
+
+def test_arguments_on_target_are_passed_as_they_are():
+    @device(Host)
+    def identity(x):
+        return x
+
+    x = numpy.ones(2)
+    assert identity(x) is x
+
+
+def test_copy_true_passes_copies():
+    @device(Host, copy=True)
+    def clear(x):
+        x[:] = 0
+        return x
+
+    x = numpy.ones(3)
+    clear(x)
+    assert numpy.all(x == 1)
+
+
+def test_copy_false_rejects_other_devices(remote):
+    @device(remote, copy=False)
+    def identity(x):
+        return x
+
+    with pytest.raises(ValueError):
+        identity(numpy.ones(2))
+
+
+def test_return_to(metrics):
+    @device(Remote, return_to=Host)
+    def double(x):
+        return {'y': x * 2, 'n': 1}
+
+    result = double(numpy.ones(2))
+    assert result['n'] == 1
+    assert numpy.array_equal(result['y'], numpy.full(2, 2.0))
+    assert (Remote(), Host()) in metrics.metrics()['transfers']
+
+
+def test_lazy_result(metrics):
+    @device(Remote, lazy=True)
+    def double(x):
+        return x * 2
+
+    x = double(numpy.arange(3.0).repeat(2).reshape(2, 3))
+    assert isinstance(x, LazyArray)
+    assert x.shape == (2, 3)
+    assert not x.materialized
+    assert (Remote(), Host()) not in metrics.metrics()['transfers']
+    assert numpy.array_equal(x[1], [2.0, 4.0, 4.0])
+    assert x.materialized
+    assert (Remote(), Host()) in metrics.metrics()['transfers']
+
+
+def test_lazy_argument_is_sent_from_its_source():
+    @device(Remote, lazy=True)
+    def create():
+        return numpy.arange(3.0)
+
+    @device(Remote)
+    def add_one(x):
+        return x + 1
+
+    x = create()
+    assert numpy.array_equal(add_one(x), [1.0, 2.0, 3.0])
+
+
+def test_pack():
+    @device(Remote, pack=True, return_to=Host)
+    def add(a, b, c):
+        return a + b, c
+
+    s, c = add(numpy.ones(3), numpy.arange(3.0), numpy.arange(4))
+    assert numpy.array_equal(s, [1.0, 2.0, 3.0])
+    assert numpy.array_equal(c, numpy.arange(4))
+
+
+def test_async_transfer_with_one_route_runs_in_calling_thread():
+    threads = set()
+    handle = orchespy.telemetry.add_transfer_hook(
+        pre=lambda src, target: threads.add(threading.current_thread()))
+
+    @device(Remote, async_transfer=True)
+    def add(a, b):
+        return a + b
+
+    try:
+        y = add(numpy.ones(3), numpy.ones(3))
+    finally:
+        orchespy.telemetry.remove_transfer_hook(handle)
+    assert numpy.array_equal(y, numpy.full(3, 2.0))
+    assert threads == {threading.current_thread()}
+
+
+def test_async_transfer_with_several_routes():
+    @device(Host, async_transfer=True)
+    def add(a, b):
+        return a + b
+
+    b = orchespy.transfer_array(numpy.ones(3), Remote())
+    assert numpy.array_equal(add(OrchesArray(numpy.ones(3)), b),
+                             numpy.full(3, 2.0))
+
+
+def test_coherent_results_stay_on_target(metrics):
+    @device(Remote, coherent=True)
+    def add(x, y):
+        return x + y
+
+    x = OrchesArray(numpy.ones(4))
+    y = add(x, x)
+    assert isinstance(y, OrchesArray)
+    assert y.devices == (Remote(),)
+    z = add(y, x)
+    # x is sent once and y stays on the device.
+    assert metrics.metrics()['transfers'][(Host(), Remote())]['count'] == 1
+    assert numpy.array_equal(numpy.asarray(z), numpy.full(4, 3.0))
+
+
+def test_writes_invalidates_other_replicas(remote):
+    @device(remote, writes=['x'])
+    def clear(x):
+        x[:] = 0
+
+    x = OrchesArray(numpy.ones(3))
+    clear(x)
+    assert x.state(remote) == 'M'
+    assert x.state(Host()) == 'I'
+    assert numpy.array_equal(numpy.asarray(x), numpy.zeros(3))
+
+
+@pytest.mark.parametrize('options', [
+    dict(writes=['x'], copy=True),
+    dict(writes=['x'], memoize=True),
+    dict(lazy=True, coherent=True),
+    dict(pack=True, copy=False),
+    dict(writes=['y']),
+    dict(arg_dtypes={'y': 'f4'}),
+])
+def test_invalid_options(options):
+    with pytest.raises(ValueError):
+        device(Host, **options)(lambda x: x)
+
+
+def test_arg_dtypes(remote):
+    @device(remote, arg_dtypes={'x': 'f4'})
+    def dtypes(x, y):
+        return x.dtype, y.dtype
+
+    assert dtypes(numpy.ones(3), numpy.ones(3)) == (numpy.float32,
+                                                    numpy.float64)
+
+
+def test_argument_cache(remote):
+    cache = ArgumentCache()
+
+    @device(remote, cache=cache)
+    def total(w, x):
+        return (w @ x).sum()
+
+    w = numpy.ones((4, 4))
+    w.flags.writeable = False
+    for _ in range(3):
+        total(w, numpy.ones(4))
+    assert cache.stats()['hits'] == 2
+
+
+def test_memoize():
+    calls = []
+    cache = ResultCache()
+
+    @device(Remote, memoize=cache)
+    def square(x):
+        calls.append(1)
+        return x * x
+
+    x = numpy.arange(4.0)
+    first = square(x)
+    second = square(x.copy())
+    assert len(calls) == 1
+    assert second is first
+    square(x + 1)
+    assert len(calls) == 2
+    square.invalidate()
+    square(x)
+    assert len(calls) == 3
+
+
+# Assigned by assign_global to check that specialized functions do not
+# lose global writes.
+_counter = 0
+
+
+def _helper():
+    return 1
+
+
+def test_specialize_binds_module_without_changing_globals():
+    @device(Remote, specialize=True)
+    def module(x):
+        return type(onp).__name__, onp.add(x, _helper())
+
+    names = set(globals())
+    name, y = module(numpy.ones(2))
+    assert name == 'module'
+    assert numpy.array_equal(y, numpy.full(2, 2.0))
+    assert set(globals()) == names
+
+
+def test_specialize_reads_current_globals():
+    global _helper
+
+    @device(Remote, specialize=True)
+    def call_helper():
+        return _helper()
+
+    assert call_helper() == 1
+    original = _helper
+    _helper = lambda: 2   # noqa: E731
+    try:
+        assert call_helper() == 2
+    finally:
+        _helper = original
+
+
+def test_specialize_keeps_global_writes():
+    @device(Remote, specialize=True)
+    def assign_global():
+        global _counter
+        _counter += 1
+        return _counter
+
+    before = _counter
+    assert assign_global() == before + 1
+    assert _counter == before + 1
+
+
+def test_async_function():
+    @device(Remote, return_to=Host)
+    async def add(x, y):
+        await asyncio.sleep(0)
+        return x + y
+
+    y = asyncio.run(add(numpy.ones(2), numpy.ones(2)))
+    assert numpy.array_equal(y, numpy.full(2, 2.0))
+
+
+def test_submit_and_aio():
+    @device(Remote)
+    def add(x, y):
+        return x + y
+
+    future = add.submit(numpy.ones(2), numpy.ones(2))
+    assert numpy.array_equal(future.result(), numpy.full(2, 2.0))
+    y = asyncio.run(add.aio(numpy.ones(2), numpy.ones(2)))
+    assert numpy.array_equal(y, numpy.full(2, 2.0))
+
+
+def test_exclusive_device_does_not_deadlock():
+    @device(Exclusive)
+    def inner(x):
+        return x + 1
+
+    @device(Exclusive, async_transfer=True)
+    def outer(x, y):
+        orchespy.transfer_array_async(x, Remote()).result()
+        default_executor.submit(Remote(), lambda: None).result()
+        return inner(x) + y
+
+    results = []
+
+    def run():
+        results.append(outer(OrchesArray(numpy.ones(3)), numpy.ones(3)))
+
+    threads = [threading.Thread(target=run) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(30)
+    assert not any(t.is_alive() for t in threads)
+    assert len(results) == 4
+    for y in results:
+        assert numpy.array_equal(y, numpy.full(3, 3.0))
+
+
+class TestMultipleDevices:
+    def test_split_and_concat(self):
+        @device([Host, Remote], split={'x': 0})
+        def scale(x, factor):
+            return x * factor
+
+        x = numpy.arange(7.0)
+        assert numpy.array_equal(scale(x, 2.0), x * 2)
+
+    def test_split_along_axis(self):
+        @device([Host, Remote], split={'x': 1})
+        def double(x):
+            return x * 2
+
+        x = numpy.arange(12.0).reshape(2, 6)
+        assert numpy.array_equal(double(x), x * 2)
+
+    def test_sum(self):
+        @device([Host, Remote], split={'x': 0}, combine='sum')
+        def total(x):
+            return x.sum(axis=0)
+
+        x = numpy.arange(12.0).reshape(4, 3)
+        assert numpy.array_equal(total(x), x.sum(axis=0))
+
+    def test_callable_combine(self):
+        @device([Host, Remote], split={'x': 0}, combine=lambda r: len(r))
+        def first(x):
+            return x[0]
+
+        assert first(numpy.arange(4)) == 2
+
+    def test_split_orches_array(self):
+        @device([Host, Remote], split={'x': 0})
+        def double(x):
+            return x * 2
+
+        x = OrchesArray(numpy.arange(6.0))
+        assert numpy.array_equal(double(x), numpy.arange(6.0) * 2)
+
+    def test_split_requires_array(self):
+        @device([Host, Remote], split={'x': 0})
+        def double(x):
+            return x * 2
+
+        with pytest.raises(ValueError, match='x'):
+            double([1, 2, 3])
+
+    @pytest.mark.parametrize('targets,options', [
+        ([], {}),
+        ([Host, Host()], {}),
+        ([Host, Remote], {'lazy': True}),
+        ([Host, Remote], {'coherent': True}),
+        ([Host, Remote], {'combine': 'max'}),
+    ])
+    def test_invalid(self, targets, options):
+        with pytest.raises(ValueError):
+            device(targets, **options)(lambda x: x)
+
+    def test_unknown_split_argument(self):
+        with pytest.raises(ValueError):
+            device([Host, Remote], split={'y': 0})(lambda x: x)
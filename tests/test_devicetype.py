@@ -0,0 +1,105 @@
+import pickle
+import types
+
+import numpy
+import pytest
+
+from orchespy import numpy as onp
+from orchespy.devicetype import Host, register_device_class
+from orchespy.devicetype.base import _in_exclusive_context
+from orchespy.devicetype.find_device_class import find_device_class
+
+from helpers import Exclusive, Remote, RemoteArray
+
+
+_module = types.SimpleNamespace(name='fake numpy')
+
+
+class Pair(Host):
+    """Devicetype with two devices."""
+    @classmethod
+    def _probe_device_count(cls):
+        return 2
+
+    @property
+    def numpy_class(self):
+        return _module
+
+
+def test_instances_are_interned():
+    assert Host() is Host(0)
+    assert Host(device_id=0) is Host()
+    assert Pair(1) is Pair(1)
+    assert Pair(0) is not Pair(1)
+    assert Pair(0) != Host(0)
+    assert len({Host(), Host(0), Remote()}) == 2
+
+
+def test_instances_are_immutable():
+    with pytest.raises(AttributeError):
+        Host().name = 'host'
+
+
+def test_pickle():
+    assert pickle.loads(pickle.dumps(Pair(1))) is Pair(1)
+
+
+def test_invalid_device_id():
+    with pytest.raises(ValueError, match='exceeds'):
+        Host(1)
+    with pytest.raises(ValueError):
+        Pair(2)
+    with pytest.raises(TypeError):
+        Host('0')
+
+
+def test_device_count():
+    assert Host.device_count() == 1
+    assert Pair.device_count() == 2
+    Pair.refresh_devices()
+    assert Pair.device_count() == 2
+
+
+def test_find_device_class():
+    assert find_device_class(numpy.ones(1)) is Host
+    assert find_device_class(numpy.ones(1).view(RemoteArray)) is Remote
+    assert find_device_class([1]) is None
+
+
+def test_register_device_class_covers_subclasses():
+    class Tagged(numpy.ndarray):
+        pass
+
+    class Marked(Tagged):
+        pass
+
+    x = numpy.ones(1).view(Marked)
+    assert find_device_class(x) is Host
+    register_device_class(Tagged, Pair)
+    assert find_device_class(x) is Pair
+
+
+def test_context_makes_numpy_current():
+    assert onp.get_current_numpy() is numpy
+    with Pair(1) as xp:
+        assert xp is _module
+        assert onp.get_current_numpy() is _module
+        with Host() as inner:
+            assert inner is numpy
+            assert onp.get_current_numpy() is numpy
+        assert onp.name == 'fake numpy'
+    assert onp.get_current_numpy() is numpy
+
+
+def test_exclusive_context():
+    assert not _in_exclusive_context()
+    with Exclusive():
+        assert _in_exclusive_context()
+        with Host():
+            assert _in_exclusive_context()
+        with Exclusive():
+            assert _in_exclusive_context()
+        assert _in_exclusive_context()
+    assert not _in_exclusive_context()
+    with Host():
+        assert not _in_exclusive_context()
@@ -0,0 +1,167 @@
+import os
+import threading
+
+import numpy
+import pytest
+
+from orchespy import device
+from orchespy.devicetype import Host
+from orchespy.executor import DeviceExecutor, ProcessExecutor
+from orchespy.executor import default_process_executor
+
+import helpers
+from helpers import Remote
+
+
+class TestDeviceExecutor:
+    def test_submit_runs_on_device_worker(self):
+        executor = DeviceExecutor()
+        try:
+            name = executor.submit(
+                Remote, lambda: threading.current_thread().name).result()
+        finally:
+            executor.shutdown()
+        assert name.startswith('orchespy-device-Remote(0)')
+
+    def test_calls_for_one_device_run_in_order(self):
+        executor = DeviceExecutor()
+        order = []
+        try:
+            futures = [executor.submit(Remote(), order.append, i)
+                       for i in range(20)]
+            for f in futures:
+                f.result()
+        finally:
+            executor.shutdown()
+        assert order == list(range(20))
+
+    def test_nested_call_for_same_device_runs_inline(self):
+        executor = DeviceExecutor()
+
+        def outer():
+            inner = executor.submit(Remote(), threading.current_thread)
+            return inner.result(timeout=10) is threading.current_thread()
+
+        try:
+            assert executor.submit(Remote(), outer).result(timeout=10)
+        finally:
+            executor.shutdown()
+
+    def test_devices_run_concurrently(self):
+        executor = DeviceExecutor()
+        barrier = threading.Barrier(2, timeout=10)
+        try:
+            futures = [executor.submit(d, barrier.wait)
+                       for d in (Host(), Remote())]
+            for f in futures:
+                f.result()
+        finally:
+            executor.shutdown()
+
+    def test_set_max_workers(self):
+        executor = DeviceExecutor()
+        executor.set_max_workers(Remote, 2)
+        barrier = threading.Barrier(2, timeout=10)
+        try:
+            futures = [executor.submit(Remote(), barrier.wait)
+                       for _ in range(2)]
+            for f in futures:
+                f.result()
+        finally:
+            executor.shutdown()
+        with pytest.raises(ValueError):
+            executor.set_max_workers(Remote, 0)
+
+    def test_exception(self):
+        executor = DeviceExecutor()
+        try:
+            future = executor.submit(Remote(), int, 'x')
+            with pytest.raises(ValueError):
+                future.result()
+        finally:
+            executor.shutdown()
+
+
+def _shared_blocks():
+    return {n for n in os.listdir('/dev/shm') if n.startswith('psm_')}
+
+
+@pytest.fixture(scope='module')
+def workers():
+    yield default_process_executor
+    default_process_executor.shutdown()
+
+
+@pytest.mark.usefixtures('workers')
+class TestProcess:
+    def test_call(self):
+        x = numpy.arange(1000.0)
+        assert numpy.array_equal(helpers.scale(x, 2.0), x * 2)
+
+    def test_result_containers(self):
+        result = helpers.split_halves(numpy.arange(6))
+        assert numpy.array_equal(result['head'], [0, 1, 2])
+        assert numpy.array_equal(result['tail'], [3, 4, 5])
+        assert result['pid'] != os.getpid()
+
+    def test_worker_is_kept(self):
+        assert helpers.pid() == helpers.pid()
+
+    def test_nested_call_runs_in_worker(self):
+        x = numpy.ones(4)
+        assert numpy.array_equal(helpers.nested(x), numpy.full(4, 3.0))
+
+    def test_submit(self):
+        future = helpers.scale.submit(numpy.ones(3), 3.0)
+        assert numpy.array_equal(future.result(), numpy.full(3, 3.0))
+
+    def test_error_is_raised(self):
+        with pytest.raises(KeyError, match='missing'):
+            helpers.fail('missing')
+        assert numpy.array_equal(helpers.scale(numpy.ones(2), 1.0),
+                                 numpy.ones(2))
+
+    def test_unsendable_result(self):
+        with pytest.raises(RuntimeError, match='cannot be sent'):
+            helpers.unpicklable()
+        assert numpy.array_equal(helpers.scale(numpy.ones(2), 1.0),
+                                 numpy.ones(2))
+
+    def test_exited_worker_is_replaced(self):
+        before = helpers.pid()
+        with pytest.raises(RuntimeError, match='exited'):
+            helpers.exit_worker()
+        assert helpers.pid() != before
+
+    @pytest.mark.skipif(not os.path.isdir('/dev/shm'),
+                        reason='shared memory is not listed in /dev/shm')
+    def test_shared_memory_is_released(self):
+        helpers.scale(numpy.ones(10), 1.0)
+        before = _shared_blocks()
+        helpers.scale(numpy.ones(1000), 2.0)
+        helpers.split_halves(numpy.arange(100))
+        with pytest.raises(KeyError):
+            helpers.fail('x')
+        with pytest.raises(RuntimeError):
+            helpers.unpicklable()
+        assert _shared_blocks() == before
+
+    def test_process_executor(self):
+        executor = ProcessExecutor()
+        try:
+            y = executor.submit(Host, helpers.add_ones, numpy.zeros(3))
+            assert numpy.array_equal(y.result(timeout=60), numpy.ones(3))
+        finally:
+            executor.shutdown()
+
+
+@pytest.mark.parametrize('target,options', [
+    ([Host, Remote], {}),
+    (Host, {'lazy': True}),
+    (Host, {'coherent': True}),
+    (Host, {'return_to': Remote}),
+    (Host, {'memoize': True}),
+])
+def test_invalid_process_options(target, options):
+    with pytest.raises(ValueError):
+        device(target, process=True, **options)(helpers.add_ones)
@@ -0,0 +1,138 @@
+import io
+
+import numpy
+import pytest
+
+import orchespy
+from orchespy.devicetype import Host
+
+from helpers import Remote, RemoteArray
+
+
+@pytest.fixture(params=[Host, Remote])
+def target(request):
+    return request.param()
+
+
+@pytest.mark.parametrize('order', ['C', 'F'])
+def test_load_npy_file(tmp_path, target, order):
+    x = numpy.asarray(numpy.random.rand(30, 20), order=order)
+    path = tmp_path / 'x.npy'
+    numpy.save(path, x)
+    y = orchespy.load_to_device(str(path), target, chunk_bytes=1000)
+    assert numpy.array_equal(y, x)
+    assert y.flags[order + '_CONTIGUOUS']
+    assert isinstance(y, RemoteArray) == isinstance(target, Remote)
+
+
+def test_load_npy_file_object(target):
+    f = io.BytesIO()
+    numpy.save(f, numpy.arange(10))
+    f.seek(0)
+    assert numpy.array_equal(orchespy.load_to_device(f, target),
+                             numpy.arange(10))
+
+
+@pytest.mark.parametrize('dtype', ['f4', 'i2', 'f8'])
+def test_load_npy_with_dtype(tmp_path, target, dtype):
+    x = numpy.asfortranarray(numpy.arange(60.0).reshape(6, 10) * 1.5)
+    path = tmp_path / 'x.npy'
+    numpy.save(path, x)
+    y = orchespy.load_to_device(path, target, dtype=dtype, chunk_bytes=64)
+    assert y.dtype == numpy.dtype(dtype)
+    assert numpy.array_equal(y, x.astype(dtype))
+    assert y.flags.f_contiguous
+
+
+def test_load_raw_file(tmp_path, target):
+    x = numpy.arange(100, dtype='i4')
+    path = tmp_path / 'x.bin'
+    path.write_bytes(b'head' + x.tobytes())
+    y = orchespy.load_to_device(path, target, dtype='i4', offset=4)
+    assert numpy.array_equal(y, x)
+    y = orchespy.load_to_device(path, target, dtype='i4', shape=(10, 5),
+                                offset=4, chunk_bytes=40)
+    assert numpy.array_equal(y, x[:50].reshape(10, 5))
+
+
+def test_load_raw_bytes_io(target):
+    x = numpy.arange(10.0)
+    y = orchespy.load_to_device(io.BytesIO(x.tobytes()), target, dtype='f8')
+    assert numpy.array_equal(y, x)
+
+
+def test_load_raw_requires_dtype():
+    with pytest.raises(ValueError):
+        orchespy.load_to_device(io.BytesIO(b'\0' * 8), Host())
+
+
+def test_load_short_file():
+    with pytest.raises(ValueError):
+        orchespy.load_to_device(io.BytesIO(b'\0' * 8), Host(), dtype='f8',
+                                shape=4)
+
+
+def test_load_object_npy():
+    f = io.BytesIO()
+    numpy.save(f, numpy.array([1, 'a'], dtype=object))
+    f.seek(0)
+    with pytest.raises(ValueError):
+        orchespy.load_to_device(f, Host())
+
+
+def test_load_memmap(tmp_path, target):
+    x = numpy.arange(1000.0)
+    path = tmp_path / 'x.dat'
+    x.tofile(path)
+    mm = numpy.memmap(path, dtype='f8', mode='r')
+    y = orchespy.load_to_device(mm, target, chunk_bytes=800)
+    assert numpy.array_equal(y, x)
+    y = orchespy.load_to_device(mm, target, dtype='f4')
+    assert y.dtype == numpy.float32
+
+
+def test_load_empty(target):
+    f = io.BytesIO()
+    numpy.save(f, numpy.zeros((0, 3)))
+    f.seek(0)
+    assert orchespy.load_to_device(f, target).shape == (0, 3)
+
+
+@pytest.mark.parametrize('order', ['C', 'F'])
+def test_save_round_trip(tmp_path, target, order):
+    x = orchespy.transfer_array(
+        numpy.asarray(numpy.random.rand(20, 30), order=order), target)
+    path = tmp_path / 'x.npy'
+    orchespy.save_from_device(str(path), x, chunk_bytes=1000)
+    y = numpy.load(path)
+    assert numpy.array_equal(y, x)
+    assert y.flags[order + '_CONTIGUOUS']
+
+
+def test_save_strided(target):
+    x = orchespy.transfer_array(numpy.arange(20.0).reshape(4, 5), target)
+    f = io.BytesIO()
+    orchespy.save_from_device(f, x[:, ::2])
+    f.seek(0)
+    assert numpy.array_equal(numpy.load(f), numpy.asarray(x)[:, ::2])
+
+
+def test_save_raw(target):
+    x = orchespy.transfer_array(numpy.arange(10, dtype='i2'), target)
+    f = io.BytesIO()
+    orchespy.save_from_device(f, x, raw=True, chunk_bytes=4)
+    assert f.getvalue() == numpy.arange(10, dtype='i2').tobytes()
+
+
+def test_save_to_memmap(tmp_path, target):
+    x = orchespy.transfer_array(numpy.arange(100.0), target)
+    mm = numpy.memmap(tmp_path / 'x.dat', dtype='f8', mode='w+',
+                      shape=(100,))
+    orchespy.save_from_device(mm, x)
+    assert numpy.array_equal(numpy.fromfile(tmp_path / 'x.dat'),
+                             numpy.arange(100.0))
+
+
+def test_save_requires_array():
+    with pytest.raises(ValueError):
+        orchespy.save_from_device(io.BytesIO(), [1, 2])
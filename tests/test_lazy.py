@@ -0,0 +1,58 @@
+import numpy
+import pytest
+
+from orchespy.devicetype import Host
+from orchespy.lazy import LazyArray
+
+from helpers import RemoteArray
+
+
+def _lazy(data=None):
+    if data is None:
+        data = numpy.arange(6.0).reshape(2, 3)
+    return LazyArray(data.view(RemoteArray), Host())
+
+
+def test_metadata_does_not_transfer(metrics):
+    x = _lazy()
+    assert x.shape == (2, 3)
+    assert x.dtype == numpy.float64
+    assert x.ndim == 2
+    assert x.size == 6
+    assert x.nbytes == 48
+    assert len(x) == 2
+    assert not x.materialized
+    assert metrics.metrics()['transfers'] == {}
+    assert 'not transferred' in repr(x)
+
+
+def test_indexing_transfers_once(metrics):
+    x = _lazy()
+    assert numpy.array_equal(x[1], [3.0, 4.0, 5.0])
+    assert x.materialized
+    value = x.get()
+    assert type(value) is numpy.ndarray
+    assert x.get() is value
+    assert x.shape == (2, 3)
+    assert len(metrics.metrics()['transfers']) == 1
+
+
+def test_other_attributes_transfer():
+    x = _lazy()
+    assert numpy.array_equal(x.T, numpy.arange(6.0).reshape(2, 3).T)
+    assert x.materialized
+
+
+def test_array_protocol():
+    x = _lazy()
+    value = numpy.asarray(x)
+    assert value is x.get()
+    assert numpy.array(x, copy=True) is not value
+    assert numpy.asarray(x, dtype='i4').dtype == numpy.int32
+    with pytest.raises(ValueError):
+        x.__array__(dtype='f4', copy=False)
+
+
+def test_private_attributes_are_not_forwarded():
+    with pytest.raises(AttributeError):
+        _lazy()._missing
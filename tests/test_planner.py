@@ -0,0 +1,73 @@
+import numpy
+import pytest
+
+from orchespy.devicetype import Host, register_link
+from orchespy.devicetype.registry import get_link
+from orchespy.planner import Route, calibrate, plan_route
+
+from helpers import Remote, RemoteArray
+
+
+class Far(Host):
+    """Device linked only with the host."""
+    def can_transfer_to(self, obj, target):
+        return isinstance(obj, numpy.ndarray) and isinstance(target, Host)
+
+
+class Isolated(Host):
+    """Device without links."""
+
+
+register_link(Host, Far, bandwidth=1e9, latency=1e-5,
+              dtype_factor={'bool': 8.0})
+register_link(Far, Host, bandwidth=1e9, latency=1e-5)
+
+
+def test_direct_route():
+    route = plan_route(numpy.ones(1000), Remote)
+    assert route.hops == (Host(), Remote())
+    assert not route.staged
+    assert route.cost == pytest.approx(1e-6 + 8000 / 10e9)
+
+
+def test_same_device():
+    route = plan_route(numpy.ones(10), Host())
+    assert route.hops == (Host(),)
+    assert route.cost == 0.0
+
+
+def test_staged_route():
+    route = plan_route(numpy.ones(1000).view(RemoteArray), Far())
+    assert route.hops == (Remote(), Host(), Far())
+    assert route.staged
+    assert route.cost == pytest.approx(1e-6 + 8000 / 10e9 + 1e-5 + 8000 / 1e9)
+    assert repr(route).startswith('Route(Remote(0) -> Host(0) -> Far(0)')
+
+
+def test_dtype_factor():
+    plain = plan_route(numpy.ones(1000, dtype='u1'), Far())
+    wide = plan_route(numpy.ones(1000, dtype=bool), Far())
+    assert wide.cost > plain.cost
+
+
+def test_unreachable():
+    assert plan_route(numpy.ones(10), Isolated()) is None
+    assert plan_route([1, 2], Host()) is None
+
+
+def test_route():
+    route = Route([Host(), Remote()], 1.0)
+    assert route.hops == (Host(), Remote())
+    assert not route.staged
+
+
+def test_calibrate_updates_link():
+    link = calibrate(Host, Far(), nbytes=1 << 12, repeat=1)
+    try:
+        assert link is get_link(Host, Far)
+        assert link.bandwidth > 0
+        assert link.latency >= 0
+        assert link.dtype_factor == {'bool': 8.0}
+    finally:
+        register_link(Host, Far, bandwidth=1e9, latency=1e-5,
+                      dtype_factor={'bool': 8.0})
@@ -0,0 +1,128 @@
+import gc
+
+import numpy
+import pytest
+
+from orchespy.devicetype import Host
+from orchespy.pool import BufferPool, StagingPool, aligned_empty, get_pool
+from orchespy.pool import get_staging_pool, _PAGE_SIZE
+
+from helpers import Remote
+
+
+def test_buffer_pool_reuses_released_buffer():
+    pool = BufferPool(numpy, max_bytes=1 << 20)
+    x = pool.empty((100,), 'f8')
+    address = x.ctypes.data
+    del x
+    gc.collect()
+    y = pool.empty((10, 10), 'f8')
+    assert y.ctypes.data == address
+    assert y.shape == (10, 10)
+    assert pool.stats()['hits'] == 1
+    assert pool.stats()['misses'] == 1
+
+
+def test_buffer_pool_keys_by_dtype_and_order():
+    pool = BufferPool(numpy, max_bytes=1 << 20)
+    pool.empty((4, 4), 'f8')
+    gc.collect()
+    assert pool.empty((4, 4), 'i8').dtype == numpy.int64
+    assert pool.empty((4, 4), 'f8', order='F').flags.f_contiguous
+    assert pool.stats()['hits'] == 0
+
+
+def test_buffer_pool_does_not_reuse_buffer_with_live_view():
+    pool = BufferPool(numpy, max_bytes=1 << 20)
+    x = pool.empty((100,), 'f8')
+    x[:] = 1.0
+    view = x[10:20]
+    del x
+    gc.collect()
+    y = pool.empty((100,), 'f8')
+    y[:] = 2.0
+    assert numpy.all(view == 1.0)
+    assert pool.stats()['discarded'] == 1
+    assert pool.stats()['hits'] == 0
+
+
+def test_buffer_pool_limits():
+    pool = BufferPool(numpy, max_bytes=800, min_bytes=80)
+    small = pool.empty((5,), 'f8')
+    assert pool.stats()['unpooled'] == 1
+    del small
+    a = pool.empty((100,), 'f8')
+    b = pool.empty((100,), 'f8')
+    del a, b
+    gc.collect()
+    stats = pool.stats()
+    assert stats['buffers'] == 1
+    assert stats['bytes'] == 800
+    assert stats['discarded'] == 1
+    assert pool.trim() == 800
+    assert pool.stats()['bytes'] == 0
+
+
+def test_disabled_buffer_pool():
+    pool = BufferPool(numpy)
+    pool.empty((100,), 'f8')
+    assert pool.stats()['unpooled'] == 1
+
+
+def test_get_pool_is_per_device():
+    assert get_pool(Remote) is get_pool(Remote())
+    assert get_pool(Remote()) is not get_pool(Host())
+
+
+def test_aligned_empty():
+    buf = aligned_empty(1000)
+    assert buf.nbytes == 1000
+    assert buf.dtype == numpy.uint8
+    assert buf.ctypes.data % _PAGE_SIZE == 0
+
+
+def test_staging_pool_reuses_size_class():
+    pool = StagingPool(aligned_empty)
+    with pool.borrow((1000,), 'f8') as buf:
+        assert buf.shape == (1000,)
+        assert buf.ctypes.data % _PAGE_SIZE == 0
+        address = buf.ctypes.data
+    with pool.borrow((900,), 'f8') as buf:
+        assert buf.ctypes.data == address
+    stats = pool.stats()
+    assert stats['hits'] == 1
+    assert stats['misses'] == 1
+    assert stats['bytes'] == 8192
+
+
+def test_staging_pool_buffers_are_not_shared():
+    pool = StagingPool(aligned_empty)
+    with pool.borrow((100,)) as a, pool.borrow((100,)) as b:
+        assert a.ctypes.data != b.ctypes.data
+    assert pool.stats()['buffers'] == 2
+
+
+def test_staging_pool_releases_on_error():
+    pool = StagingPool(aligned_empty)
+    with pytest.raises(RuntimeError):
+        with pool.borrow((100,)):
+            raise RuntimeError
+    assert pool.stats()['buffers'] == 1
+
+
+def test_staging_pool_limits():
+    pool = StagingPool(aligned_empty, max_bytes=_PAGE_SIZE, prefault=True)
+    with pool.borrow((2 * _PAGE_SIZE,)):
+        pass
+    assert pool.stats()['discarded'] == 1
+    with pool.borrow((10,)):
+        pass
+    assert pool.stats()['bytes'] == _PAGE_SIZE
+    assert pool.trim() == _PAGE_SIZE
+    assert pool.stats()['buffers'] == 0
+
+
+def test_get_staging_pool_uses_device_settings():
+    pool = get_staging_pool(Remote)
+    assert pool is get_staging_pool(Remote())
+    assert pool.max_bytes == Remote.staging_max_bytes
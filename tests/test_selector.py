@@ -0,0 +1,140 @@
+import json
+
+import numpy
+import pytest
+
+import orchespy
+from orchespy import selector as selector_module
+from orchespy.devicetype import Host
+from orchespy.selector import Selector, available_devices
+
+from helpers import Remote, RemoteArray
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'calibration.json')
+
+
+def _selector(path, **kwargs):
+    return Selector(devices=[Host(), Remote()], path=path,
+                    calibration_bytes=1 << 12, **kwargs)
+
+
+def _name(func):
+    return '{}.{}'.format(func.__module__, func.__qualname__)
+
+
+def test_available_devices():
+    assert available_devices()[0] == Host()
+
+
+def test_unmeasured_devices_are_tried_first(path):
+    sel = _selector(path, min_samples=1)
+    x = numpy.ones(10)
+    assert sel.select('f', [x]) == Host()
+    sel.record('f', Host(), x.nbytes, 1.0)
+    assert sel.select('f', [x]) == Remote()
+
+
+def test_faster_device_is_selected(path):
+    sel = _selector(path, min_samples=1)
+    x = numpy.ones(10)
+    sel.record('f', Host(), x.nbytes, 1.0)
+    sel.record('f', Remote(), x.nbytes, 1e-3)
+    assert sel.select('f', [x]) == Remote()
+    sel.record('g', Host(), x.nbytes, 1e-3)
+    sel.record('g', Remote(), x.nbytes, 1.0)
+    assert sel.select('g', [x]) == Host()
+
+
+def test_estimate(path):
+    sel = _selector(path)
+    assert sel.estimate('f', Host(), 100) is None
+    sel.record('f', Host(), 100, 1.0)
+    sel.record('f', Host(), 300, 3.0)
+    assert sel.estimate('f', Host(), 200) == pytest.approx(2.0)
+
+
+def test_calibration_round_trip(path):
+    sel = _selector(path, min_samples=1)
+    sel.record('f', Host(), 100, 1.0)
+    sel.record('f', Host(), 300, 2.0)
+    sel.record('f', Remote(), 100, 0.5)
+    sel.select('f', [numpy.ones(10)])
+    sel.save()
+
+    with open(path) as f:
+        data = json.load(f)
+    assert 'Host->Remote' in data['links']
+    assert data['functions']['f']['Host'][0] == 2
+
+    loaded = _selector(path)
+    for dev, nbytes in [(Host(), 200), (Remote(), 100)]:
+        assert loaded.estimate('f', dev, nbytes) == pytest.approx(
+            sel.estimate('f', dev, nbytes))
+    assert loaded._links == sel._links
+
+
+def test_unreadable_calibration_is_ignored(path):
+    with open(path, 'w') as f:
+        f.write('not json')
+    sel = _selector(path)
+    assert sel.estimate('f', Host(), 100) is None
+
+
+def test_reset(path):
+    sel = _selector(path)
+    sel.record('f', Host(), 100, 1.0)
+    sel.reset()
+    assert sel.estimate('f', Host(), 100) is None
+
+
+def test_failed_link_measurement_is_not_saved(path, monkeypatch):
+    def fail(*args, **kwargs):
+        raise RuntimeError('cannot measure')
+
+    monkeypatch.setattr(selector_module, 'calibrate', fail)
+    sel = _selector(path, min_samples=1)
+    sel.record('f', Host(), 80, 1.0)
+    sel.record('f', Remote(), 80, 1e-3)
+    assert sel.select('f', [numpy.ones(10)]) == Remote()
+    assert sel._links[('Host', 'Remote')] is None
+    sel.save()
+    with open(path) as f:
+        assert 'Host->Remote' not in json.load(f)['links']
+
+
+def test_auto_returns_to_device_of_arguments(path):
+    sel = _selector(path, min_samples=1)
+
+    @orchespy.device(sel)
+    def double(x):
+        return x * 2
+
+    sel.record(_name(double), Host(), 80, 1.0)
+    sel.record(_name(double), Remote(), 80, 1e-6)
+    y = double(numpy.ones(10))
+    assert type(y) is numpy.ndarray
+    assert numpy.array_equal(y, numpy.full(10, 2.0))
+
+    sel.reset()
+    sel.record(_name(double), Host(), 80, 1e-6)
+    sel.record(_name(double), Remote(), 80, 1.0)
+    x = orchespy.transfer_array(numpy.ones(10), Remote())
+    assert isinstance(double(x), RemoteArray)
+
+
+def test_auto_return_to(path):
+    sel = _selector(path, min_samples=1)
+
+    @orchespy.device(sel, return_to=Remote)
+    def double(x):
+        return x * 2
+
+    assert isinstance(double(numpy.ones(10)), RemoteArray)
+
+
+def test_auto_rejects_split(path):
+    with pytest.raises(ValueError):
+        orchespy.device(_selector(path), split={'x': 0})(lambda x: x)
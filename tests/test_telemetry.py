@@ -0,0 +1,78 @@
+import numpy
+
+import orchespy
+from orchespy import device, telemetry
+from orchespy.devicetype import Host
+
+from helpers import Remote
+
+
+def test_disabled_by_default(remote):
+    telemetry.reset()
+    orchespy.transfer_array(numpy.ones(4), remote)
+    assert telemetry.metrics()['transfers'] == {}
+
+
+def test_transfer_metrics(remote, metrics):
+    orchespy.transfer_array(numpy.ones(100), remote)
+    orchespy.transfer_array(numpy.ones((10, 10), order='F')[::2], remote)
+    route = orchespy.metrics()['transfers'][(Host(), remote)]
+    assert route['count'] == 2
+    assert route['bytes'] == 800 + 400
+    assert route['seconds'] > 0
+
+
+def test_dtype_conversion_records_moved_bytes(remote, metrics):
+    orchespy.transfer_array(numpy.ones(100), remote, dtype='f4')
+    route = orchespy.metrics()['transfers'][(Host(), remote)]
+    assert route['count'] == 1
+    assert route['bytes'] == 400
+
+
+def test_chunked_transfer_is_one_transfer(remote, metrics):
+    orchespy.transfer_array(numpy.ones(1000), remote, chunk_bytes=800)
+    assert orchespy.metrics()['transfers'][(Host(), remote)]['count'] == 1
+
+
+def test_collect_restores_state(remote):
+    with telemetry.collect():
+        orchespy.transfer_array(numpy.ones(4), remote)
+    assert telemetry.metrics()['transfers'][(Host(), remote)]['count'] == 1
+    orchespy.transfer_array(numpy.ones(4), remote)
+    assert telemetry.metrics()['transfers'][(Host(), remote)]['count'] == 1
+    with telemetry.collect(reset_metrics=False):
+        orchespy.transfer_array(numpy.ones(4), remote)
+    assert telemetry.metrics()['transfers'][(Host(), remote)]['count'] == 2
+    telemetry.reset()
+    assert telemetry.metrics() == {'transfers': {}, 'functions': {}}
+    assert not telemetry.active
+
+
+def test_hooks(remote):
+    calls = []
+    handle = telemetry.add_transfer_hook(
+        pre=lambda src, target: calls.append(('pre', target)),
+        post=lambda src, target, seconds: calls.append(('post', target)))
+    assert telemetry.active
+    try:
+        orchespy.transfer_array(numpy.ones(4), Remote)
+    finally:
+        telemetry.remove_transfer_hook(handle)
+    assert calls == [('pre', remote), ('post', remote)]
+    assert not telemetry.active
+    orchespy.transfer_array(numpy.ones(4), remote)
+    assert len(calls) == 2
+
+
+def test_function_metrics(metrics):
+    @device(Remote, return_to=Host)
+    def double(x):
+        return x * 2
+
+    double(numpy.ones(4))
+    double(numpy.ones(4))
+    name = '{}.{}'.format(double.__module__, double.__qualname__)
+    entry = orchespy.metrics()['functions'][name]
+    assert entry['calls'] == 2
+    for key in ('transfer', 'body', 'result'):
+        assert entry[key] >= 0
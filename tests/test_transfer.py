@@ -0,0 +1,193 @@
+import threading
+
+import numpy
+import pytest
+
+import orchespy
+from orchespy.devicetype import Host
+from orchespy.transfer import TransferFuture
+
+from helpers import Exclusive, Remote
+
+
+@pytest.mark.parametrize('order', ['C', 'F'])
+def test_transfer_array(remote, order):
+    x = numpy.asarray(numpy.arange(12.0).reshape(3, 4), order=order)
+    y = orchespy.transfer_array(x, remote)
+    assert y is not x
+    assert numpy.array_equal(y, x)
+    assert y.flags[order + '_CONTIGUOUS']
+
+
+def test_transfer_array_to_class(remote):
+    x = numpy.ones(3)
+    assert numpy.array_equal(orchespy.transfer_array(x, Remote), x)
+
+
+def test_transfer_array_requires_device():
+    with pytest.raises(ValueError):
+        orchespy.transfer_array(numpy.ones(3), 'host')
+
+
+def test_copy_true_returns_new_array():
+    x = numpy.ones(3)
+    y = orchespy.transfer_array(x, Host())
+    assert y is not x
+    assert numpy.array_equal(y, x)
+
+
+def test_copy_none_returns_array_on_target():
+    x = numpy.ones(3)
+    assert orchespy.transfer_array(x, Host(), copy=None) is x
+
+
+def test_copy_false(remote):
+    x = numpy.ones(3)
+    assert orchespy.transfer_array(x, Host(), copy=False) is x
+    with pytest.raises(ValueError):
+        orchespy.transfer_array(x, remote, copy=False)
+    with pytest.raises(ValueError):
+        orchespy.transfer_array(x, Host(), copy=False, dtype='f4')
+
+
+def test_non_array_is_returned():
+    assert orchespy.transfer_array(3, Host()) == 3
+
+
+@pytest.mark.parametrize('shape', [(1000,), (50, 40), (7, 6, 5)])
+def test_chunked_transfer(remote, shape):
+    x = numpy.random.rand(*shape)
+    y = orchespy.transfer_array(x, remote, chunk_bytes=256)
+    assert numpy.array_equal(y, x)
+
+
+def test_chunked_transfer_content(remote):
+    x = numpy.asfortranarray(numpy.random.rand(40, 30))
+    y = numpy.empty_like(x)
+    orchespy.transfer_array_content(y, x, chunk_bytes=512)
+    assert numpy.array_equal(y, x)
+
+
+@pytest.mark.parametrize('view', [
+    lambda a: a[::2, 1::3],
+    lambda a: a.T,
+    lambda a: a[:, ::-1],
+    lambda a: numpy.broadcast_to(a[:1], a.shape),
+])
+def test_strided_transfer(remote, view):
+    x = view(numpy.arange(120.0).reshape(10, 12))
+    y = orchespy.transfer_array(x, remote)
+    assert numpy.array_equal(y, x)
+    assert y.flags.writeable
+
+
+def test_transposed_transfer_keeps_layout(remote):
+    x = numpy.arange(12.0).reshape(3, 4).T
+    y = orchespy.transfer_array(x, remote)
+    assert y.flags.f_contiguous
+
+
+@pytest.mark.parametrize('src_dtype,dtype', [
+    ('f8', 'f4'), ('f4', 'f8'), ('i8', 'i2'), ('f8', 'i4'),
+])
+def test_transfer_with_dtype(remote, src_dtype, dtype):
+    x = (numpy.arange(1000) * 1.5).astype(src_dtype)
+    y = orchespy.transfer_array(x, remote, dtype=dtype, chunk_bytes=256)
+    assert y.dtype == numpy.dtype(dtype)
+    assert numpy.array_equal(y, x.astype(dtype))
+
+
+def test_transfer_with_dtype_on_same_device():
+    x = numpy.arange(5.0)
+    y = orchespy.transfer_array(x, Host(), dtype='i4')
+    assert y.dtype == numpy.int32
+    assert numpy.array_equal(y, x)
+
+
+def test_transfer_with_same_dtype():
+    x = numpy.arange(5.0)
+    assert orchespy.transfer_array(x, Host(), copy=None, dtype='f8') is x
+
+
+def test_transfer_empty_array(remote):
+    x = numpy.ones((0, 3))
+    assert orchespy.transfer_array(x, remote).shape == (0, 3)
+    assert orchespy.transfer_array(x, remote, dtype='f4').shape == (0, 3)
+
+
+def test_transfer_array_content_shape_mismatch():
+    with pytest.raises(ValueError):
+        orchespy.transfer_array_content(numpy.empty(3), numpy.ones(4))
+
+
+def test_transfer_arrays_packs_small_arrays(remote):
+    arrays = [numpy.arange(4.0), numpy.arange(10), numpy.ones(3, dtype=bool),
+              numpy.ones((2, 3), order='F'), 'not an array']
+    results = orchespy.transfer_arrays(arrays, remote)
+    assert results[-1] == 'not an array'
+    for x, y in zip(arrays[:-1], results[:-1]):
+        assert y.dtype == x.dtype
+        assert numpy.array_equal(y, x)
+    assert results[3].flags.f_contiguous
+    # The packed arrays are views of one transferred buffer.
+    assert results[0].base is not None
+    assert numpy.shares_memory(results[0].base, results[1])
+
+
+def test_transfer_arrays_large_arrays_separately(remote):
+    big = numpy.ones(1000)
+    small = numpy.zeros(2)
+    y_big, y_small = orchespy.transfer_arrays([big, small], remote,
+                                              max_bytes=100)
+    assert numpy.array_equal(y_big, big)
+    assert numpy.array_equal(y_small, small)
+
+
+def test_transfer_array_async(remote):
+    x = numpy.arange(10.0)
+    future = orchespy.transfer_array_async(x, remote)
+    assert isinstance(future, TransferFuture)
+    y = future.result()
+    assert future.done()
+    assert future.wait(0)
+    assert numpy.array_equal(y, x)
+
+
+def test_transfer_array_async_error():
+    future = orchespy.transfer_array_async(numpy.ones(3), Host(), copy=False,
+                                           dtype='f4')
+    with pytest.raises(ValueError):
+        future.result()
+
+
+def test_transfer_array_content_async():
+    x = numpy.arange(10.0)
+    y = numpy.empty_like(x)
+    assert orchespy.transfer_array_content_async(y, x).result() is None
+    assert numpy.array_equal(y, x)
+
+
+def test_wait_all(remote):
+    arrays = [numpy.full(5, i) for i in range(8)]
+    handles = [orchespy.transfer_array_async(x, remote) for x in arrays]
+    for x, y in zip(arrays, orchespy.wait_all(handles)):
+        assert numpy.array_equal(y, x)
+
+
+def test_async_transfers_run_inline_in_exclusive_context(remote):
+    # Route workers cannot enter an exclusive device while the caller is
+    # in it, so the transfers run in the calling thread.
+    threads = []
+
+    def record(src, target):
+        threads.append(threading.current_thread())
+
+    handle = orchespy.telemetry.add_transfer_hook(pre=record)
+    try:
+        with Exclusive():
+            y = orchespy.transfer_array_async(numpy.ones(3), remote).result(
+                timeout=10)
+    finally:
+        orchespy.telemetry.remove_transfer_hook(handle)
+    assert numpy.array_equal(y, numpy.ones(3))
+    assert threads == [threading.current_thread()]
@@ -0,0 +1,67 @@
+import collections
+import dataclasses
+
+import numpy
+
+from orchespy.tree import flatten, unflatten
+
+
+Point = collections.namedtuple('Point', ['x', 'y'])
+
+
+@dataclasses.dataclass
+class Params:
+    weight: object
+    bias: object
+
+
+def test_flatten_round_trip():
+    obj = {'a': [1, (2, 3)], 'b': Point(4, 5), 'c': Params(6, 7)}
+    leaves, treedef = flatten(obj)
+    assert leaves == [1, 2, 3, 4, 5, 6, 7]
+    rebuilt = unflatten(treedef, leaves)
+    assert rebuilt == obj
+    assert type(rebuilt['b']) is Point
+    assert type(rebuilt['c']) is Params
+
+
+def test_treedef_is_hashable_and_shared_by_structure():
+    _, treedef1 = flatten(([numpy.ones(2)], {'k': 1}))
+    _, treedef2 = flatten(([numpy.zeros(3)], {'k': 2}))
+    assert hash(treedef1) == hash(treedef2)
+    assert treedef1 == treedef2
+    _, treedef3 = flatten(([1, 2], {'k': 1}))
+    assert treedef1 != treedef3
+
+
+def test_arrays_are_leaves():
+    x = numpy.ones((2, 2))
+    leaves, treedef = flatten([x])
+    assert leaves[0] is x
+    assert treedef[0] is list
+
+
+def test_unflatten_like_keeps_unchanged_containers():
+    inner = [1, 2]
+    other = {'k': 3}
+    obj = (inner, other)
+    leaves, treedef = flatten(obj)
+    assert unflatten(treedef, leaves, like=obj) is obj
+
+    leaves[0] = 10
+    rebuilt = unflatten(treedef, leaves, like=obj)
+    assert rebuilt == ([10, 2], {'k': 3})
+    assert rebuilt[1] is other
+    assert inner == [1, 2]
+
+
+def test_unflatten_like_copies_dataclass():
+    params = Params(numpy.ones(2), 'extra')
+    params.note = 'kept'
+    leaves, treedef = flatten(params)
+    leaves[0] = numpy.zeros(2)
+    rebuilt = unflatten(treedef, leaves, like=params)
+    assert rebuilt is not params
+    assert rebuilt.note == 'kept'
+    assert rebuilt.bias == 'extra'
+    assert numpy.array_equal(params.weight, numpy.ones(2))